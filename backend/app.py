@@ -9,7 +9,12 @@ from dotenv import load_dotenv
 load_dotenv()
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['X-DB-Connects', 'X-DB-Round-Trips', 'Idempotent-Replayed'])
+
+# Share one pooled connection per request across all db calls
+from database.db import db
+db.init_app(app)
+
 #import blueprint
 from routes.bookings import bookings_bp
 #register blueprint
@@ -51,6 +56,26 @@ from routes.airports import airports_bp
 #register blueprint
 app.register_blueprint(airports_bp, url_prefix='/api/airports')
 
+#import blueprint
+from routes.admin import admin_bp
+#register blueprint
+app.register_blueprint(admin_bp, url_prefix='/api/admin')
+
+#import blueprint
+from routes.batch import batch_bp
+#register blueprint
+app.register_blueprint(batch_bp, url_prefix='/api/batch')
+
+#import blueprint
+from routes.holds import holds_bp
+#register blueprint
+app.register_blueprint(holds_bp, url_prefix='/api/holds')
+
+#import blueprint
+from routes.jobs import jobs_bp
+#register blueprint
+app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+
 
 
 
@@ -86,7 +111,8 @@ def index():
             'airports': '/api/airports/',
             'bookings': '/api/bookings/',
             'staff': '/api/staff/',
-            'analytics': '/api/analytics/'
+            'analytics': '/api/analytics/',
+            'admin': '/api/admin/'
         }
     })
 
@@ -0,0 +1,259 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from mysql.connector import DataError, IntegrityError, ProgrammingError
+from database.db import db
+from database.versions import table_versions
+
+# One single-row INSERT per table. Rows carry their age in microseconds so the
+# timestamp is the moment they were queued (on the database clock), not the flush
+AUDIT_INSERTS = {
+    'BookingAudit': (
+        "INSERT INTO BookingAudit (Booking_ID, Operation, Details, Op_Time) "
+        "VALUES (%s, %s, %s, CURRENT_TIMESTAMP - INTERVAL %s MICROSECOND)"
+    ),
+    'PassengerAudit': (
+        "INSERT INTO PassengerAudit (Passenger_ID, Action, Details, Action_Time) "
+        "VALUES (%s, %s, %s, CURRENT_TIMESTAMP - INTERVAL %s MICROSECOND)"
+    ),
+    'Notifications': (
+        "INSERT INTO Notifications (Recipient_Type, Recipient_ID, Message, Created_At) "
+        "VALUES (%s, %s, %s, CURRENT_TIMESTAMP - INTERVAL %s MICROSECOND)"
+    )
+}
+
+# MySQL refused the row itself (bad value, missing parent row): retrying cannot help
+REJECTED_ERRORS = (DataError, IntegrityError, ProgrammingError)
+
+class AuditWriter:
+    """Audit and notification rows written off the request path
+
+    Rows go into a bounded in-process queue; a background thread writes them
+    with multi-row INSERTs every flush_ms or batch_rows rows. When the queue
+    is full or MySQL is unavailable, rows are appended to a JSON-lines spill
+    file (fsynced) and replayed after the next successful flush. A batch
+    MySQL rejects is retried row by row, and the rows it still refuses go to
+    a separate rejected file that is never replayed. Pass sync=True for rows that must commit or roll back with the caller's
+    transaction.
+    """
+
+    def __init__(self, enabled=True, queue_size=10000, flush_ms=200, batch_rows=500,
+                 spill_path='audit_spill.jsonl', replay_interval=30, rejected_path='audit_rejected.jsonl'):
+        self.enabled = enabled
+        self.flush_ms = flush_ms
+        self.batch_rows = batch_rows
+        self.spill_path = spill_path
+        self.rejected_path = rejected_path
+        self.replay_interval = replay_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._thread = None
+        self._last_replay = 0.0
+        self.written = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.failed_batches = 0
+        self.rejected = 0
+
+    def booking(self, booking_id, operation, details, sync=False):
+        self._write('BookingAudit', (booking_id, operation, details), sync)
+
+    def passenger(self, passenger_id, action, details, sync=False):
+        self._write('PassengerAudit', (passenger_id, action, details), sync)
+
+    def notify(self, recipient_type, recipient_id, message, sync=False):
+        self._write('Notifications', (recipient_type, recipient_id, message), sync)
+
+    def _write(self, table, values, sync):
+        if sync or not self.enabled:
+            db.execute_update(AUDIT_INSERTS[table], tuple(values) + (0,))
+            return
+        self._start()
+        entry = (table, list(values), time.time())
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            # The flusher is behind (MySQL slow or down): keep the row on disk instead of blocking
+            self._spill([entry])
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.replay_interval)]
+            except queue.Empty:
+                self._maybe_replay()
+                continue
+            deadline = time.monotonic() + self.flush_ms / 1000
+            while len(batch) < self.batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                if self._flush(batch):
+                    self._maybe_replay()
+            except Exception as e:
+                print(f"Audit writer error: {str(e)}")
+
+    def _flush(self, entries):
+        """Write entries with one multi-row INSERT per table; False when rows had to be spilled"""
+        now = time.time()
+        by_table = {}
+        for table, values, queued_at in entries:
+            age_us = max(0, int((now - queued_at) * 1000000))
+            by_table.setdefault(table, []).append((table, values, queued_at, age_us))
+        ok = True
+        written = []
+        for table, rows in by_table.items():
+            try:
+                db.execute_many(AUDIT_INSERTS[table], [tuple(values) + (age_us,) for _, values, _, age_us in rows])
+                self.written += len(rows)
+                written.append(table)
+            except REJECTED_ERRORS as e:
+                self.failed_batches += 1
+                print(f"Audit flush of {len(rows)} {table} rows rejected, retrying row by row: {str(e)}")
+                count, complete = self._flush_rows(table, rows)
+                ok = ok and complete
+                if count:
+                    written.append(table)
+            except Exception as e:
+                ok = False
+                self.failed_batches += 1
+                print(f"Audit flush of {len(rows)} {table} rows failed, spilling to disk: {str(e)}")
+                self._spill([(t, values, queued_at) for t, values, queued_at, _ in rows])
+        if written:
+            # The requests that queued these rows already bumped the tables; bump again now they are visible
+            table_versions.bump(*written)
+        return ok
+
+    def _flush_rows(self, table, rows):
+        """Write a rejected batch one row at a time; returns (rows written, False if rows were spilled)"""
+        written = 0
+        for position, (_, values, queued_at, age_us) in enumerate(rows):
+            try:
+                db.execute_update(AUDIT_INSERTS[table], tuple(values) + (age_us,))
+            except REJECTED_ERRORS as e:
+                print(f"Audit {table} row rejected, moving it to {self.rejected_path}: {str(e)}")
+                self._append(self.rejected_path, [{'table': table, 'values': values, 'queued_at': queued_at,
+                                                   'error': str(e)}])
+                self.rejected += 1
+                continue
+            except Exception as e:
+                # MySQL went away mid-retry: keep the rest for replay
+                print(f"Audit row retry failed, spilling {len(rows) - position} {table} rows: {str(e)}")
+                self._spill([(table, v, q) for _, v, q, _ in rows[position:]])
+                self.written += written
+                return written, False
+            written += 1
+        self.written += written
+        return written, True
+
+    def _append(self, path, records):
+        with self._spill_lock:
+            with open(path, 'a', encoding='utf-8') as spill:
+                for record in records:
+                    spill.write(json.dumps(record) + '\n')
+                spill.flush()
+                os.fsync(spill.fileno())
+
+    def _spill(self, entries):
+        self._append(self.spill_path, [{'table': table, 'values': values, 'queued_at': queued_at}
+                                       for table, values, queued_at in entries])
+        self.spilled += len(entries)
+
+    def _maybe_replay(self):
+        if time.monotonic() - self._last_replay < self.replay_interval:
+            return
+        self._last_replay = time.monotonic()
+        self.replay()
+
+    def replay(self):
+        """Write spilled rows back to MySQL; returns how many were replayed"""
+        if not os.path.exists(self.spill_path):
+            return 0
+        # Claim the file first so a concurrent spill or another worker never replays it twice
+        claimed = f'{self.spill_path}.{os.getpid()}.replay'
+        with self._spill_lock:
+            try:
+                os.replace(self.spill_path, claimed)
+            except FileNotFoundError:
+                return 0
+        entries = []
+        with open(claimed, encoding='utf-8') as spill:
+            for line in spill:
+                try:
+                    row = json.loads(line)
+                    entries.append((row['table'], row['values'], row['queued_at']))
+                except (ValueError, KeyError):
+                    print(f"Skipping unreadable audit spill line: {line[:200]!r}")
+        replayed = 0
+        for start in range(0, len(entries), self.batch_rows):
+            batch = entries[start:start + self.batch_rows]
+            if not self._flush(batch):
+                # MySQL is unavailable again and _flush spilled those rows; keep the rest on disk too and stop
+                self._spill(entries[start + self.batch_rows:])
+                break
+            replayed += len(batch)
+        # Removed only now: a crash mid-replay leaves the claimed file for inspection
+        os.remove(claimed)
+        self.replayed += replayed
+        if replayed:
+            print(f"Replayed {replayed} spilled audit rows")
+        return replayed
+
+    def drain(self):
+        """Flush everything queued in the calling thread (used at exit)"""
+        entries = []
+        while True:
+            try:
+                entries.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(entries), self.batch_rows):
+            self._flush(entries[start:start + self.batch_rows])
+        return len(entries)
+
+    def stats(self):
+        spill_bytes = os.path.getsize(self.spill_path) if os.path.exists(self.spill_path) else 0
+        rejected_bytes = os.path.getsize(self.rejected_path) if os.path.exists(self.rejected_path) else 0
+        return {
+            'async': self.enabled,
+            'queued': self._queue.qsize(),
+            'queue_size': self._queue.maxsize,
+            'flush_ms': self.flush_ms,
+            'batch_rows': self.batch_rows,
+            'written': self.written,
+            'spilled': self.spilled,
+            'replayed': self.replayed,
+            'failed_batches': self.failed_batches,
+            'rejected': self.rejected,
+            'spill_bytes': spill_bytes,
+            'rejected_bytes': rejected_bytes
+        }
+
+audit_log = AuditWriter(
+    enabled=os.getenv('AUDIT_ASYNC', 'true').lower() in ('1', 'true', 'yes'),
+    queue_size=int(os.getenv('AUDIT_QUEUE_SIZE', 10000)),
+    flush_ms=int(os.getenv('AUDIT_FLUSH_MS', 200)),
+    batch_rows=int(os.getenv('AUDIT_BATCH_ROWS', 500)),
+    spill_path=os.getenv('AUDIT_SPILL_PATH', 'audit_spill.jsonl'),
+    replay_interval=float(os.getenv('AUDIT_REPLAY_INTERVAL', 30)),
+    rejected_path=os.getenv('AUDIT_REJECTED_PATH', 'audit_rejected.jsonl')
+)
+# Rows still queued when the process stops are written (or spilled) on the way out
+atexit.register(audit_log.drain)
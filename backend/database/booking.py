@@ -0,0 +1,311 @@
+import os
+import mysql.connector
+from database.db import db
+from database.seats import seat_index, seat_inventory, seat_label
+
+GROUP_BOOKING_MAX = int(os.getenv('GROUP_BOOKING_MAX', 500))
+
+class BookingError(Exception):
+    """A booking rejected by sp_BookSeat, with a stable code and HTTP status"""
+
+    MESSAGES = {
+        'FLIGHT_NOT_FOUND': ('Selected flight does not exist', 400),
+        'FLIGHT_CANCELLED': ('Cannot book on a cancelled flight', 400),
+        'FLIGHT_FULL': ('No seats available on this flight', 409),
+        'SEAT_TAKEN': ('Seat {seat_no} is already booked on this flight', 409),
+        'PASSENGER_NOT_FOUND': ('Invalid passenger selected', 400),
+        'EMAIL_EXISTS': ('Email already exists. Use a different email address.', 400),
+        'PHONE_EXISTS': ('Phone number already exists. Use a different phone number.', 400),
+        'SEAT_HELD': ('Seat {seat_no} is being held by another customer', 409),
+        'HOLD_NOT_FOUND': ('Seat hold not found', 404),
+        'HOLD_EXPIRED': ('Seat hold has expired', 410),
+        'DUPLICATE_SEAT': ('Seat {seat_no} is requested more than once', 400)
+    }
+
+    def __init__(self, code, seat_no=None):
+        message, status = self.MESSAGES.get(code, ('Booking failed', 400))
+        super().__init__(message.format(seat_no=seat_no))
+        self.code = code
+        self.status = status
+
+    def to_dict(self):
+        return {'success': False, 'error': str(self), 'code': self.code}
+
+class GroupBookingError(BookingError):
+    """A rejected group booking; seats lists the members that caused it"""
+
+    def __init__(self, code, seats=None):
+        seats = seats or []
+        super().__init__(code, seat_no=', '.join(str(seat['seat_no']) for seat in seats if seat.get('seat_no')))
+        self.seats = seats
+
+    def to_dict(self):
+        result = super().to_dict()
+        result['seats'] = self.seats
+        return result
+
+def book_seat(passenger_id, flight_id, seat_no, details=None):
+    """Book a seat through sp_BookSeat and return the new Booking_ID
+
+    Raises BookingError when the flight, seat or passenger rules reject it.
+    """
+    if details is None:
+        details = f"Booked seat {seat_no} for passenger {passenger_id} on flight {flight_id}"
+    rows = db.call_procedure('sp_BookSeat', [passenger_id, flight_id, seat_no, details])
+    if not rows:
+        raise BookingError('BOOKING_FAILED')
+    if rows[0]['Error_Code']:
+        raise BookingError(rows[0]['Error_Code'], seat_no=seat_no)
+    return rows[0]['Booking_ID']
+
+def book_next_seat(passenger_id, flight_id, details=None):
+    """Book the first free seat on the flight and return (Booking_ID, Seat_No)
+
+    The seat is picked from the flight's seat bitmap while its Flight row
+    is locked, so no other booking can take it first and no retry is needed.
+    """
+    with db.transaction():
+        seat_map = seat_inventory.current(flight_id, for_update=True)
+        if seat_map is None:
+            raise BookingError('FLIGHT_NOT_FOUND')
+        if seat_map.status == 'Cancelled':
+            raise BookingError('FLIGHT_CANCELLED')
+        seats = seat_map.find_free()
+        if seats is None:
+            raise BookingError('FLIGHT_FULL')
+        seat_no = seat_label(seats[0])
+        try:
+            booking_id = book_seat(passenger_id, flight_id, seat_no, details)
+        except BookingError:
+            # The map disagreed with Booking: rebuild it on the next call
+            seat_inventory.invalidate(flight_id)
+            raise
+    seat_inventory.record(seat_map, seats)
+    return booking_id, seat_no
+
+def _seat_conflicts(cursor, flight_id, seat_nos):
+    # Every Booking row counts (ux_booking_flight_seat covers cancelled ones too), plus live holds
+    placeholders = ', '.join(['%s'] * len(seat_nos))
+    cursor.execute(
+        f"""
+        SELECT Seat_No, 'SEAT_TAKEN' AS Code FROM Booking
+        WHERE Flight_ID = %s AND Seat_No IN ({placeholders})
+        UNION ALL
+        SELECT Seat_No, 'SEAT_HELD' AS Code FROM SeatHold
+        WHERE Flight_ID = %s AND Seat_No IN ({placeholders}) AND Expires_At > NOW(6)
+        """,
+        [flight_id] + list(seat_nos) + [flight_id] + list(seat_nos)
+    )
+    return {row['Seat_No']: row['Code'] for row in cursor.fetchall()}
+
+def _pick_seats(cursor, seat_map, flight_id, members):
+    """Seat label per member: requested seats as given, the rest from the seat map
+
+    Raises GroupBookingError when a seat is taken or held, or when the map
+    has no room for the rest. An auto-picked seat can only conflict when a
+    writer bypassed the Flight lock; book_group then drops the cached map.
+    """
+    requested = [seat_no for _, seat_no in members if seat_no]
+    exclude = 0
+    for seat_no in requested:
+        index = seat_index(seat_no, seat_map.capacity)
+        if index is not None:
+            exclude |= 1 << index
+    auto_count = len(members) - len(requested)
+
+    picked = []
+    if auto_count:
+        indexes = seat_map.find_group(auto_count, exclude)
+        if indexes is None:
+            raise GroupBookingError('FLIGHT_FULL')
+        picked = [seat_label(index) for index in indexes]
+    auto_seats = iter(picked)
+    seat_nos = [seat_no or next(auto_seats) for _, seat_no in members]
+
+    conflicts = _seat_conflicts(cursor, flight_id, seat_nos)
+    rejected = [
+        {'index': position, 'passenger_id': passenger_id, 'seat_no': seat_no, 'code': conflicts[seat_no]}
+        for position, ((passenger_id, _), seat_no) in enumerate(zip(members, seat_nos))
+        if seat_no in conflicts
+    ]
+    if rejected:
+        raise GroupBookingError(rejected[0]['code'], rejected)
+    return seat_nos
+
+def book_group(flight_id, members, details=None):
+    """Book one seat per member in a single transaction, all or nothing
+
+    members is a list of (passenger_id, seat_no or None); members without a
+    seat are seated together from the flight's seat map. Passengers are
+    checked before the Flight row is locked. Under the lock the flight is
+    validated once and every seat is checked in one query; then the counters
+    are claimed and bookings and audit rows go in as multi-row INSERTs, so
+    the lock is held for a fixed handful of statements whatever the group
+    size. Returns [{'passenger_id', 'seat_no', 'booking_id'}] in member
+    order; raises GroupBookingError (with the offending members) otherwise.
+    """
+    members = [(passenger_id, seat_no.strip().upper() if seat_no else None) for passenger_id, seat_no in members]
+    seen = set()
+    duplicates = []
+    for position, (passenger_id, seat_no) in enumerate(members):
+        if seat_no and seat_no in seen:
+            duplicates.append({'index': position, 'passenger_id': passenger_id, 'seat_no': seat_no, 'code': 'DUPLICATE_SEAT'})
+        seen.add(seat_no)
+    if duplicates:
+        raise GroupBookingError('DUPLICATE_SEAT', duplicates)
+
+    passenger_ids = sorted({passenger_id for passenger_id, _ in members})
+    placeholders = ', '.join(['%s'] * len(passenger_ids))
+    found = {row['Passenger_ID'] for row in db.execute_query(
+        f"SELECT Passenger_ID FROM Passenger WHERE Passenger_ID IN ({placeholders})", passenger_ids
+    )}
+    missing = [
+        {'index': position, 'passenger_id': passenger_id, 'seat_no': seat_no, 'code': 'PASSENGER_NOT_FOUND'}
+        for position, (passenger_id, seat_no) in enumerate(members)
+        if passenger_id not in found
+    ]
+    if missing:
+        raise GroupBookingError('PASSENGER_NOT_FOUND', missing)
+
+    count = len(members)
+    try:
+        with db.transaction():
+            seat_map = seat_inventory.current(flight_id, for_update=True)
+            if seat_map is None:
+                raise GroupBookingError('FLIGHT_NOT_FOUND')
+            if seat_map.status == 'Cancelled':
+                raise GroupBookingError('FLIGHT_CANCELLED')
+            capacity = seat_map.flight.get('Capacity')
+
+            with db.get_cursor() as (cursor, connection):
+                if capacity is not None and seat_map.flight['Booked_Count'] + seat_map.flight['Held_Count'] + count > capacity:
+                    # Expired holds may still take capacity: release them and look again
+                    cursor.callproc('sp_ReleaseExpiredHolds', [flight_id, 0])
+                    seat_map = seat_inventory.current(flight_id)
+                    if seat_map.flight['Booked_Count'] + seat_map.flight['Held_Count'] + count > capacity:
+                        raise GroupBookingError('FLIGHT_FULL')
+
+                seat_nos = _pick_seats(cursor, seat_map, flight_id, members)
+
+                cursor.execute(
+                    "UPDATE Flight SET Booked_Count = Booked_Count + %s, Seat_Version = Seat_Version + 1 WHERE Flight_ID = %s",
+                    (count, flight_id)
+                )
+                # Counters are claimed here and the flight is checked: skip both in the triggers
+                cursor.execute("SET @skip_booking_counters = 1, @booking_checked = 1")
+                try:
+                    result = db.execute_many(
+                        "INSERT INTO Booking (Date, Seat_No, Passenger_ID, Flight_ID, Status) "
+                        "VALUES (CURRENT_DATE, %s, %s, %s, 'Booked')",
+                        [(seat_no, passenger_id, flight_id) for (passenger_id, _), seat_no in zip(members, seat_nos)]
+                    )
+                finally:
+                    cursor.execute("SET @skip_booking_counters = NULL, @booking_checked = NULL")
+
+                per_passenger = {}
+                for passenger_id, _ in members:
+                    per_passenger[passenger_id] = per_passenger.get(passenger_id, 0) + 1
+                by_count = {}
+                for passenger_id, booked in per_passenger.items():
+                    by_count.setdefault(booked, []).append(passenger_id)
+                for booked, ids in by_count.items():
+                    placeholders = ', '.join(['%s'] * len(ids))
+                    cursor.execute(
+                        f"UPDATE Passenger SET Active_Bookings = Active_Bookings + %s WHERE Passenger_ID IN ({placeholders})",
+                        [booked] + ids
+                    )
+
+            booking_ids = result['ids']
+            db.execute_many(
+                "INSERT INTO BookingAudit (Booking_ID, Operation, Details) VALUES (%s, 'INSERT', %s)",
+                [
+                    (booking_id, details or f"Group booking: seat {seat_no} for passenger {passenger_id} on flight {flight_id}")
+                    for booking_id, (passenger_id, _), seat_no in zip(booking_ids, members, seat_nos)
+                ]
+            )
+    except mysql.connector.IntegrityError as e:
+        # A seat or passenger changed under a writer that bypasses the Flight lock
+        seat_inventory.invalidate(flight_id)
+        raise GroupBookingError('PASSENGER_NOT_FOUND' if e.errno == 1452 else 'SEAT_TAKEN')
+    except GroupBookingError:
+        seat_inventory.invalidate(flight_id)
+        raise
+
+    indexes = [seat_index(seat_no, seat_map.capacity) for seat_no in seat_nos]
+    seat_inventory.record(seat_map, [index for index in indexes if index is not None])
+    return [
+        {'passenger_id': passenger_id, 'seat_no': seat_no, 'booking_id': booking_id}
+        for (passenger_id, _), seat_no, booking_id in zip(members, seat_nos, booking_ids)
+    ]
+
+def create_passenger_booking(first_name, last_name, email, phone, flight_no, seat_no):
+    """Create a passenger and book their seat through sp_CreatePassengerBooking
+
+    Two round trips: the CALL and a SELECT of its OUT parameters. Returns
+    the new Booking_ID; raises BookingError on a rejected flight, seat,
+    email or phone.
+    """
+    with db.get_cursor() as (cursor, connection):
+        cursor.execute(
+            "CALL sp_CreatePassengerBooking(%s, %s, %s, %s, %s, %s, @booking_id, @booking_error)",
+            (first_name, last_name, email, phone, flight_no, seat_no)
+        )
+        cursor.execute("SELECT @booking_id AS Booking_ID, @booking_error AS Error_Code")
+        result = cursor.fetchone()
+    code = result['Error_Code']
+    if isinstance(code, (bytes, bytearray)):
+        # User variables can come back as binary strings
+        code = code.decode()
+    if code:
+        raise BookingError(code, seat_no=seat_no)
+    if not result['Booking_ID']:
+        raise BookingError('BOOKING_FAILED')
+    return result['Booking_ID']
+
+def _legacy_book_seat(passenger_id, flight_id, seat_no, details):
+    # The previous statement sequence (status read, insert, separate audit insert). It fires
+    # today's triggers, not the old trigger's seat scan, so it only approximates the old path
+    flight = db.execute_query("SELECT Status FROM Flight WHERE Flight_ID = %s", (flight_id,), fetch_one=True)
+    if not flight or flight['Status'] == 'Cancelled':
+        raise BookingError('FLIGHT_CANCELLED')
+    with db.get_cursor() as (cursor, connection):
+        cursor.execute(
+            "INSERT INTO Booking (Date, Seat_No, Passenger_ID, Flight_ID, Status) VALUES (CURDATE(), %s, %s, %s, 'Booked')",
+            (seat_no, passenger_id, flight_id)
+        )
+        booking_id = cursor.lastrowid
+        cursor.execute(
+            "INSERT INTO BookingAudit (Booking_ID, Operation, Details) VALUES (%s, %s, %s)",
+            (booking_id, 'INSERT', details)
+        )
+    return booking_id
+
+def benchmark(flight_id, passenger_id, bookings=200, threads=8):
+    """Book seats concurrently through both write paths and print bookings per second
+
+    Run against a scratch database: it books `bookings` seats per path on the
+    flight (which needs that much free capacity) and deletes them afterwards.
+    Both paths run against the current schema and triggers, so the numbers
+    compare round trips per booking, not the old schema. To compare with the
+    old schema, load the previous trigger and procedure definitions into the
+    scratch database first.
+    """
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    for label, book, prefix in (('legacy', _legacy_book_seat, 'L'), ('sp_BookSeat', book_seat, 'S')):
+        seats = [f'{prefix}{n:05d}' for n in range(bookings)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            ids = list(pool.map(lambda seat: book(passenger_id, flight_id, seat, 'benchmark'), seats))
+        elapsed = time.perf_counter() - started
+        print(f"{label}: {bookings} bookings in {elapsed:.2f}s ({bookings / elapsed:.0f}/s, {threads} threads)")
+        placeholders = ', '.join(['%s'] * len(ids))
+        db.execute_update(f"DELETE FROM BookingAudit WHERE Booking_ID IN ({placeholders})", ids)
+        db.execute_update(f"DELETE FROM Booking WHERE Booking_ID IN ({placeholders})", ids)
+
+if __name__ == '__main__':
+    # Run from backend/: python -m database.booking FLIGHT_ID PASSENGER_ID [BOOKINGS] [THREADS]
+    import sys
+    args = [int(arg) for arg in sys.argv[1:]]
+    benchmark(*args)
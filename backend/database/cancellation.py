@@ -0,0 +1,137 @@
+import os
+import time
+from database.db import db
+from database.jobs import job_handler
+from database.versions import table_versions
+
+BULK_CANCEL_CHUNK = int(os.getenv('BULK_CANCEL_CHUNK', 200))
+BULK_CANCEL_MAX_FLIGHTS = int(os.getenv('BULK_CANCEL_MAX_FLIGHTS', 500))
+
+FLIGHT_COLUMNS = "Flight_ID, Flight_No, Departure_Time, Status, Booked_Count"
+
+def find_flights(flight_ids=None, flight_nos=None, airport_id=None, start=None, end=None):
+    """Flights to cancel, by id, by number, or touching an airport in [start, end)
+
+    The airport window matches departures from it (ix_flight_from_departure)
+    and arrivals to it (ix_flight_to_arrival).
+    """
+    if flight_ids:
+        placeholders = ', '.join(['%s'] * len(flight_ids))
+        return db.execute_query(
+            f"SELECT {FLIGHT_COLUMNS} FROM Flight WHERE Flight_ID IN ({placeholders}) ORDER BY Departure_Time, Flight_ID",
+            list(flight_ids)
+        )
+    if flight_nos:
+        placeholders = ', '.join(['%s'] * len(flight_nos))
+        return db.execute_query(
+            f"SELECT {FLIGHT_COLUMNS} FROM Flight WHERE Flight_No IN ({placeholders}) ORDER BY Departure_Time, Flight_ID",
+            list(flight_nos)
+        )
+    return db.execute_query(
+        f"""
+        SELECT {FLIGHT_COLUMNS} FROM Flight
+        WHERE From_Airport_ID = %s AND Departure_Time >= %s AND Departure_Time < %s
+        UNION
+        SELECT {FLIGHT_COLUMNS} FROM Flight
+        WHERE To_Airport_ID = %s AND Arrival_Time >= %s AND Arrival_Time < %s
+        ORDER BY Departure_Time, Flight_ID
+        """,
+        (airport_id, start, end, airport_id, start, end)
+    )
+
+def _mark_cancelled(flight_id):
+    # Short first transaction: new bookings and holds stop before any booking is touched
+    with db.transaction():
+        db.execute_update(
+            "UPDATE Flight SET Status = 'Cancelled', Held_Count = 0, Seat_Version = Seat_Version + 1 "
+            "WHERE Flight_ID = %s AND Status <> 'Cancelled'",
+            (flight_id,)
+        )
+        db.execute_update("DELETE FROM SeatHold WHERE Flight_ID = %s", (flight_id,))
+
+def cancel_flights_iter(flights, chunk_size=None, notify=True, reason=None):
+    """Cancel flights one at a time and their bookings in chunks, yielding progress
+
+    Each flight is marked Cancelled first, then sp_CancelFlightChunk cancels
+    chunk_size bookings per transaction until none are left; passenger
+    notifications are written in the same transaction as their chunk. Yields
+    a 'chunk' event after every chunk, a 'flight' event per finished flight
+    and a final 'done' event carrying the summary. Re-running it finishes a
+    partial run.
+    """
+    chunk_size = chunk_size or BULK_CANCEL_CHUNK
+    summary = {
+        'flights_total': len(flights),
+        'flights_done': 0,
+        'bookings_cancelled': 0,
+        'notifications': 0,
+        'flights': []
+    }
+    started = time.monotonic()
+    try:
+        for flight in flights:
+            result = {
+                'flight_id': flight['Flight_ID'],
+                'flight_no': flight['Flight_No'],
+                'previous_status': flight['Status'],
+                'bookings_cancelled': 0,
+                'chunks': 0
+            }
+            _mark_cancelled(flight['Flight_ID'])
+            while True:
+                rows = db.call_procedure('sp_CancelFlightChunk',
+                                         [flight['Flight_ID'], chunk_size, bool(notify), reason])
+                if not rows:
+                    break
+                result['chunks'] += 1
+                result['bookings_cancelled'] += len(rows)
+                summary['bookings_cancelled'] += len(rows)
+                if notify:
+                    summary['notifications'] += len(rows)
+                yield {
+                    'event': 'chunk',
+                    'flight_no': flight['Flight_No'],
+                    'cancelled': len(rows),
+                    'flight_cancelled': result['bookings_cancelled'],
+                    'bookings_cancelled': summary['bookings_cancelled'],
+                    'flights_done': summary['flights_done'],
+                    'flights_total': summary['flights_total']
+                }
+                if len(rows) < chunk_size:
+                    break
+            summary['flights_done'] += 1
+            summary['flights'].append(result)
+            print(f"Bulk cancel: {flight['Flight_No']} done, {result['bookings_cancelled']} bookings "
+                  f"({summary['flights_done']}/{summary['flights_total']} flights)")
+            yield dict(result, event='flight', flights_done=summary['flights_done'],
+                       flights_total=summary['flights_total'])
+    finally:
+        if summary['flights_done'] or summary['bookings_cancelled']:
+            # Also runs outside a request (jobs, CLI), where track_writes does not
+            table_versions.bump('Flight', 'Booking', 'Passenger')
+    summary['elapsed_ms'] = round((time.monotonic() - started) * 1000)
+    yield dict(summary, event='done')
+
+def cancel_flights(flights, chunk_size=None, notify=True, reason=None):
+    """Run cancel_flights_iter to the end and return its summary"""
+    summary = None
+    for event in cancel_flights_iter(flights, chunk_size, notify, reason):
+        summary = event
+    summary.pop('event', None)
+    return summary
+
+@job_handler('cancel_flights')
+def run_cancel_job(payload, job):
+    """Background bulk cancellation; safe to retry since finished work is skipped"""
+    flights = find_flights(flight_ids=payload['flight_ids'])
+    summary = None
+    for event in cancel_flights_iter(flights, payload.get('chunk_size'), payload.get('notify', True),
+                                     payload.get('reason')):
+        if event['event'] == 'done':
+            # The per-flight list goes into the result; progress keeps the totals
+            job.progress({key: value for key, value in event.items() if key != 'flights'}, force=True)
+        else:
+            job.progress(event)
+        summary = event
+    summary.pop('event', None)
+    return summary
@@ -0,0 +1,68 @@
+from database.db import db
+
+# (table, key column, counter column, booking column) for each maintained counter
+COUNTERS = [
+    ('Flight', 'Flight_ID', 'Booked_Count', 'Flight_ID'),
+    ('Passenger', 'Passenger_ID', 'Active_Bookings', 'Passenger_ID'),
+]
+
+def _drift_query(table, key, counter, booking_column):
+    return f"""
+        SELECT t.{key} AS id, t.{counter} AS stored, COALESCE(b.cnt, 0) AS actual
+        FROM {table} t
+        LEFT JOIN (
+            SELECT {booking_column}, COUNT(*) AS cnt
+            FROM Booking
+            WHERE Status = 'Booked'
+            GROUP BY {booking_column}
+        ) b ON b.{booking_column} = t.{key}
+        WHERE t.{counter} <> COALESCE(b.cnt, 0)
+    """
+
+def _repair_query(table, key, counter, booking_column):
+    return f"""
+        UPDATE {table} t
+        LEFT JOIN (
+            SELECT {booking_column}, COUNT(*) AS cnt
+            FROM Booking
+            WHERE Status = 'Booked'
+            GROUP BY {booking_column}
+        ) b ON b.{booking_column} = t.{key}
+        SET t.{counter} = COALESCE(b.cnt, 0)
+        WHERE t.{counter} <> COALESCE(b.cnt, 0)
+    """
+
+def verify_counters(repair=False, sample_size=50):
+    """Recompute the trigger-maintained booking counters and report drift
+
+    With repair=True the drifted rows are corrected in one transaction; the
+    recount happens inside the UPDATE so concurrent bookings are not lost.
+    """
+    report = {}
+    for table, key, counter, booking_column in COUNTERS:
+        # Always read the primary: replica lag would show up as false drift
+        with db.get_cursor() as (cursor, connection):
+            cursor.execute(_drift_query(table, key, counter, booking_column))
+            drifted = cursor.fetchall()
+        report[f'{table}.{counter}'] = {
+            'drifted': len(drifted),
+            'sample': drifted[:sample_size],
+            'repaired': 0
+        }
+
+    if repair and any(entry['drifted'] for entry in report.values()):
+        with db.transaction():
+            for table, key, counter, booking_column in COUNTERS:
+                entry = report[f'{table}.{counter}']
+                if entry['drifted']:
+                    entry['repaired'] = db.execute_update(_repair_query(table, key, counter, booking_column))
+
+    for name, entry in report.items():
+        if entry['drifted']:
+            print(f"Counter drift in {name}: {entry['drifted']} rows, repaired {entry['repaired']}")
+    return report
+
+if __name__ == '__main__':
+    # Run from backend/: python -m database.counters [--repair]
+    import sys
+    verify_counters(repair='--repair' in sys.argv)
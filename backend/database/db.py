@@ -1,7 +1,14 @@
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, InterfaceError, OperationalError
 import os
+import re
+import time
 from contextlib import contextmanager
+from database.pool import ConnectionPool, PoolTimeoutError
+from database.statements import StatementCache
+from database.routing import ReplicaRouter, is_read_query
+from database.stats import InstrumentedCursor, QueryStats
+from database import session as request_session
 
 class Database:
     def __init__(self):
@@ -11,47 +18,328 @@ class Database:
             'password': os.getenv('DB_PASSWORD', ''),
             'database': os.getenv('DB_NAME', 'flight_management'),
             'port': int(os.getenv('DB_PORT', 3306)),
-            'autocommit': False
+            'autocommit': False,
+            # Pooled connections must not carry unread rows into the next checkout
+            'consume_results': True
         }
-    
-    def get_connection(self):
-        """Create and return a database connection"""
+        pool_options = {
+            'min_size': int(os.getenv('DB_POOL_MIN', 1)),
+            'max_size': int(os.getenv('DB_POOL_MAX', 10)),
+            'wait_timeout': float(os.getenv('DB_POOL_TIMEOUT', 5)),
+            'idle_timeout': float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300)),
+            'ping_after': float(os.getenv('DB_POOL_PING_AFTER', 30))
+        }
+        self.pool = ConnectionPool('primary', self.config, **pool_options)
+
+        # Read replicas: DB_REPLICAS=host1[:port],host2[:port] (same credentials as the primary)
+        replicas = []
+        for address in filter(None, (a.strip() for a in os.getenv('DB_REPLICAS', '').split(','))):
+            host, _, port = address.partition(':')
+            replica_config = dict(self.config, host=host, port=int(port or self.config['port']))
+            replicas.append(ConnectionPool(f'replica:{address}', replica_config, **pool_options))
+        self.router = ReplicaRouter(
+            replicas,
+            strategy=os.getenv('DB_REPLICA_STRATEGY', 'round_robin'),
+            max_lag=float(os.getenv('DB_REPLICA_MAX_LAG', 10)),
+            check_interval=float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 5)),
+            down_cooldown=float(os.getenv('DB_REPLICA_DOWN_COOLDOWN', 30)),
+            read_your_writes=float(os.getenv('DB_READ_YOUR_WRITES_SECONDS', 5))
+        )
+
+        # Opt-in server-side prepared statements for queries marked prepared=True
+        self.prepared_statements = os.getenv('DB_PREPARED_STATEMENTS', 'false').lower() in ('1', 'true', 'yes')
+        self.statements = StatementCache(int(os.getenv('DB_STATEMENT_CACHE_SIZE', 64)))
+        self.stream_batch_size = int(os.getenv('DB_STREAM_BATCH_SIZE', 500))
+        # Upper bound for one multi-row INSERT built by execute_many; keep below max_allowed_packet
+        self.max_packet = int(os.getenv('DB_MAX_PACKET', 4 * 1024 * 1024))
+        self.bulk_batch_rows = int(os.getenv('DB_BULK_BATCH_ROWS', 1000))
+
+        # Per-statement latency histograms and slow-query ring buffer
+        self.query_stats_enabled = os.getenv('DB_QUERY_STATS', 'true').lower() in ('1', 'true', 'yes')
+        self.query_stats = QueryStats(
+            slow_threshold_ms=float(os.getenv('DB_SLOW_QUERY_MS', 200)),
+            slow_log_size=int(os.getenv('DB_SLOW_QUERY_LOG_SIZE', 100))
+        )
+
+    def get_connection(self, pool=None):
+        """Check out a pooled database connection"""
+        pool = pool or self.pool
         try:
-            connection = mysql.connector.connect(**self.config)
-            return connection
+            return pool.acquire()
         except Error as e:
-            print(f"Error connecting to MySQL: {e}")
+            print(f"Error connecting to MySQL ({pool.name}): {e}")
             raise
-    
+
+    def release_connection(self, connection, discard=False, pool=None):
+        """Return a connection obtained from get_connection to the pool"""
+        (pool or self.pool).release(connection, discard=discard)
+
+    def get_pool_stats(self):
+        """Return runtime statistics for every connection pool and replica routing"""
+        stats = {self.pool.name: self.pool.stats()}
+        for replica in self.router.replicas:
+            stats[replica.name] = replica.stats()
+        if self.router.replicas:
+            stats['routing'] = self.router.stats()
+        return stats
+
+    def _route(self, read):
+        """Pick the pool for a statement: replicas for plain reads, the primary otherwise"""
+        if not read or not self.router.replicas:
+            return self.pool
+        session = request_session.current_session()
+        if session is not None and session.in_transaction:
+            return self.pool
+        return self.router.choose(request_session.current_client_key()) or self.pool
+
+    def _checkout(self, read, session=None):
+        """Acquire a connection for the routed pool, falling back to the primary if a replica is down"""
+        pool = self._route(read)
+        try:
+            if session is not None:
+                return pool, session.get_connection(pool)
+            return pool, self.get_connection(pool)
+        except Error as e:
+            if pool is self.pool:
+                raise
+            # A saturated replica pool is busy, not down: only connection and server errors take it out
+            if not isinstance(e, PoolTimeoutError):
+                self.router.mark_down(pool, e)
+            if session is not None:
+                return self.pool, session.get_connection(self.pool)
+            return self.pool, self.get_connection(self.pool)
+
+    def get_statement_cache_stats(self):
+        """Return prepared statement cache hit/miss counters"""
+        stats = self.statements.stats()
+        stats['enabled'] = self.prepared_statements
+        return stats
+
+    def get_query_stats(self, sort='total_ms', limit=50):
+        """Return per-fingerprint latency percentiles and row counts"""
+        return {
+            'enabled': self.query_stats_enabled,
+            'since': self.query_stats.since,
+            'slow_threshold_ms': self.query_stats.slow_threshold_ms,
+            'queries': self.query_stats.summary(sort=sort, limit=limit)
+        }
+
+    def get_slow_queries(self):
+        """Return the most recent statements slower than DB_SLOW_QUERY_MS"""
+        return self.query_stats.slow_queries()
+
+    def reset_query_stats(self):
+        self.query_stats.reset()
+
+    def _instrument(self, cursor):
+        if not self.query_stats_enabled:
+            return cursor
+        return InstrumentedCursor(cursor, self.query_stats)
+
     @contextmanager
-    def get_cursor(self, dictionary=True):
-        """Context manager for database cursor"""
-        connection = self.get_connection()
-        cursor = connection.cursor(dictionary=dictionary)
+    def _measure(self, query, params=None):
+        if not self.query_stats_enabled:
+            yield _Untimed()
+            return
+        with self.query_stats.measure(query, params) as timer:
+            yield timer
+
+    def init_app(self, app):
+        """Share one connection per HTTP request across all db calls"""
+        request_session.init_app(app, self.pool)
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed db calls as a single transaction on one connection"""
+        session = request_session.current_session()
+        if session is not None:
+            with session.transaction():
+                yield
+            self.router.note_write(session.client_key)
+            return
+        with request_session.standalone_session(self.pool) as session:
+            with session.transaction():
+                yield
+        self.router.note_write(request_session.current_client_key())
+
+    @contextmanager
+    def connection_scope(self, read=False):
+        """Context manager yielding a connection that commits on success and rolls back on error
+
+        read=True allows the statement to be served by a replica.
+        """
+        session = request_session.current_session()
+        if session is not None:
+            pool, _ = self._checkout(read, session)
+            with session.connection_scope(pool) as connection:
+                yield connection
+            if pool is self.pool and not read:
+                self.router.note_write(session.client_key)
+            return
+
+        pool, connection = self._checkout(read)
+        discard = False
         try:
-            yield cursor, connection
+            yield connection
             connection.commit()
         except Exception as e:
-            connection.rollback()
+            # Broken connections are closed instead of going back to the pool
+            discard = isinstance(e, (InterfaceError, OperationalError))
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
             raise
         finally:
-            cursor.close()
-            connection.close()
-    
-    def execute_query(self, query, params=None, fetch_one=False):
-        """Execute a SELECT query and return results"""
-        with self.get_cursor() as (cursor, connection):
+            self.release_connection(connection, discard=discard, pool=pool)
+
+    @contextmanager
+    def get_cursor(self, dictionary=True, read=False):
+        """Context manager for database cursor"""
+        with self.connection_scope(read=read) as connection:
+            cursor = self._instrument(connection.cursor(dictionary=dictionary))
+            try:
+                yield cursor, connection
+            finally:
+                cursor.close()
+
+    def _use_prepared(self, prepared):
+        return self.prepared_statements and prepared
+
+    def execute_query(self, query, params=None, fetch_one=False, prepared=False):
+        """Execute a SELECT query and return results
+
+        Pass prepared=True on hot queries to run them as cached server-side
+        prepared statements when DB_PREPARED_STATEMENTS is enabled.
+        """
+        read = is_read_query(query)
+        if self._use_prepared(prepared):
+            with self.connection_scope(read=read) as connection:
+                with self._measure(query, params) as timer:
+                    rows = self.statements.execute(connection, query, params)
+                    timer.rows = len(rows)
+            if fetch_one:
+                return rows[0] if rows else None
+            return rows
+
+        with self.get_cursor(read=read) as (cursor, connection):
             cursor.execute(query, params or ())
             if fetch_one:
                 return cursor.fetchone()
             return cursor.fetchall()
-    
+
+    def stream_query(self, query, params=None, batch_size=None):
+        """Execute a SELECT on an unbuffered cursor and yield rows in batches
+
+        Uses its own pooled connection (not the request session) so the
+        connection is held only while the result is being consumed.
+        """
+        batch_size = batch_size or self.stream_batch_size
+        pool, connection = self._checkout(read=True)
+        cursor = None
+        finished = False
+        started = time.perf_counter()
+        row_count = 0
+        error = None
+        try:
+            cursor = connection.cursor(dictionary=True, buffered=False)
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                row_count += len(rows)
+                yield rows
+            connection.commit()
+            finished = True
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.query_stats_enabled:
+                # Includes the time the client spent consuming the stream
+                elapsed = (time.perf_counter() - started) * 1000
+                self.query_stats.record(query, params, elapsed, row_count, error=error)
+            if not finished:
+                # Abandoned or failed mid-stream: closing beats draining the rest of the result
+                discard = True
+            else:
+                discard = False
+                try:
+                    cursor.close()
+                except Exception:
+                    discard = True
+            self.release_connection(connection, discard=discard, pool=pool)
+
     def execute_update(self, query, params=None):
         """Execute INSERT, UPDATE, or DELETE query"""
         with self.get_cursor() as (cursor, connection):
             cursor.execute(query, params or ())
             return cursor.rowcount
-    
+
+    def _insert_batches(self, rows, max_packet):
+        """Split row indexes into batches that fit in max_packet and bulk_batch_rows"""
+        batch, size = [], 0
+        for index, row in enumerate(rows):
+            estimate = sum(_param_size(value) for value in row) + 2 * len(row) + 3
+            if batch and (size + estimate > max_packet or len(batch) >= self.bulk_batch_rows):
+                yield batch
+                batch, size = [], 0
+            batch.append(index)
+            size += estimate
+        if batch:
+            yield batch
+
+    def execute_many(self, query, rows, max_packet=None, row_errors=False):
+        """Insert many rows with multi-row INSERT statements inside one transaction
+
+        query is a single-row INSERT ... VALUES (%s, ...); rows are parameter
+        tuples. Rows are sent in batches no larger than max_packet bytes
+        (DB_MAX_PACKET). With row_errors=True a batch that fails is retried row
+        by row and the rows MySQL rejects (duplicate or missing keys, values too
+        long or out of range) are reported instead of aborting the call.
+
+        Returns {'rowcount': n, 'ids': [id or None per row], 'errors': {index: message}}
+        """
+        rows = [tuple(row) for row in rows]
+        result = {'rowcount': 0, 'ids': [None] * len(rows), 'errors': {}}
+        if not rows:
+            return result
+
+        match = _VALUES_CLAUSE.search(query)
+        if not match:
+            raise ValueError('execute_many expects an INSERT ... VALUES (...) statement')
+        head, values = query[:match.start(1)], match.group(1)
+        tail = query[match.end(1):]
+        max_packet = (max_packet or self.max_packet) - len(query)
+
+        with self.transaction():
+            with self.get_cursor(dictionary=False) as (cursor, connection):
+                for batch in self._insert_batches(rows, max_packet):
+                    statement = head + ', '.join([values] * len(batch)) + tail
+                    params = [value for index in batch for value in rows[index]]
+                    try:
+                        cursor.execute(statement, params)
+                    except ROW_ERRORS:
+                        if not row_errors:
+                            raise
+                        # InnoDB rolls back only the failed statement; isolate the offending rows
+                        for index in batch:
+                            try:
+                                cursor.execute(query, rows[index])
+                            except ROW_ERRORS as e:
+                                result['errors'][index] = e.msg
+                                continue
+                            result['ids'][index] = cursor.lastrowid
+                            result['rowcount'] += cursor.rowcount
+                        continue
+                    # A multi-row INSERT allocates consecutive auto-increment ids starting at lastrowid
+                    first_id = cursor.lastrowid
+                    for offset, index in enumerate(batch):
+                        result['ids'][index] = first_id + offset if first_id else None
+                    result['rowcount'] += cursor.rowcount
+        return result
+
     def call_procedure(self, proc_name, params=None):
         """Call a stored procedure"""
         with self.get_cursor() as (cursor, connection):
@@ -60,15 +348,34 @@ class Database:
             for result in cursor.stored_results():
                 results.extend(result.fetchall())
             return results
-    
-    def call_function(self, func_name, params):
+
+    def call_function(self, func_name, params, prepared=False):
         """Call a MySQL function and return result"""
         placeholders = ', '.join(['%s'] * len(params))
         query = f"SELECT {func_name}({placeholders}) AS result"
-        with self.get_cursor() as (cursor, connection):
+        if self._use_prepared(prepared):
+            result = self.execute_query(query, params, fetch_one=True, prepared=True)
+            return result['result'] if result else None
+        with self.get_cursor(read=True) as (cursor, connection):
             cursor.execute(query, params)
             result = cursor.fetchone()
             return result['result'] if result else None
 
+# Errors MySQL raises for one bad row (duplicate or missing key, value too long or out of range)
+ROW_ERRORS = (mysql.connector.IntegrityError, mysql.connector.DataError)
+
+_VALUES_CLAUSE = re.compile(r'\bVALUES\s*(\([^()]*\))\s*;?\s*$', re.IGNORECASE)
+
+def _param_size(value):
+    """Rough wire size of one escaped parameter"""
+    if value is None:
+        return 4
+    if isinstance(value, (bytes, bytearray)):
+        return 2 * len(value) + 2
+    return len(str(value)) + 2
+
+class _Untimed:
+    rows = None
+
 # Global database instance
-db = Database()
\ No newline at end of file
+db = Database()
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+import uuid
+from database.db import db
+from database.booking import BookingError
+from database.versions import table_versions
+
+SEAT_HOLD_TTL = int(os.getenv('SEAT_HOLD_TTL', 300))
+SEAT_HOLD_MAX_TTL = int(os.getenv('SEAT_HOLD_MAX_TTL', 900))
+SEAT_HOLD_SWEEP_INTERVAL = float(os.getenv('SEAT_HOLD_SWEEP_INTERVAL', 5))
+SEAT_HOLD_SWEEP_BATCH = int(os.getenv('SEAT_HOLD_SWEEP_BATCH', 100))
+
+def _error_code(row):
+    code = row['Error_Code']
+    if isinstance(code, (bytes, bytearray)):
+        code = code.decode()
+    return code
+
+def hold_seat(flight_id, seat_no, ttl=None):
+    """Hold a seat for ttl seconds through sp_HoldSeat
+
+    Returns the hold as a dict; the token must be presented to confirm or
+    release it. Raises BookingError when the seat or flight cannot be held.
+    """
+    ttl = SEAT_HOLD_TTL if ttl is None else ttl
+    token = uuid.uuid4().hex
+    rows = db.call_procedure('sp_HoldSeat', [flight_id, seat_no, token, ttl])
+    if not rows:
+        raise BookingError('HOLD_FAILED')
+    if _error_code(rows[0]):
+        raise BookingError(_error_code(rows[0]), seat_no=seat_no)
+    return {
+        'hold_id': rows[0]['Hold_ID'],
+        'hold_token': token,
+        'flight_id': flight_id,
+        'seat_no': seat_no,
+        'expires_at': rows[0]['Expires_At'],
+        'ttl_seconds': ttl
+    }
+
+def confirm_hold(hold_id, token, passenger_id, details=None):
+    """Book a held seat through sp_ConfirmHold and return (Booking_ID, Seat_No)"""
+    rows = db.call_procedure('sp_ConfirmHold', [hold_id, token, passenger_id, details])
+    if not rows:
+        raise BookingError('BOOKING_FAILED')
+    if _error_code(rows[0]):
+        raise BookingError(_error_code(rows[0]), seat_no=rows[0]['Seat_No'])
+    return rows[0]['Booking_ID'], rows[0]['Seat_No']
+
+def release_hold(hold_id, token):
+    """Give a hold back early; returns False when it was already gone"""
+    rows = db.call_procedure('sp_ReleaseHold', [hold_id, token])
+    return bool(rows and rows[0]['Released'])
+
+def sweep_expired_holds(batch_size=None):
+    """Release expired holds and return how many were removed
+
+    Finds flights with expired holds through ix_seathold_expiry, then lets
+    sp_ReleaseExpiredHolds clear each flight in its own short transaction.
+    """
+    batch_size = batch_size or SEAT_HOLD_SWEEP_BATCH
+    released = 0
+    while True:
+        flights = db.execute_query(
+            "SELECT DISTINCT Flight_ID FROM SeatHold WHERE Expires_At <= NOW(6) LIMIT %s",
+            (batch_size,)
+        )
+        swept = 0
+        for flight in flights:
+            with db.get_cursor(dictionary=False) as (cursor, connection):
+                result = cursor.callproc('sp_ReleaseExpiredHolds', [flight['Flight_ID'], 0])
+                swept += result[1] or 0
+        released += swept
+        # A short batch means the backlog is cleared; nothing swept means others got there first
+        if len(flights) < batch_size or not swept:
+            break
+    if released:
+        # Available seat counts in cached flight responses changed
+        table_versions.bump('Flight')
+        print(f"Released {released} expired seat holds")
+    return released
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+def start_sweeper(interval=None):
+    """Sweep expired holds every interval seconds on a daemon thread (once per process)"""
+    global _sweeper
+    interval = SEAT_HOLD_SWEEP_INTERVAL if interval is None else interval
+    if interval <= 0:
+        return
+    with _sweeper_lock:
+        if _sweeper is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    sweep_expired_holds()
+                except Exception as e:
+                    print(f"Seat hold sweep failed: {str(e)}")
+
+        _sweeper = threading.Thread(target=run, name='seat-hold-sweeper', daemon=True)
+        _sweeper.start()
+
+if __name__ == '__main__':
+    # Run from backend/ (e.g. from cron): python -m database.holds
+    sweep_expired_holds()
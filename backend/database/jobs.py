@@ -0,0 +1,288 @@
+import json
+import os
+import random
+import socket
+import threading
+import time
+from database.db import db
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 1))
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 300))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+JOB_RETRY_BASE = float(os.getenv('JOB_RETRY_BASE', 5))
+JOB_RETRY_MAX = float(os.getenv('JOB_RETRY_MAX', 600))
+JOB_PROGRESS_INTERVAL = 1.0
+
+JOB_STATUSES = ('Queued', 'Running', 'Succeeded', 'Failed')
+JOB_COLUMNS = ("Job_ID, Job_Type, Status, Progress, Result, Error, Attempts, Max_Attempts, "
+               "Run_After, Created_At, Started_At, Finished_At")
+
+# Job_Type -> handler(payload, job); handlers register with @job_handler
+JOB_HANDLERS = {}
+
+class JobError(Exception):
+    """A failure retrying cannot fix: the job fails without further attempts"""
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+def job_handler(job_type):
+    """Register a function as the handler of job_type"""
+    def register(handler):
+        JOB_HANDLERS[job_type] = handler
+        return handler
+    return register
+
+def _dumps(value):
+    return None if value is None else json.dumps(value, default=str)
+
+def _loads(value):
+    if value is None:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+_wake = threading.Event()
+
+def submit(job_type, payload, max_attempts=None, delay=0):
+    """Queue a job and return its Job_ID"""
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job type: {job_type}')
+    with db.get_cursor() as (cursor, connection):
+        cursor.execute(
+            "INSERT INTO Job (Job_Type, Payload, Max_Attempts, Run_After) "
+            "VALUES (%s, %s, %s, NOW(6) + INTERVAL %s SECOND)",
+            (job_type, _dumps(payload), max_attempts or JOB_MAX_ATTEMPTS, int(delay))
+        )
+        job_id = cursor.lastrowid
+    # Idle in-process workers pick it up now instead of at their next poll
+    _wake.set()
+    return job_id
+
+def _format(row):
+    job = {
+        'job_id': row['Job_ID'],
+        'type': row['Job_Type'],
+        'status': row['Status'],
+        'attempts': row['Attempts'],
+        'max_attempts': row['Max_Attempts'],
+        'progress': _loads(row['Progress']),
+        'result': _loads(row['Result']),
+        'error': row['Error'],
+        'created_at': row['Created_At'],
+        'started_at': row['Started_At'],
+        'finished_at': row['Finished_At']
+    }
+    if row['Status'] == 'Queued' and row['Attempts']:
+        job['retry_at'] = row['Run_After']
+    return job
+
+def get_job(job_id):
+    """A job's status, progress and result, or None"""
+    # Always the primary: a lagging replica would show a finished job as still queued
+    with db.get_cursor() as (cursor, connection):
+        cursor.execute(f"SELECT {JOB_COLUMNS} FROM Job WHERE Job_ID = %s", (job_id,))
+        row = cursor.fetchone()
+    return _format(row) if row else None
+
+def list_jobs(status=None, job_type=None, limit=50):
+    """Most recent jobs first, optionally filtered by status and type"""
+    query = f"SELECT {JOB_COLUMNS} FROM Job WHERE 1=1"
+    params = []
+    if status:
+        query += " AND Status = %s"
+        params.append(status)
+    if job_type:
+        query += " AND Job_Type = %s"
+        params.append(job_type)
+    query += " ORDER BY Job_ID DESC LIMIT %s"
+    params.append(limit)
+    with db.get_cursor() as (cursor, connection):
+        cursor.execute(query, params)
+        return [_format(row) for row in cursor.fetchall()]
+
+class JobContext:
+    """What a handler gets besides its payload: the app, ids and a progress reporter"""
+
+    def __init__(self, app, job_id, attempt, worker_id):
+        self.app = app
+        self.job_id = job_id
+        self.attempt = attempt
+        self.worker_id = worker_id
+        self._reported = 0.0
+
+    def progress(self, data, force=False):
+        """Store progress (at most once a second unless force) and extend the lease"""
+        if not force and time.monotonic() - self._reported < JOB_PROGRESS_INTERVAL:
+            return
+        self._reported = time.monotonic()
+        updated = db.execute_update(
+            "UPDATE Job SET Progress = %s, Locked_Until = NOW(6) + INTERVAL %s SECOND "
+            "WHERE Job_ID = %s AND Locked_By = %s",
+            (_dumps(data), JOB_LEASE_SECONDS, self.job_id, self.worker_id)
+        )
+        if not updated:
+            # The lease expired and the job was requeued; stop rather than run it twice
+            raise JobError('Job lease lost')
+
+    def extend_lease(self):
+        """Push Locked_Until out by JOB_LEASE_SECONDS; False when the lease is already lost"""
+        return db.execute_update(
+            "UPDATE Job SET Locked_Until = NOW(6) + INTERVAL %s SECOND WHERE Job_ID = %s AND Locked_By = %s",
+            (JOB_LEASE_SECONDS, self.job_id, self.worker_id)
+        ) > 0
+
+def _heartbeat(context, stop):
+    # Handlers that never report progress (deferred requests) still keep their lease while they run
+    while not stop.wait(JOB_LEASE_SECONDS / 3):
+        try:
+            if not context.extend_lease():
+                print(f"Job {context.job_id} lost its lease; it may run again elsewhere")
+                return
+        except Exception as e:
+            print(f"Job {context.job_id} lease heartbeat failed: {str(e)}")
+
+def _claim(worker_id):
+    """Lock the next runnable job for this worker, or return None"""
+    with db.transaction():
+        with db.get_cursor() as (cursor, connection):
+            # SKIP LOCKED: concurrent workers each take a different row instead of queueing behind one
+            cursor.execute(
+                "SELECT Job_ID, Job_Type, Payload, Attempts, Max_Attempts FROM Job "
+                "WHERE Status = 'Queued' AND Run_After <= NOW(6) "
+                "ORDER BY Run_After, Job_ID LIMIT 1 FOR UPDATE SKIP LOCKED"
+            )
+            job = cursor.fetchone()
+            if not job:
+                return None
+            cursor.execute(
+                "UPDATE Job SET Status = 'Running', Attempts = Attempts + 1, Locked_By = %s, "
+                "Locked_Until = NOW(6) + INTERVAL %s SECOND, Started_At = COALESCE(Started_At, NOW(6)) "
+                "WHERE Job_ID = %s",
+                (worker_id, JOB_LEASE_SECONDS, job['Job_ID'])
+            )
+    job['Attempts'] += 1
+    return job
+
+def _retry_delay(attempts):
+    # Exponential backoff with jitter so failed jobs do not retry in lockstep
+    delay = min(JOB_RETRY_MAX, JOB_RETRY_BASE * 2 ** (attempts - 1))
+    return max(1, int(delay * random.uniform(0.8, 1.2)))
+
+def _finish(job, worker_id, status, result=None, error=None, retry_in=0):
+    db.execute_update(
+        "UPDATE Job SET Status = %s, Result = %s, Error = %s, Run_After = NOW(6) + INTERVAL %s SECOND, "
+        "Finished_At = IF(%s IN ('Succeeded', 'Failed'), NOW(6), NULL), Locked_By = NULL, Locked_Until = NULL "
+        "WHERE Job_ID = %s AND Locked_By = %s",
+        (status, _dumps(result), error, retry_in, status, job['Job_ID'], worker_id)
+    )
+
+def run_job(app, job, worker_id):
+    """Run a claimed job and record its outcome; failures are retried with backoff"""
+    handler = JOB_HANDLERS.get(job['Job_Type'])
+    context = JobContext(app, job['Job_ID'], job['Attempts'], worker_id)
+    started = time.monotonic()
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(context, stop),
+                                 name=f"job-heartbeat-{job['Job_ID']}", daemon=True)
+    try:
+        if handler is None:
+            raise JobError(f"Unknown job type: {job['Job_Type']}")
+        heartbeat.start()
+        try:
+            result = handler(_loads(job['Payload']), context)
+        finally:
+            # Stopped before the outcome is written, so no extension races _finish
+            stop.set()
+            heartbeat.join()
+    except JobError as je:
+        print(f"Job {job['Job_ID']} ({job['Job_Type']}) failed: {str(je)}")
+        _finish(job, worker_id, 'Failed', je.result, str(je))
+        return
+    except Exception as e:
+        if job['Attempts'] < job['Max_Attempts']:
+            delay = _retry_delay(job['Attempts'])
+            print(f"Job {job['Job_ID']} ({job['Job_Type']}) attempt {job['Attempts']} failed, "
+                  f"retrying in {delay}s: {str(e)}")
+            _finish(job, worker_id, 'Queued', error=str(e), retry_in=delay)
+        else:
+            print(f"Job {job['Job_ID']} ({job['Job_Type']}) failed after {job['Attempts']} attempts: {str(e)}")
+            _finish(job, worker_id, 'Failed', error=str(e))
+        return
+    _finish(job, worker_id, 'Succeeded', result)
+    print(f"Job {job['Job_ID']} ({job['Job_Type']}) succeeded in {time.monotonic() - started:.1f}s")
+
+def requeue_expired():
+    """Give jobs of crashed or stuck workers (lease expired) back to the queue; returns how many"""
+    return db.execute_update(
+        "UPDATE Job SET "
+        "Status = IF(Attempts >= Max_Attempts, 'Failed', 'Queued'), "
+        "Finished_At = IF(Attempts >= Max_Attempts, NOW(6), NULL), "
+        "Error = 'Worker lease expired before the job finished', "
+        "Run_After = NOW(6), Locked_By = NULL, Locked_Until = NULL "
+        "WHERE Status = 'Running' AND Locked_Until < NOW(6)"
+    )
+
+_last_requeue = 0.0
+
+def _worker_loop(app, worker_id):
+    global _last_requeue
+    while True:
+        try:
+            job = _claim(worker_id)
+            if job is not None:
+                run_job(app, job, worker_id)
+                continue
+            if time.monotonic() - _last_requeue > JOB_LEASE_SECONDS / 10:
+                _last_requeue = time.monotonic()
+                requeued = requeue_expired()
+                if requeued:
+                    print(f"Requeued {requeued} jobs with expired leases")
+                    continue
+        except Exception as e:
+            print(f"Job worker {worker_id} error: {str(e)}")
+        _wake.wait(JOB_POLL_INTERVAL)
+        _wake.clear()
+
+_workers = []
+_workers_lock = threading.Lock()
+
+def start_workers(app, count=None):
+    """Run count job workers on daemon threads (once per process); returns the threads"""
+    count = JOB_WORKERS if count is None else count
+    with _workers_lock:
+        if _workers or count <= 0:
+            return list(_workers)
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        for number in range(count):
+            worker = threading.Thread(target=_worker_loop, args=(app, f'{prefix}:{number}'),
+                                      name=f'job-worker-{number}', daemon=True)
+            worker.start()
+            _workers.append(worker)
+        return list(_workers)
+
+def stats():
+    rows = db.execute_query("SELECT Status, COUNT(*) AS jobs FROM Job GROUP BY Status")
+    counts = {status: 0 for status in JOB_STATUSES}
+    counts.update({row['Status']: row['jobs'] for row in rows})
+    return {
+        'workers': len(_workers),
+        'types': sorted(JOB_HANDLERS),
+        'jobs': counts
+    }
+
+if __name__ == '__main__':
+    # A separate worker process, run from backend/: python -m database.jobs [WORKERS]
+    import sys
+    # The app registers every job handler; it must not start its own in-process pool here
+    os.environ['JOB_WORKERS'] = '0'
+    from app import app
+    from database import jobs
+    workers = jobs.start_workers(app, int(sys.argv[1]) if len(sys.argv) > 1 else max(JOB_WORKERS, 1))
+    print(f"Running {len(workers)} job workers")
+    for worker in workers:
+        worker.join()
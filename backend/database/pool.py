@@ -0,0 +1,234 @@
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import Error
+
+
+class PoolTimeoutError(Error):
+    """Raised when no connection becomes available within the wait timeout"""
+
+
+class ConnectionPool:
+    """Bounded pool of MySQL connections with idle eviction and liveness checks"""
+
+    def __init__(self, name, config, min_size=1, max_size=10, wait_timeout=5.0,
+                 idle_timeout=300.0, ping_after=30.0):
+        self.name = name
+        self.config = config
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.wait_timeout = wait_timeout
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+
+        # Idle connections as (connection, last_used) pairs, most recently used on the right
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._prefilled = False
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+        self._stats = {
+            'connects': 0,
+            'connect_errors': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_ms': 0.0,
+            'timeouts': 0,
+            'evicted_idle': 0,
+            'evicted_dead': 0,
+            'discarded': 0,
+        }
+
+    def _connect(self):
+        """Open a new physical connection"""
+        try:
+            connection = mysql.connector.connect(**self.config)
+        except Error:
+            with self._lock:
+                self._stats['connect_errors'] += 1
+            raise
+        with self._lock:
+            self._stats['connects'] += 1
+        return connection
+
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _evict_idle_locked(self, now):
+        """Drop connections idle longer than idle_timeout, keeping min_size open"""
+        evicted = []
+        # Oldest idle connections sit on the left
+        while self._idle and self._size > self.min_size:
+            connection, last_used = self._idle[0]
+            if now - last_used < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._stats['evicted_idle'] += 1
+            evicted.append(connection)
+        return evicted
+
+    def _prefill(self):
+        """Open min_size connections the first time the pool is used"""
+        with self._lock:
+            if self._prefilled:
+                return
+            self._prefilled = True
+            missing = self.min_size - self._size
+            self._size += max(0, missing)
+
+        opened = []
+        try:
+            for _ in range(max(0, missing)):
+                opened.append(self._connect())
+        except Error as e:
+            print(f"Pool {self.name}: prefill stopped early: {e}")
+        finally:
+            now = time.monotonic()
+            with self._available:
+                self._size -= max(0, missing) - len(opened)
+                for connection in opened:
+                    self._idle.append((connection, now))
+                self._available.notify_all()
+
+    def _is_alive(self, connection, last_used):
+        """Check liveness, pinging only connections that sat idle for a while"""
+        if time.monotonic() - last_used < self.ping_after:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, timeout=None):
+        """Check out a connection, waiting up to timeout seconds for one to free up"""
+        if not self._prefilled:
+            self._prefill()
+
+        timeout = self.wait_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        wait_started = None
+
+        while True:
+            evicted = []
+            candidate = None
+            create = False
+            with self._available:
+                evicted = self._evict_idle_locked(time.monotonic())
+                while True:
+                    if self._idle:
+                        candidate = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        self._in_use += 1
+                        create = True
+                        break
+
+                    # Back-pressure: wait for a release instead of opening more connections
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            msg=f"Connection pool '{self.name}' exhausted "
+                                f"({self.max_size} connections in use, waited {timeout:.1f}s)"
+                        )
+                    if not waited:
+                        waited = True
+                        wait_started = time.monotonic()
+                        self._stats['waits'] += 1
+                    self._waiting += 1
+                    try:
+                        self._available.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                self._stats['checkouts'] += 1
+                if wait_started is not None:
+                    self._stats['wait_time_ms'] += (time.monotonic() - wait_started) * 1000
+                    wait_started = None
+
+            for connection in evicted:
+                self._close_quietly(connection)
+
+            if create:
+                try:
+                    return self._connect()
+                except Exception:
+                    self._forget()
+                    raise
+
+            connection, last_used = candidate
+            if self._is_alive(connection, last_used):
+                return connection
+
+            # Dead connection: drop it and try again with the remaining budget
+            with self._lock:
+                self._stats['evicted_dead'] += 1
+            self._close_quietly(connection)
+            self._forget()
+
+    def _forget(self):
+        """Account for a checked-out connection that will not come back"""
+        with self._available:
+            self._size -= 1
+            self._in_use -= 1
+            self._available.notify()
+
+    def release(self, connection, discard=False):
+        """Return a connection to the pool, or close it if it is no longer usable"""
+        if discard:
+            self._close_quietly(connection)
+            with self._available:
+                self._stats['discarded'] += 1
+                self._size -= 1
+                self._in_use -= 1
+                self._available.notify()
+            return
+
+        with self._available:
+            self._in_use -= 1
+            self._idle.append((connection, time.monotonic()))
+            evicted = self._evict_idle_locked(time.monotonic())
+            self._available.notify()
+        for stale in evicted:
+            self._close_quietly(stale)
+
+    def close_all(self):
+        """Close every idle connection; checked-out connections close on release"""
+        with self._available:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._prefilled = False
+        for connection in idle:
+            self._close_quietly(connection)
+
+    def stats(self):
+        """Snapshot of pool counters for runtime inspection"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                'name': self.name,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'wait_timeout': self.wait_timeout,
+                'idle_timeout': self.idle_timeout,
+            })
+        snapshot['wait_time_ms'] = round(snapshot['wait_time_ms'], 3)
+        return snapshot
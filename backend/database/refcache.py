@@ -0,0 +1,127 @@
+import threading
+import time
+from database.db import db
+from database.versions import table_versions
+
+REFERENCE_TABLES = ('Airport', 'Airline')
+
+class ReferenceCache:
+    """In-process copy of the Airport and Airline tables
+
+    Reloaded whenever the TableVersion counters of either table change, so
+    writes from any worker invalidate every process's copy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = None
+        self._loaded_at = None
+        self._airports = {}
+        self._airlines = {}
+        self._airports_by_city = {}
+        self._airlines_by_name = {}
+        self.reloads = 0
+
+    def _load(self):
+        # Always the primary: a replica could hand back rows older than the version we just saw
+        with db.get_cursor() as (cursor, connection):
+            cursor.execute("SELECT Airport_ID, Name, City, Country FROM Airport")
+            airports = {row['Airport_ID']: row for row in cursor.fetchall()}
+            cursor.execute("SELECT Airline_ID, Name, Contact_Info FROM Airline")
+            airlines = {row['Airline_ID']: row for row in cursor.fetchall()}
+
+        by_city = {}
+        for airport in airports.values():
+            by_city.setdefault(airport['City'].casefold(), []).append(airport['Airport_ID'])
+        by_name = {airline['Name'].casefold(): airline['Airline_ID'] for airline in airlines.values()}
+        return airports, airlines, by_city, by_name
+
+    def _is_current(self, versions):
+        if self._loaded_at is None:
+            return False
+        if versions is None:
+            # Versions unreadable (e.g. TableVersion missing): fall back to a short TTL
+            return time.monotonic() - self._loaded_at < table_versions.check_interval
+        return versions == self._versions
+
+    def _ensure(self):
+        versions = table_versions.current(REFERENCE_TABLES)
+        if self._is_current(versions):
+            return
+        with self._lock:
+            if self._is_current(versions):
+                return
+            airports, airlines, by_city, by_name = self._load()
+            self._airports, self._airlines = airports, airlines
+            self._airports_by_city, self._airlines_by_name = by_city, by_name
+            self._versions = versions
+            self._loaded_at = time.monotonic()
+            self.reloads += 1
+
+    def airport(self, airport_id):
+        self._ensure()
+        return self._airports.get(airport_id)
+
+    def airline(self, airline_id):
+        self._ensure()
+        return self._airlines.get(airline_id)
+
+    def airports(self):
+        self._ensure()
+        return self._airports
+
+    def airlines(self):
+        self._ensure()
+        return self._airlines
+
+    def airport_ids_in_city(self, city):
+        """IDs of airports in a city (case-insensitive, like the column collation)"""
+        self._ensure()
+        return list(self._airports_by_city.get(city.strip().casefold(), []))
+
+    def city_condition(self, column, city):
+        """SQL fragment matching column against the airports of a city by ID, instead of joining Airport"""
+        ids = self.airport_ids_in_city(city)
+        if not ids:
+            return ' AND 1=0', []
+        return f" AND {column} IN ({', '.join(['%s'] * len(ids))})", ids
+
+    def airline_id_named(self, name):
+        self._ensure()
+        return self._airlines_by_name.get(name.strip().casefold())
+
+    def decorate_flight(self, row):
+        """Add Airline and From_/To_ airport columns to a row carrying the flight's IDs"""
+        self._ensure()
+        airline = self._airlines.get(row.get('Airline_ID')) or {}
+        origin = self._airports.get(row.get('From_Airport_ID')) or {}
+        destination = self._airports.get(row.get('To_Airport_ID')) or {}
+        row['Airline'] = airline.get('Name')
+        row['From_Airport'] = origin.get('Name')
+        row['From_City'] = origin.get('City')
+        row['From_Country'] = origin.get('Country')
+        row['To_Airport'] = destination.get('Name')
+        row['To_City'] = destination.get('City')
+        row['To_Country'] = destination.get('Country')
+        return row
+
+    def decorate_staff(self, row):
+        """Add Airline and Airport columns to a row carrying Airline_ID and Airport_ID"""
+        self._ensure()
+        airline = self._airlines.get(row.get('Airline_ID')) or {}
+        airport = self._airports.get(row.get('Airport_ID')) or {}
+        row['Airline'] = airline.get('Name')
+        row['Airport'] = airport.get('Name')
+        row['Airport_City'] = airport.get('City')
+        row['Airport_Country'] = airport.get('Country')
+        return row
+
+    def stats(self):
+        return {
+            'airports': len(self._airports),
+            'airlines': len(self._airlines),
+            'versions': dict(zip(REFERENCE_TABLES, self._versions)) if self._versions else None,
+            'reloads': self.reloads
+        }
+
+reference = ReferenceCache()
@@ -0,0 +1,160 @@
+import itertools
+import re
+import threading
+import time
+from mysql.connector import Error
+
+_READ_PREFIX = re.compile(r'^\s*\(?\s*(SELECT|WITH|SHOW)\b', re.IGNORECASE)
+_LOCKING_READ = re.compile(r'\bFOR\s+(UPDATE|SHARE)\b|\bLOCK\s+IN\s+SHARE\s+MODE\b', re.IGNORECASE)
+
+def is_read_query(query):
+    """True for plain SELECTs that are safe to send to a replica"""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    return bool(_READ_PREFIX.match(query)) and not _LOCKING_READ.search(query)
+
+class ReplicaRouter:
+    """Picks a healthy replica pool for reads and tracks read-your-writes windows"""
+
+    def __init__(self, replicas, strategy='round_robin', max_lag=10.0, check_interval=5.0,
+                 down_cooldown=30.0, read_your_writes=5.0):
+        self.replicas = list(replicas)
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.down_cooldown = down_cooldown
+        self.read_your_writes = read_your_writes
+
+        self._cycle = itertools.cycle(self.replicas) if self.replicas else None
+        self._lock = threading.Lock()
+        # pool name -> {'healthy', 'lag', 'checked_at', 'down_until', 'checking'}
+        self._health = {
+            pool.name: {'healthy': True, 'lag': None, 'checked_at': 0.0, 'down_until': 0.0, 'checking': False}
+            for pool in self.replicas
+        }
+        # client key -> monotonic time until which its reads stay on the primary
+        self._recent_writers = {}
+        self._stats = {'replica_reads': 0, 'primary_fallbacks': 0, 'read_your_writes': 0}
+
+    def note_write(self, client_key):
+        """Pin the client's reads to the primary for the read-your-writes window"""
+        if not self.replicas or client_key is None or self.read_your_writes <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writers[client_key] = now + self.read_your_writes
+            if len(self._recent_writers) > 10000:
+                self._recent_writers = {key: until for key, until in self._recent_writers.items() if until > now}
+
+    def _wrote_recently(self, client_key):
+        if client_key is None:
+            return False
+        with self._lock:
+            until = self._recent_writers.get(client_key)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._recent_writers[client_key]
+                return False
+            return True
+
+    def mark_down(self, pool, reason=None):
+        """Take a replica out of rotation for the cooldown period"""
+        with self._lock:
+            state = self._health[pool.name]
+            state['healthy'] = False
+            state['down_until'] = time.monotonic() + self.down_cooldown
+        print(f"Replica {pool.name} marked down: {reason}")
+
+    def _measure_lag(self, pool):
+        """Seconds behind the source, or None when replication is not running"""
+        connection = pool.acquire(timeout=1.0)
+        discard = False
+        try:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                try:
+                    cursor.execute("SHOW REPLICA STATUS")
+                except Error:
+                    # MySQL < 8.0.22
+                    cursor.execute("SHOW SLAVE STATUS")
+                status = cursor.fetchone()
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            connection.rollback()
+        except Exception:
+            discard = True
+            raise
+        finally:
+            pool.release(connection, discard=discard)
+        if not status:
+            return None
+        lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        return None if lag is None else float(lag)
+
+    def _is_usable(self, pool):
+        """Health check with a cached lag measurement, refreshed every check_interval"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._health[pool.name]
+            if not state['healthy'] and now < state['down_until']:
+                return False
+            if now - state['checked_at'] < self.check_interval or state['checking']:
+                return state['healthy']
+            state['checking'] = True
+
+        try:
+            lag = self._measure_lag(pool)
+            healthy = lag is not None and lag <= self.max_lag
+            reason = 'replication stopped' if lag is None else f'lag {lag:.0f}s'
+        except Exception as e:
+            lag, healthy, reason = None, False, str(e)
+
+        with self._lock:
+            state['checking'] = False
+            state['checked_at'] = time.monotonic()
+            state['lag'] = lag
+            state['healthy'] = healthy
+            if not healthy:
+                state['down_until'] = state['checked_at'] + min(self.down_cooldown, self.check_interval)
+        if not healthy:
+            print(f"Replica {pool.name} unusable ({reason}); reads fall back to primary")
+        return healthy
+
+    def _candidates(self):
+        if self.strategy == 'least_loaded':
+            return sorted(self.replicas, key=lambda pool: pool.stats()['in_use'])
+        with self._lock:
+            start = next(self._cycle)
+        index = self.replicas.index(start)
+        return self.replicas[index:] + self.replicas[:index]
+
+    def choose(self, client_key=None):
+        """Return a replica pool for a read, or None to use the primary"""
+        if not self.replicas:
+            return None
+        if self._wrote_recently(client_key):
+            self._count('read_your_writes')
+            return None
+        for pool in self._candidates():
+            if self._is_usable(pool):
+                self._count('replica_reads')
+                return pool
+        self._count('primary_fallbacks')
+        return None
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        """Routing counters and per-replica health"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['strategy'] = self.strategy
+            snapshot['replicas'] = {
+                name: {'healthy': state['healthy'], 'lag': state['lag']}
+                for name, state in self._health.items()
+            }
+        return snapshot
@@ -0,0 +1,229 @@
+import base64
+import os
+import re
+import threading
+from functools import lru_cache
+from database.db import db
+
+# Seat letters of one cabin row; seat index = (row - 1) * len(SEAT_LETTERS) + letter position
+SEAT_LETTERS = os.getenv('SEAT_LETTERS', 'ABCDEF').upper()
+SEAT_INVENTORY_MAX_FLIGHTS = int(os.getenv('SEAT_INVENTORY_MAX_FLIGHTS', 1024))
+
+_SEAT_PATTERN = re.compile(r'^(\d{1,3})([A-Z])$')
+
+def seat_index(seat_no, capacity):
+    """Position of a seat label like '12A' in a flight's map, or None when it is not on the map"""
+    match = _SEAT_PATTERN.match(str(seat_no).strip().upper())
+    if not match or match.group(2) not in SEAT_LETTERS:
+        return None
+    index = (int(match.group(1)) - 1) * len(SEAT_LETTERS) + SEAT_LETTERS.index(match.group(2))
+    if index < 0 or index >= capacity:
+        return None
+    return index
+
+def seat_label(index):
+    row, position = divmod(index, len(SEAT_LETTERS))
+    return f'{row + 1}{SEAT_LETTERS[position]}'
+
+@lru_cache(maxsize=256)
+def _run_starts(capacity, count):
+    # Bit i is set when seats i .. i+count-1 exist and share a row
+    width = len(SEAT_LETTERS)
+    mask = 0
+    for index in range(capacity - count + 1):
+        if index % width + count <= width:
+            mask |= 1 << index
+    return mask
+
+class SeatMap:
+    """Booked, held and blocked seats of one flight as integer bitmaps (bit i = seat index i)
+
+    Blocked seats belong to cancelled bookings: ux_booking_flight_seat still
+    holds them, so they cannot be booked again. Snapshots are immutable; the
+    inventory swaps in a new one on every change.
+    """
+
+    def __init__(self, flight_id, version, capacity, occupied, held=0, unmapped=0, flight=None, blocked=0):
+        self.flight_id = flight_id
+        self.version = version
+        self.capacity = capacity
+        self.occupied = occupied
+        self.held = held
+        self.blocked = blocked
+        self.unmapped = unmapped
+        # The Flight row read with the version: Status, Booked_Count, Held_Count
+        self.flight = flight or {}
+
+    @property
+    def status(self):
+        return self.flight.get('Status')
+
+    def booked(self):
+        return bin(self.occupied).count('1')
+
+    def is_free(self, index):
+        return not ((self.occupied | self.held | self.blocked) >> index) & 1
+
+    def find_free(self, count=1, exclude=0):
+        """Indexes of the first `count` free adjacent seats in one row, or None
+
+        Seats set in `exclude` are treated as taken.
+        """
+        if count < 1 or count > len(SEAT_LETTERS) or count > self.capacity:
+            return None
+        free = ~(self.occupied | self.held | self.blocked | exclude) & ((1 << self.capacity) - 1)
+        runs = free
+        for offset in range(1, count):
+            runs &= free >> offset
+        runs &= _run_starts(self.capacity, count)
+        if not runs:
+            return None
+        start = (runs & -runs).bit_length() - 1
+        return list(range(start, start + count))
+
+    def find_group(self, count, exclude=0):
+        """Indexes of `count` free seats seated together where possible, or None
+
+        Takes the longest adjacent run still needed (at most a row) first and
+        shrinks the run only when none is left, so a group fills whole rows
+        before it is split across partial ones.
+        """
+        width = len(SEAT_LETTERS)
+        picked = []
+        while len(picked) < count:
+            run = None
+            size = min(width, count - len(picked))
+            while size and run is None:
+                run = self.find_free(size, exclude)
+                size -= 1
+            if run is None:
+                return None
+            picked.extend(run)
+            for index in run:
+                exclude |= 1 << index
+        return picked
+
+    def with_seats(self, indexes):
+        """The map after this process booked `indexes` (one Seat_Version bump)"""
+        occupied = self.occupied
+        for index in indexes:
+            occupied |= 1 << index
+        return SeatMap(self.flight_id, self.version + 1, self.capacity, occupied,
+                       self.held, self.unmapped, self.flight, self.blocked)
+
+    def encode(self, bits):
+        """Base64 of a bitmap, little-endian: seat i is bit i % 8 of byte i // 8"""
+        size = (self.capacity + 7) // 8
+        return base64.b64encode(bits.to_bytes(size, 'little')).decode('ascii')
+
+    def to_dict(self):
+        width = len(SEAT_LETTERS)
+        # Counts come from the Flight counters, which also cover seats outside the layout
+        booked = self.flight.get('Booked_Count', self.booked() + self.unmapped)
+        held = self.flight.get('Held_Count', bin(self.held).count('1'))
+        return {
+            'flight_id': self.flight_id,
+            'status': self.status,
+            'capacity': self.capacity,
+            'seat_letters': SEAT_LETTERS,
+            'rows': (self.capacity + width - 1) // width,
+            'booked': booked,
+            'held': held,
+            'available': max(0, self.capacity - booked - held),
+            'unmapped_booked': self.unmapped,
+            'version': self.version,
+            'encoding': 'bitmap-base64-le',
+            'bitmap': self.encode(self.occupied),
+            'held_bitmap': self.encode(self.held),
+            'blocked_bitmap': self.encode(self.blocked)
+        }
+
+class SeatInventory:
+    """Per-flight seat bitmaps derived from Booking and SeatHold, kept in process
+
+    Every read checks the flight's Seat_Version (one primary-key lookup);
+    the bitmaps are rebuilt only when another writer moved it.
+    """
+
+    def __init__(self, max_flights=1024):
+        self.max_flights = max_flights
+        self._lock = threading.Lock()
+        self._maps = {}
+        self.reloads = 0
+
+    def _load(self, cursor, flight_id, version, capacity, flight):
+        cursor.execute(
+            """
+            SELECT Seat_No, IF(Status = 'Booked', 'B', 'C') AS Kind FROM Booking WHERE Flight_ID = %s
+            UNION ALL
+            SELECT Seat_No, 'H' AS Kind FROM SeatHold WHERE Flight_ID = %s AND Expires_At > NOW(6)
+            """,
+            (flight_id, flight_id)
+        )
+        occupied = 0
+        held = 0
+        blocked = 0
+        unmapped = 0
+        for row in cursor.fetchall():
+            index = seat_index(row['Seat_No'], capacity)
+            if index is None:
+                # Free-text seats outside the layout still take capacity
+                if row['Kind'] == 'B':
+                    unmapped += 1
+            elif row['Kind'] == 'B':
+                occupied |= 1 << index
+            elif row['Kind'] == 'C':
+                # Every Booking row keeps its seat in ux_booking_flight_seat, cancelled or not
+                blocked |= 1 << index
+            else:
+                held |= 1 << index
+        self.reloads += 1
+        return SeatMap(flight_id, version, capacity, occupied, held, unmapped, flight, blocked)
+
+    def current(self, flight_id, for_update=False):
+        """The flight's seat map, or None when the flight does not exist
+
+        for_update=True locks the Flight row until the caller's transaction
+        ends, so the returned map stays accurate while seats are claimed.
+        """
+        query = "SELECT Capacity, Seat_Version, Status, Booked_Count, Held_Count FROM Flight WHERE Flight_ID = %s"
+        if for_update:
+            query += " FOR UPDATE"
+        # Always the primary: a replica could hand back a version older than our own write
+        with db.get_cursor() as (cursor, connection):
+            cursor.execute(query, (flight_id,))
+            flight = cursor.fetchone()
+            if not flight:
+                return None
+            capacity = flight['Capacity'] or 0
+            cached = self._maps.get(flight_id)
+            if cached is not None and cached.version == flight['Seat_Version'] and cached.capacity == capacity:
+                return SeatMap(flight_id, cached.version, capacity, cached.occupied, cached.held,
+                               cached.unmapped, flight, cached.blocked)
+            seat_map = self._load(cursor, flight_id, flight['Seat_Version'], capacity, flight)
+        self._store(seat_map)
+        return seat_map
+
+    def _store(self, seat_map):
+        with self._lock:
+            self._maps.pop(seat_map.flight_id, None)
+            while len(self._maps) >= self.max_flights:
+                del self._maps[next(iter(self._maps))]
+            self._maps[seat_map.flight_id] = seat_map
+
+    def record(self, seat_map, indexes):
+        """Apply seats this process just booked, so the next claim needs no reload"""
+        self._store(seat_map.with_seats(indexes))
+
+    def invalidate(self, flight_id=None):
+        with self._lock:
+            if flight_id is None:
+                self._maps.clear()
+            else:
+                self._maps.pop(flight_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {'flights': len(self._maps), 'reloads': self.reloads, 'seat_letters': SEAT_LETTERS}
+
+seat_inventory = SeatInventory(max_flights=SEAT_INVENTORY_MAX_FLIGHTS)
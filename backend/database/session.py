@@ -0,0 +1,145 @@
+import threading
+from contextlib import contextmanager
+from flask import g, has_app_context, request
+from mysql.connector import InterfaceError, OperationalError
+
+class RequestSession:
+    """Pooled connections shared by every db call made during one HTTP request
+
+    Holds at most one connection per pool (the primary plus any replica
+    used for reads); transactions always run on the primary.
+    """
+
+    def __init__(self, primary, client_key=None):
+        self.primary = primary
+        self.client_key = client_key
+        self.connections = {}
+        self.in_transaction = False
+        self.connects = 0
+        self.round_trips = 0
+
+    def get_connection(self, pool=None):
+        """Check out the request's connection for a pool on first use"""
+        pool = pool or self.primary
+        entry = self.connections.get(pool.name)
+        if entry is None:
+            entry = (pool, pool.acquire())
+            self.connections[pool.name] = entry
+            self.connects += 1
+        return entry[1]
+
+    def _drop_connection(self, pool=None, discard=False):
+        pool = pool or self.primary
+        entry = self.connections.pop(pool.name, None)
+        if entry is not None:
+            entry[0].release(entry[1], discard=discard)
+
+    @contextmanager
+    def connection_scope(self, pool=None):
+        """Shared connection; commits per block unless a transaction is open"""
+        pool = pool or self.primary
+        connection = self.get_connection(pool)
+        deferred = self.in_transaction and pool is self.primary
+        self.round_trips += 1
+        try:
+            yield connection
+            if not deferred:
+                connection.commit()
+                self.round_trips += 1
+        except Exception as e:
+            broken = isinstance(e, (InterfaceError, OperationalError))
+            if not deferred:
+                try:
+                    connection.rollback()
+                except Exception:
+                    broken = True
+            if broken:
+                self._drop_connection(pool, discard=True)
+            raise
+
+    @contextmanager
+    def transaction(self):
+        """Run every db call in the block as one transaction on the primary connection"""
+        if self.in_transaction:
+            # Nested blocks join the outer transaction
+            yield self
+            return
+        connection = self.get_connection()
+        self.in_transaction = True
+        try:
+            yield self
+            connection.commit()
+            self.round_trips += 1
+        except Exception:
+            try:
+                connection.rollback()
+            except Exception:
+                self.in_transaction = False
+                self._drop_connection(discard=True)
+            raise
+        finally:
+            self.in_transaction = False
+
+    def close(self):
+        """Release every connection back to its pool at the end of the request"""
+        for name in list(self.connections):
+            pool, connection = self.connections[name]
+            discard = False
+            try:
+                # Never leak uncommitted work into the next checkout
+                if getattr(connection, 'in_transaction', True):
+                    connection.rollback()
+            except Exception:
+                discard = True
+            self._drop_connection(pool, discard=discard)
+
+_local = threading.local()
+
+def current_client_key():
+    """Identity used for read-your-writes routing of the active request"""
+    session = current_session()
+    return session.client_key if session is not None else None
+
+def current_session():
+    """Return the session bound to the active request or thread, if any"""
+    if has_app_context():
+        session = g.get('db_session')
+        if session is not None:
+            return session
+    return getattr(_local, 'session', None)
+
+@contextmanager
+def standalone_session(pool):
+    """Bind a session to the current thread for work outside an HTTP request"""
+    session = RequestSession(pool)
+    _local.session = session
+    try:
+        yield session
+    finally:
+        _local.session = None
+        session.close()
+
+def init_app(app, pool):
+    """Bind a RequestSession to flask.g for every request and release it on teardown"""
+
+    @app.before_request
+    def open_db_session():
+        # Sub-requests dispatched inside another request's app context (POST /api/batch) share its session
+        if g.get('db_session') is not None:
+            return
+        client_key = request.headers.get('X-Client-ID') or request.remote_addr
+        g.db_session = RequestSession(pool, client_key=client_key)
+
+    @app.after_request
+    def report_db_usage(response):
+        session = g.get('db_session')
+        if session is not None:
+            response.headers['X-DB-Connects'] = str(session.connects)
+            response.headers['X-DB-Round-Trips'] = str(session.round_trips)
+        return response
+
+    @app.teardown_appcontext
+    def close_db_session(error=None):
+        session = g.pop('db_session', None)
+        if session is not None:
+            session.close()
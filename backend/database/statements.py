@@ -0,0 +1,95 @@
+import threading
+import weakref
+from collections import OrderedDict
+from mysql.connector import Error
+
+# Server error raised when a statement handle no longer exists (e.g. after a reconnect)
+ER_UNKNOWN_STMT_HANDLER = 1243
+
+class StatementCache:
+    """Per-connection LRU of server-side prepared statements keyed by SQL text"""
+
+    def __init__(self, capacity=64):
+        self.capacity = max(1, capacity)
+        # connection -> OrderedDict(sql -> prepared cursor); entries vanish with the connection
+        self._caches = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'reprepares': 0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _cache_for(self, connection):
+        with self._lock:
+            cache = self._caches.get(connection)
+            if cache is None:
+                cache = OrderedDict()
+                self._caches[connection] = cache
+            return cache
+
+    def _close_quietly(self, cursor):
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+    def _checkout(self, connection, sql):
+        """Return (cursor, sql) for a cached handle, preparing a new cursor on a miss"""
+        cache = self._cache_for(connection)
+        entry = cache.get(sql)
+        if entry is not None:
+            cache.move_to_end(sql)
+            self._count('hits')
+            return entry
+
+        self._count('misses')
+        cursor = connection.cursor(prepared=True, dictionary=True)
+        # The prepared cursor only reuses its handle when it sees the identical str object again
+        entry = (cursor, sql)
+        cache[sql] = entry
+        while len(cache) > self.capacity:
+            _, (evicted, _) = cache.popitem(last=False)
+            self._close_quietly(evicted)
+            self._count('evictions')
+        return entry
+
+    def _forget(self, connection, sql):
+        cache = self._cache_for(connection)
+        entry = cache.pop(sql, None)
+        if entry is not None:
+            self._close_quietly(entry[0])
+
+    def execute(self, connection, sql, params=None):
+        """Execute sql through a cached prepared statement and return all rows"""
+        cursor, cached_sql = self._checkout(connection, sql)
+        try:
+            cursor.execute(cached_sql, tuple(params or ()))
+        except Error as e:
+            if e.errno != ER_UNKNOWN_STMT_HANDLER:
+                self._forget(connection, sql)
+                raise
+            # The server dropped the handle: prepare again once, transparently
+            self._forget(connection, sql)
+            self._count('reprepares')
+            cursor, cached_sql = self._checkout(connection, sql)
+            cursor.execute(cached_sql, tuple(params or ()))
+        return cursor.fetchall() if cursor.with_rows else []
+
+    def clear(self, connection):
+        """Deallocate every handle held for a connection"""
+        with self._lock:
+            cache = self._caches.pop(connection, None)
+        for cursor, _ in (cache or {}).values():
+            self._close_quietly(cursor)
+
+    def stats(self):
+        """Hit/miss counters plus the number of cached handles"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['connections'] = len(self._caches)
+            snapshot['cached_statements'] = sum(len(cache) for cache in self._caches.values())
+        lookups = snapshot['hits'] + snapshot['misses']
+        snapshot['hit_ratio'] = round(snapshot['hits'] / lookups, 4) if lookups else None
+        snapshot['capacity'] = self.capacity
+        return snapshot
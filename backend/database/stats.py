@@ -0,0 +1,255 @@
+import math
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+_COMMENTS = re.compile(r'/\*.*?\*/|--[^\n]*|#[^\n]*', re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBERS = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDERS = re.compile(r'%s|%\(\w+\)s|\?')
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_ROWS = re.compile(r'(\(\?\+\))(?:\s*,\s*\(\?\+\))+')
+_SPACES = re.compile(r'\s+')
+
+def fingerprint(query):
+    """Normalize a statement so calls differing only in literals or list lengths group together"""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    query = _COMMENTS.sub(' ', query)
+    query = _STRINGS.sub('?', query)
+    query = _NUMBERS.sub('?', query)
+    query = _PLACEHOLDERS.sub('?', query)
+    query = _LISTS.sub('(?+)', query)
+    query = _ROWS.sub(r'\1...', query)
+    return _SPACES.sub(' ', query).strip()
+
+def redact(params):
+    """Describe parameters by type and size only, never by value"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: redact_value(value) for key, value in params.items()}
+    try:
+        return [redact_value(value) for value in params]
+    except TypeError:
+        return redact_value(params)
+
+def redact_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (str, bytes)):
+        return f'<{type(value).__name__}:{len(value)}>'
+    return f'<{type(value).__name__}>'
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (~10% resolution) with exact count, sum and max"""
+
+    BASE_MS = 0.05
+    GROWTH = 1.1
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def _bucket(self, ms):
+        if ms <= self.BASE_MS:
+            return 0
+        return int(math.log(ms / self.BASE_MS, self.GROWTH)) + 1
+
+    def _upper_bound(self, bucket):
+        return self.BASE_MS * (self.GROWTH ** bucket)
+
+    def add(self, ms):
+        bucket = self._bucket(ms)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, pct):
+        if not self.count:
+            return None
+        rank = math.ceil(self.count * pct / 100.0)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return round(min(self._upper_bound(bucket), self.max_ms), 3)
+        return round(self.max_ms, 3)
+
+class QueryStats:
+    """Per-fingerprint latency histograms plus a ring buffer of slow statements"""
+
+    def __init__(self, slow_threshold_ms=200.0, slow_log_size=100, max_fingerprints=1000):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._slow = deque(maxlen=slow_log_size)
+        self._since = datetime.now()
+
+    def record(self, query, params, duration_ms, rows=None, error=None):
+        """Record one executed statement"""
+        key = fingerprint(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    key = '<other>'
+                    entry = self._entries.get(key)
+                if entry is None:
+                    entry = {'histogram': LatencyHistogram(), 'rows': 0, 'errors': 0}
+                    self._entries[key] = entry
+            entry['histogram'].add(duration_ms)
+            if rows is not None and rows > 0:
+                entry['rows'] += rows
+            if error is not None:
+                entry['errors'] += 1
+
+            if duration_ms >= self.slow_threshold_ms:
+                self._slow.append({
+                    'at': datetime.now().isoformat(timespec='milliseconds'),
+                    'fingerprint': key,
+                    'params': redact(params),
+                    'duration_ms': round(duration_ms, 3),
+                    'rows': rows,
+                    'error': type(error).__name__ if error is not None else None
+                })
+
+    @contextmanager
+    def measure(self, query, params=None):
+        """Time the enclosed block; set .rows on the yielded object to record the row count"""
+        timer = _Timer()
+        started = time.perf_counter()
+        try:
+            yield timer
+        except Exception as e:
+            self.record(query, params, (time.perf_counter() - started) * 1000, timer.rows, error=e)
+            raise
+        self.record(query, params, (time.perf_counter() - started) * 1000, timer.rows)
+
+    def summary(self, sort='total_ms', limit=50):
+        """Per-fingerprint count, latency percentiles and rows returned"""
+        with self._lock:
+            items = []
+            for key, entry in self._entries.items():
+                histogram = entry['histogram']
+                items.append({
+                    'fingerprint': key,
+                    'count': histogram.count,
+                    'errors': entry['errors'],
+                    'total_ms': round(histogram.total_ms, 3),
+                    'mean_ms': round(histogram.total_ms / histogram.count, 3) if histogram.count else None,
+                    'p50_ms': histogram.percentile(50),
+                    'p95_ms': histogram.percentile(95),
+                    'p99_ms': histogram.percentile(99),
+                    'max_ms': round(histogram.max_ms, 3),
+                    'rows': entry['rows'],
+                    'rows_per_call': round(entry['rows'] / histogram.count, 2) if histogram.count else None
+                })
+        if items and sort in items[0]:
+            items.sort(key=lambda item: item[sort] or 0, reverse=True)
+        return items[:limit] if limit else items
+
+    def slow_queries(self):
+        """Slowest recent statements, newest first"""
+        with self._lock:
+            return list(reversed(self._slow))
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self._slow.clear()
+            self._since = datetime.now()
+
+    @property
+    def since(self):
+        return self._since.isoformat(timespec='seconds')
+
+class _Timer:
+    rows = None
+
+class InstrumentedCursor:
+    """Cursor proxy that records every execute/callproc in QueryStats"""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+        self._pending = None
+
+    def _start(self, query, params):
+        self._finish()
+        self._pending = [query, params, time.perf_counter(), 0]
+
+    def _finish(self, error=None):
+        if self._pending is None:
+            return
+        query, params, started, rows = self._pending
+        self._pending = None
+        if not rows:
+            # Writes report affected rows instead of fetched rows
+            try:
+                affected = self._cursor.rowcount
+            except Exception:
+                affected = -1
+            rows = affected if affected and affected > 0 else rows
+        self._stats.record(query, params, (time.perf_counter() - started) * 1000, rows, error=error)
+
+    def _count(self, rows):
+        if self._pending is not None:
+            self._pending[3] += rows
+
+    def execute(self, operation, params=(), *args, **kwargs):
+        self._start(operation, params)
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        except Exception as e:
+            self._finish(error=e)
+            raise
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self._start(operation, None)
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        except Exception as e:
+            self._finish(error=e)
+            raise
+
+    def callproc(self, procname, args=(), *more, **kwargs):
+        self._start(f'CALL {procname}({", ".join(["?"] * len(args))})', args)
+        try:
+            return self._cursor.callproc(procname, args, *more, **kwargs)
+        except Exception as e:
+            self._finish(error=e)
+            raise
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._count(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._count(len(rows))
+        return rows
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
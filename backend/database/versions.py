@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+from flask import request
+from database.db import db
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Set on responses replayed from a stored copy: the handler did not run, so nothing was written
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+class TableVersions:
+    """Per-table change counters shared by every worker process through the TableVersion table
+
+    Writers bump the tables they touched; readers compare versions to decide
+    whether process-local caches are still valid. Reads of the counters are
+    themselves cached for check_interval seconds, so cross-process changes
+    become visible within that interval (same-process bumps immediately).
+    """
+
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._versions = None
+        self._fetched_at = 0.0
+        self._refreshing = False
+
+    def bump(self, *tables):
+        """Increment the version of every table written by the current operation"""
+        tables = sorted(set(tables))
+        if not tables:
+            return
+        placeholders = ', '.join(['(%s, 1)'] * len(tables))
+        try:
+            db.execute_update(
+                f"""
+                INSERT INTO TableVersion (Table_Name, Version) VALUES {placeholders}
+                ON DUPLICATE KEY UPDATE Version = Version + 1
+                """,
+                tables
+            )
+        except Exception as e:
+            print(f"Table version bump failed for {', '.join(tables)}: {e}")
+        finally:
+            # Force this process to re-read on the next lookup
+            with self._lock:
+                self._fetched_at = 0.0
+
+    def _refresh(self):
+        # Always the primary: a lagging replica would hide fresh bumps
+        with db.get_cursor() as (cursor, connection):
+            cursor.execute("SELECT Table_Name, Version FROM TableVersion")
+            return {row['Table_Name']: row['Version'] for row in cursor.fetchall()}
+
+    def current(self, tables, max_age=None):
+        """Tuple of versions for tables, or None when versions cannot be read
+
+        max_age bounds how stale the answer may be (defaults to check_interval);
+        pass 0 to always read the table.
+        """
+        max_age = self.check_interval if max_age is None else max_age
+        now = time.monotonic()
+        with self._lock:
+            fresh = self._versions is not None and now - self._fetched_at <= max_age
+            # One thread refreshes; the others keep using the previous snapshot meanwhile
+            if fresh or (self._refreshing and self._versions is not None and max_age > 0):
+                versions = self._versions
+            else:
+                versions = None
+                self._refreshing = True
+
+        if versions is None:
+            try:
+                versions = self._refresh()
+            except Exception as e:
+                print(f"Table version read failed: {e}")
+                with self._lock:
+                    self._refreshing = False
+                return None
+            with self._lock:
+                self._versions = versions
+                self._fetched_at = time.monotonic()
+                self._refreshing = False
+
+        return tuple(versions.get(table, 0) for table in tables)
+
+def track_writes(blueprint, *tables):
+    """Bump the given tables after every non-GET request handled by blueprint
+
+    Client errors (4xx) are rejected before writing; server errors still bump
+    since the handler may have committed part of its work. Handlers that
+    wrote nothing (replayed idempotent responses) carry REPLAYED_HEADER.
+    """
+
+    @blueprint.after_request
+    def bump_table_versions(response):
+        if response.headers.get(REPLAYED_HEADER):
+            return response
+        if request.method not in SAFE_METHODS and not 400 <= response.status_code < 500:
+            table_versions.bump(*tables)
+        return response
+
+    return blueprint
+
+table_versions = TableVersions(float(os.getenv('TABLE_VERSION_CHECK_INTERVAL', 1)))
@@ -0,0 +1,168 @@
+from flask import Blueprint, jsonify, request
+from database.db import db
+from database.versions import track_writes
+from database.counters import verify_counters
+from database.refcache import reference
+from database.seats import seat_inventory
+from database.holds import sweep_expired_holds
+from database.audit import audit_log
+from database import jobs
+from utils.response_cache import response_cache
+from utils.changes import prune_tombstones
+from utils.idempotency import prune_idempotency_keys
+from utils.deferred import deferrable
+
+admin_bp = Blueprint('admin', __name__)
+# Writes here invalidate cached responses computed from these tables
+track_writes(admin_bp, 'Flight', 'Passenger')
+
+@admin_bp.route('/pool', methods=['GET'])
+def get_pool_stats():
+    """Get connection pool statistics"""
+    try:
+        return jsonify({'success': True, 'data': db.get_pool_stats()}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/statements', methods=['GET'])
+def get_statement_cache_stats():
+    """Get prepared statement cache statistics"""
+    try:
+        return jsonify({'success': True, 'data': db.get_statement_cache_stats()}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/queries', methods=['GET'])
+def get_query_stats():
+    """Get per-query latency percentiles, sorted by ?sort= (default total_ms)"""
+    try:
+        sort = request.args.get('sort', 'total_ms')
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify({'success': True, 'data': db.get_query_stats(sort=sort, limit=limit)}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/slow-queries', methods=['GET'])
+def get_slow_queries():
+    """Get the most recent slow queries with redacted parameters"""
+    try:
+        return jsonify({'success': True, 'data': db.get_slow_queries()}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/queries/reset', methods=['POST'])
+def reset_query_stats():
+    """Clear query statistics and the slow-query log"""
+    try:
+        db.reset_query_stats()
+        return jsonify({'success': True, 'message': 'Query statistics reset'}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/counters', methods=['GET'])
+def verify_booking_counters():
+    """Report drift between maintained booking counters and the Booking table"""
+    try:
+        return jsonify({'success': True, 'data': verify_counters()}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/counters/repair', methods=['POST'])
+@deferrable
+def repair_booking_counters():
+    """Recompute drifted booking counters"""
+    try:
+        return jsonify({'success': True, 'data': verify_counters(repair=True)}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/reference', methods=['GET'])
+def get_reference_cache_stats():
+    """Get reference-data cache size, versions and reload count"""
+    try:
+        return jsonify({'success': True, 'data': reference.stats()}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/seat-inventory', methods=['GET'])
+def get_seat_inventory_stats():
+    """Get the number of cached seat maps and rebuilds"""
+    try:
+        return jsonify({'success': True, 'data': seat_inventory.stats()}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/holds/sweep', methods=['POST'])
+def sweep_seat_holds():
+    """Release expired seat holds now instead of waiting for the sweeper"""
+    try:
+        return jsonify({'success': True, 'released': sweep_expired_holds()}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/audit-writer', methods=['GET'])
+def get_audit_writer_stats():
+    """Get the audit writer's queue depth and written/spilled/replayed counts"""
+    try:
+        return jsonify({'success': True, 'data': audit_log.stats()}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/jobs', methods=['GET'])
+def get_job_stats():
+    """Get job counts by status, registered job types and this process's worker count"""
+    try:
+        return jsonify({'success': True, 'data': jobs.stats()}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/jobs/requeue-expired', methods=['POST'])
+def requeue_expired_jobs():
+    """Requeue (or fail, when out of attempts) running jobs whose worker lease expired"""
+    try:
+        return jsonify({'success': True, 'requeued': jobs.requeue_expired()}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/audit-writer/replay', methods=['POST'])
+def replay_audit_spill():
+    """Write audit rows spilled to disk back to MySQL now"""
+    try:
+        return jsonify({'success': True, 'replayed': audit_log.replay()}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/response-cache', methods=['GET'])
+def get_response_cache_stats():
+    """Get response cache size and hit/miss/coalesced counts"""
+    try:
+        return jsonify({'success': True, 'data': response_cache.stats()}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/response-cache/clear', methods=['POST'])
+def clear_response_cache():
+    """Drop every cached response in this worker"""
+    try:
+        response_cache.clear()
+        return jsonify({'success': True, 'message': 'Response cache cleared'}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/tombstones/prune', methods=['POST'])
+def prune_change_tombstones():
+    """Delete change-feed tombstones older than CHANGES_TOMBSTONE_RETENTION_DAYS"""
+    try:
+        removed = prune_tombstones()
+        return jsonify({'success': True, 'message': f'Removed {removed} tombstones'}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@admin_bp.route('/idempotency-keys/prune', methods=['POST'])
+def prune_expired_idempotency_keys():
+    """Delete Idempotency-Key responses and claims past their TTL"""
+    try:
+        removed = prune_idempotency_keys()
+        return jsonify({'success': True, 'message': f'Removed {removed} idempotency keys'}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -1,10 +1,16 @@
 from flask import Blueprint, request, jsonify
 from database.db import db
+from database.versions import track_writes
+from utils.etags import conditional
+from utils.changes import ChangeFeed
 import re
 
 airlines_bp = Blueprint('airlines', __name__)
+# Writes here invalidate the reference-data cache and cached responses in every worker
+track_writes(airlines_bp, 'Airline', 'Flight', 'Staff')
 
 @airlines_bp.route('/', methods=['GET'])
+@conditional('Airline')
 def get_all_airlines():
     """Get all airlines"""
     try:
@@ -19,6 +25,7 @@ def get_all_airlines():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @airlines_bp.route('/<int:airline_id>', methods=['GET'])
+@conditional('Airline')
 def get_airline(airline_id):
     """Get a specific airline by ID"""
     try:
@@ -206,6 +213,7 @@ def delete_airline(airline_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @airlines_bp.route('/<int:airline_id>/flights', methods=['GET'])
+@conditional('Airline', 'Flight', 'Airport')
 def get_airline_flights(airline_id):
     """Get all flights for a specific airline"""
     try:
@@ -240,6 +248,7 @@ def get_airline_flights(airline_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @airlines_bp.route('/<int:airline_id>/staff', methods=['GET'])
+@conditional('Airline', 'Staff', 'Airport')
 def get_airline_staff(airline_id):
     """Get all staff for a specific airline"""
     try:
@@ -268,4 +277,11 @@ def get_airline_staff(airline_id):
             'airline_name': airline['Name']
         }), 200
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+AIRLINE_CHANGES = ChangeFeed('Airline', 'al', 'Airline_ID', """
+    SELECT al.Airline_ID, al.Name, al.Contact_Info, al.Updated_At
+    FROM Airline al
+    WHERE 1=1
+""")
+AIRLINE_CHANGES.register(airlines_bp)
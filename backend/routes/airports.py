@@ -1,13 +1,36 @@
 from flask import Blueprint, request, jsonify
 from database.db import db
+from database.versions import track_writes
+from utils.pagination import Keyset, SortKey, requested_page
+from utils.dates import day_range
+from utils.response_cache import cached_response
+from utils.etags import conditional
+from utils.changes import ChangeFeed
 import re
 
 airports_bp = Blueprint('airports', __name__)
+# Writes here invalidate the reference-data cache and cached responses in every worker
+track_writes(airports_bp, 'Airport', 'Flight', 'Staff')
+
+AIRPORT_KEYSET = Keyset(
+    SortKey('a.Country', 'Country'),
+    SortKey('a.City', 'City'),
+    SortKey('a.Airport_ID', 'Airport_ID')
+)
 
 @airports_bp.route('/', methods=['GET'])
+@conditional('Airport', 'Flight', 'Staff')
 def get_all_airports():
-    """Get all airports with traffic and staff statistics"""
+    """Get all airports with traffic and staff statistics
+
+    Pass ?limit= (and the returned next_cursor as ?cursor=) to page through results.
+    """
     try:
+        try:
+            page = requested_page(AIRPORT_KEYSET)
+        except ValueError as ve:
+            return jsonify({'success': False, 'error': str(ve)}), 400
+        
         query = """
             SELECT 
                 a.Airport_ID, a.Name, a.City, a.Country,
@@ -32,9 +55,13 @@ def get_all_airports():
                 FROM Staff
                 GROUP BY Airport_ID
             ) staff ON a.Airport_ID = staff.Airport_ID
-            ORDER BY a.Country, a.City
+            WHERE 1=1
         """
-        airports = db.execute_query(query)
+        if page is not None:
+            query, params = page.apply(query, [])
+            return page.response(db.execute_query(query, params))
+        
+        airports = db.execute_query(query + AIRPORT_KEYSET.order_by())
         print(f"Retrieved {len(airports)} airports with statistics")
         return jsonify({'success': True, 'data': airports}), 200
     except Exception as e:
@@ -42,6 +69,7 @@ def get_all_airports():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @airports_bp.route('/<int:airport_id>', methods=['GET'])
+@conditional('Airport', 'Flight', 'Staff')
 def get_airport(airport_id):
     """Get a specific airport by ID with statistics"""
     try:
@@ -246,104 +274,112 @@ def delete_airport(airport_id):
     try:
         print(f"Attempting to delete airport: {airport_id}")
         
-        # Check if airport exists
-        existing_airport = db.execute_query(
-            "SELECT Name, City FROM Airport WHERE Airport_ID = %s", 
-            (airport_id,), 
-            fetch_one=True
-        )
-        if not existing_airport:
-            return jsonify({'success': False, 'error': 'Airport not found'}), 404
-        
-        # Check if airport has active flights (departures)
-        active_departures = db.execute_query(
-            """
-            SELECT COUNT(*) as count, GROUP_CONCAT(Flight_No) as flights
-            FROM Flight 
-            WHERE From_Airport_ID = %s AND Status IN ('Scheduled', 'Delayed')
-            """, 
-            (airport_id,), 
-            fetch_one=True
-        )
-        
-        if active_departures['count'] > 0:
-            return jsonify({
-                'success': False, 
-                'error': f'Cannot delete airport with {active_departures["count"]} active departure flights. Cancel or reschedule flights first.'
-            }), 400
-        
-        # Check if airport has active flights (arrivals)
-        active_arrivals = db.execute_query(
-            """
-            SELECT COUNT(*) as count, GROUP_CONCAT(Flight_No) as flights
-            FROM Flight 
-            WHERE To_Airport_ID = %s AND Status IN ('Scheduled', 'Delayed')
-            """, 
-            (airport_id,), 
-            fetch_one=True
-        )
-        
-        if active_arrivals['count'] > 0:
-            return jsonify({
-                'success': False, 
-                'error': f'Cannot delete airport with {active_arrivals["count"]} active arrival flights. Cancel or reschedule flights first.'
-            }), 400
-        
-        # Check if airport has staff
-        airport_staff = db.execute_query(
-            """
-            SELECT COUNT(*) as count, GROUP_CONCAT(CONCAT(First_Name, ' ', Last_Name)) as staff_names
-            FROM Staff 
-            WHERE Airport_ID = %s
-            """, 
-            (airport_id,), 
-            fetch_one=True
-        )
-        
-        if airport_staff['count'] > 0:
-            return jsonify({
-                'success': False, 
-                'error': f'Cannot delete airport with {airport_staff["count"]} staff members. Transfer staff to other airports first.'
-            }), 400
-        
-        # Check for any historical data that might prevent deletion
-        historical_flights = db.execute_query(
-            """
-            SELECT COUNT(*) as count 
-            FROM Flight 
-            WHERE (From_Airport_ID = %s OR To_Airport_ID = %s) 
-            AND Status IN ('Completed', 'Cancelled')
-            """, 
-            (airport_id, airport_id), 
-            fetch_one=True
-        )
-        
-        if historical_flights['count'] > 10:  # Allow some historical data
+        # Safety checks and delete share one connection and commit together
+        with db.transaction():
+            # Check if airport exists
+            existing_airport = db.execute_query(
+                "SELECT Name, City FROM Airport WHERE Airport_ID = %s", 
+                (airport_id,), 
+                fetch_one=True
+            )
+            if not existing_airport:
+                return jsonify({'success': False, 'error': 'Airport not found'}), 404
+        
+            # Check if airport has active flights (departures)
+            active_departures = db.execute_query(
+                """
+                SELECT COUNT(*) as count, GROUP_CONCAT(Flight_No) as flights
+                FROM Flight 
+                WHERE From_Airport_ID = %s AND Status IN ('Scheduled', 'Delayed')
+                """, 
+                (airport_id,), 
+                fetch_one=True
+            )
+        
+            if active_departures['count'] > 0:
+                return jsonify({
+                    'success': False, 
+                    'error': f'Cannot delete airport with {active_departures["count"]} active departure flights. Cancel or reschedule flights first.'
+                }), 400
+        
+            # Check if airport has active flights (arrivals)
+            active_arrivals = db.execute_query(
+                """
+                SELECT COUNT(*) as count, GROUP_CONCAT(Flight_No) as flights
+                FROM Flight 
+                WHERE To_Airport_ID = %s AND Status IN ('Scheduled', 'Delayed')
+                """, 
+                (airport_id,), 
+                fetch_one=True
+            )
+        
+            if active_arrivals['count'] > 0:
+                return jsonify({
+                    'success': False, 
+                    'error': f'Cannot delete airport with {active_arrivals["count"]} active arrival flights. Cancel or reschedule flights first.'
+                }), 400
+        
+            # Check if airport has staff
+            airport_staff = db.execute_query(
+                """
+                SELECT COUNT(*) as count, GROUP_CONCAT(CONCAT(First_Name, ' ', Last_Name)) as staff_names
+                FROM Staff 
+                WHERE Airport_ID = %s
+                """, 
+                (airport_id,), 
+                fetch_one=True
+            )
+        
+            if airport_staff['count'] > 0:
+                return jsonify({
+                    'success': False, 
+                    'error': f'Cannot delete airport with {airport_staff["count"]} staff members. Transfer staff to other airports first.'
+                }), 400
+        
+            # Check for any historical data that might prevent deletion
+            historical_flights = db.execute_query(
+                """
+                SELECT COUNT(*) as count 
+                FROM Flight 
+                WHERE (From_Airport_ID = %s OR To_Airport_ID = %s) 
+                AND Status IN ('Completed', 'Cancelled')
+                """, 
+                (airport_id, airport_id), 
+                fetch_one=True
+            )
+        
+            if historical_flights['count'] > 10:  # Allow some historical data
+                return jsonify({
+                    'success': False, 
+                    'error': f'Cannot delete airport with extensive flight history ({historical_flights["count"]} historical flights). Archive the airport instead.'
+                }), 400
+        
+            # All checks passed, proceed with deletion
+            query = "DELETE FROM Airport WHERE Airport_ID = %s"
+            rows_affected = db.execute_update(query, (airport_id,))
+        
+            if rows_affected == 0:
+                return jsonify({'success': False, 'error': 'Airport not found'}), 404
+        
+            print(f"Airport {existing_airport['Name']} deleted successfully")
             return jsonify({
-                'success': False, 
-                'error': f'Cannot delete airport with extensive flight history ({historical_flights["count"]} historical flights). Archive the airport instead.'
-            }), 400
-        
-        # All checks passed, proceed with deletion
-        query = "DELETE FROM Airport WHERE Airport_ID = %s"
-        rows_affected = db.execute_update(query, (airport_id,))
-        
-        if rows_affected == 0:
-            return jsonify({'success': False, 'error': 'Airport not found'}), 404
-        
-        print(f"Airport {existing_airport['Name']} deleted successfully")
-        return jsonify({
-            'success': True,
-            'message': f'Airport {existing_airport["Name"]} ({existing_airport["City"]}) deleted successfully'
-        }), 200
+                'success': True,
+                'message': f'Airport {existing_airport["Name"]} ({existing_airport["City"]}) deleted successfully'
+            }), 200
     except Exception as e:
         print(f"Error deleting airport: {str(e)}")
         return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
 
 @airports_bp.route('/<int:airport_id>/departures', methods=['GET'])
+@conditional('Airport', 'Flight', 'Airline')
 def get_airport_departures(airport_id):
-    """Get all departing flights from an airport"""
+    """Get all departing flights from an airport, optionally for ?date= or ?date_from=/?date_to="""
     try:
+        try:
+            range_sql, range_params = day_range('f.Departure_Time')
+        except ValueError as ve:
+            return jsonify({'success': False, 'error': str(ve)}), 400
+        
         # Check if airport exists
         airport_check = db.execute_query(
             "SELECT Name FROM Airport WHERE Airport_ID = %s", 
@@ -359,16 +395,15 @@ def get_airport_departures(airport_id):
                 f.Status, f.Capacity,
                 al.Name AS Airline,
                 a2.Name AS To_Airport, a2.City AS To_City,
-                COUNT(b.Booking_ID) as booked_seats
+                f.Booked_Count as booked_seats
             FROM Flight f
             JOIN Airline al ON f.Airline_ID = al.Airline_ID
             JOIN Airport a2 ON f.To_Airport_ID = a2.Airport_ID
-            LEFT JOIN Booking b ON f.Flight_ID = b.Flight_ID AND b.Status = 'Booked'
             WHERE f.From_Airport_ID = %s
-            GROUP BY f.Flight_ID
+        """ + range_sql + """
             ORDER BY f.Departure_Time
         """
-        flights = db.execute_query(query, (airport_id,))
+        flights = db.execute_query(query, [airport_id] + range_params)
         return jsonify({
             'success': True, 
             'data': flights,
@@ -378,9 +413,15 @@ def get_airport_departures(airport_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @airports_bp.route('/<int:airport_id>/arrivals', methods=['GET'])
+@conditional('Airport', 'Flight', 'Airline')
 def get_airport_arrivals(airport_id):
-    """Get all arriving flights to an airport"""
+    """Get all arriving flights to an airport, optionally for an arrival ?date= or ?date_from=/?date_to="""
     try:
+        try:
+            range_sql, range_params = day_range('f.Arrival_Time')
+        except ValueError as ve:
+            return jsonify({'success': False, 'error': str(ve)}), 400
+        
         # Check if airport exists
         airport_check = db.execute_query(
             "SELECT Name FROM Airport WHERE Airport_ID = %s", 
@@ -396,16 +437,15 @@ def get_airport_arrivals(airport_id):
                 f.Status, f.Capacity,
                 al.Name AS Airline,
                 a1.Name AS From_Airport, a1.City AS From_City,
-                COUNT(b.Booking_ID) as booked_seats
+                f.Booked_Count as booked_seats
             FROM Flight f
             JOIN Airline al ON f.Airline_ID = al.Airline_ID
             JOIN Airport a1 ON f.From_Airport_ID = a1.Airport_ID
-            LEFT JOIN Booking b ON f.Flight_ID = b.Flight_ID AND b.Status = 'Booked'
             WHERE f.To_Airport_ID = %s
-            GROUP BY f.Flight_ID
+        """ + range_sql + """
             ORDER BY f.Arrival_Time
         """
-        flights = db.execute_query(query, (airport_id,))
+        flights = db.execute_query(query, [airport_id] + range_params)
         return jsonify({
             'success': True, 
             'data': flights,
@@ -415,6 +455,7 @@ def get_airport_arrivals(airport_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @airports_bp.route('/<int:airport_id>/staff', methods=['GET'])
+@conditional('Airport', 'Staff', 'Airline')
 def get_airport_staff(airport_id):
     """Get all staff working at an airport"""
     try:
@@ -448,6 +489,8 @@ def get_airport_staff(airport_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @airports_bp.route('/statistics', methods=['GET'])
+@conditional('Airport', 'Flight', 'Staff')
+@cached_response('Airport', 'Flight', 'Staff')
 def get_airport_statistics():
     """Get overall airport statistics"""
     try:
@@ -494,4 +537,11 @@ def get_airport_statistics():
             }
         }), 200
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+AIRPORT_CHANGES = ChangeFeed('Airport', 'a', 'Airport_ID', """
+    SELECT a.Airport_ID, a.Name, a.City, a.Country, a.Updated_At
+    FROM Airport a
+    WHERE 1=1
+""")
+AIRPORT_CHANGES.register(airports_bp)
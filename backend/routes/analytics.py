@@ -1,19 +1,71 @@
 from flask import Blueprint, request, jsonify
 from database.db import db
+from database.refcache import reference
+from utils.streaming import stream_rows
+from utils.response_cache import cached_response
+from utils.etags import conditional
 
 analytics_bp = Blueprint('analytics', __name__)
 
+def _with_airline_name(row):
+    """Replace a row's Airline_ID with the airline name from the reference cache"""
+    airline = reference.airline(row.pop('Airline_ID', None)) or {}
+    row['Airline'] = airline.get('Name')
+    return row
+
+FLIGHT_STATUSES = ('Scheduled', 'Delayed', 'Cancelled', 'Completed')
+
+@analytics_bp.route('/summary', methods=['GET'])
+@conditional('Flight', 'Passenger', 'Booking', 'Airline', 'Airport', 'Staff')
+@cached_response('Flight', 'Passenger', 'Booking', 'Airline', 'Airport', 'Staff')
+def dashboard_summary():
+    """Dashboard counts and flight status breakdown in a single aggregate query"""
+    try:
+        query = """
+            SELECT 
+                COUNT(*) AS flights,
+                COUNT(CASE WHEN f.Status = 'Scheduled' THEN 1 END) AS scheduled,
+                COUNT(CASE WHEN f.Status = 'Delayed' THEN 1 END) AS delayed,
+                COUNT(CASE WHEN f.Status = 'Cancelled' THEN 1 END) AS cancelled,
+                COUNT(CASE WHEN f.Status = 'Completed' THEN 1 END) AS completed,
+                COALESCE(SUM(f.Booked_Count), 0) AS active_bookings,
+                (SELECT COUNT(*) FROM Passenger) AS passengers,
+                (SELECT COUNT(*) FROM Booking) AS bookings,
+                (SELECT COUNT(*) FROM Staff) AS staff
+            FROM Flight f
+        """
+        counts = db.execute_query(query, fetch_one=True)
+        return jsonify({
+            'success': True,
+            'data': {
+                'total_flights': counts['flights'],
+                'total_passengers': counts['passengers'],
+                'total_bookings': counts['bookings'],
+                'active_bookings': int(counts['active_bookings']),
+                # Reference tables are already in memory
+                'total_airlines': len(reference.airlines()),
+                'total_airports': len(reference.airports()),
+                'total_staff': counts['staff'],
+                'flights_by_status': {
+                    status: counts[status.lower()] for status in FLIGHT_STATUSES
+                }
+            }
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @analytics_bp.route('/above-average-bookings', methods=['GET'])
+@conditional('Flight', 'Booking', 'Airline')
+@cached_response('Flight', 'Booking', 'Airline')
 def above_average_bookings():
     """NESTED QUERY: Flights with above-average bookings"""
     try:
         query = """
             SELECT 
                 f.Flight_No,
-                al.Name AS Airline,
+                f.Airline_ID,
                 COUNT(b.Booking_ID) AS Total_Bookings
             FROM Flight f
-            JOIN Airline al ON f.Airline_ID = al.Airline_ID
             JOIN Booking b ON f.Flight_ID = b.Flight_ID
             WHERE b.Status = 'Booked'
             GROUP BY f.Flight_ID
@@ -28,14 +80,15 @@ def above_average_bookings():
             )
             ORDER BY Total_Bookings DESC
         """
-        results = db.execute_query(query)
+        results = [_with_airline_name(row) for row in db.execute_query(query)]
         return jsonify({'success': True, 'data': results}), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @analytics_bp.route('/passenger-bookings-detail', methods=['GET'])
+@conditional('Passenger', 'Booking', 'Flight', 'Airline')
 def passenger_bookings_detail():
-    """JOIN QUERY: Passenger names with flight details and airline (4-table join)"""
+    """JOIN QUERY: Passenger names with flight details and airline (streamed; airline names from the reference cache)"""
     try:
         query = """
             SELECT 
@@ -43,7 +96,7 @@ def passenger_bookings_detail():
                 p.First_Name,
                 p.Last_Name,
                 f.Flight_No,
-                al.Name AS Airline,
+                f.Airline_ID,
                 b.Seat_No,
                 b.Status AS Booking_Status,
                 f.Departure_Time,
@@ -51,52 +104,67 @@ def passenger_bookings_detail():
             FROM Passenger p
             JOIN Booking b ON p.Passenger_ID = b.Passenger_ID
             JOIN Flight f ON b.Flight_ID = f.Flight_ID
-            JOIN Airline al ON f.Airline_ID = al.Airline_ID
             ORDER BY p.First_Name, f.Flight_No
         """
-        results = db.execute_query(query)
-        return jsonify({'success': True, 'data': results}), 200
+        return stream_rows(db.stream_query(query), transform=_with_airline_name)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @analytics_bp.route('/unique-passengers-per-airline', methods=['GET'])
+@conditional('Flight', 'Booking', 'Airline')
+@cached_response('Flight', 'Booking', 'Airline')
 def unique_passengers_per_airline():
     """AGGREGATE QUERY: Airline-wise unique passenger count"""
     try:
         query = """
             SELECT 
-                al.Name AS Airline,
+                f.Airline_ID,
                 COUNT(DISTINCT b.Passenger_ID) AS Unique_Passengers
-            FROM Airline al
-            JOIN Flight f ON al.Airline_ID = f.Airline_ID
+            FROM Flight f
             JOIN Booking b ON f.Flight_ID = b.Flight_ID
             WHERE b.Status = 'Booked'
-            GROUP BY al.Airline_ID
+            GROUP BY f.Airline_ID
             ORDER BY Unique_Passengers DESC
         """
-        results = db.execute_query(query)
+        results = [_with_airline_name(row) for row in db.execute_query(query)]
         return jsonify({'success': True, 'data': results}), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @analytics_bp.route('/busiest-airports', methods=['GET'])
+@conditional('Flight', 'Airport')
+@cached_response('Flight', 'Airport')
 def busiest_airports():
     """COMPLEX AGGREGATE QUERY: Top 5 busiest airports (departures + arrivals)"""
     try:
         limit = request.args.get('limit', 5, type=int)
+        # One pass over Flight per direction; names and cities come from the reference cache
         query = """
-            SELECT 
-                a.Name AS Airport,
-                a.City,
-                (SELECT COUNT(*) FROM Flight WHERE From_Airport_ID = a.Airport_ID) AS Departures,
-                (SELECT COUNT(*) FROM Flight WHERE To_Airport_ID = a.Airport_ID) AS Arrivals,
-                ((SELECT COUNT(*) FROM Flight WHERE From_Airport_ID = a.Airport_ID) +
-                 (SELECT COUNT(*) FROM Flight WHERE To_Airport_ID = a.Airport_ID)) AS Total_Traffic
-            FROM Airport a
-            ORDER BY Total_Traffic DESC
-            LIMIT %s
+            SELECT Airport_ID, SUM(Departures) AS Departures, SUM(Arrivals) AS Arrivals
+            FROM (
+                SELECT From_Airport_ID AS Airport_ID, COUNT(*) AS Departures, 0 AS Arrivals
+                FROM Flight GROUP BY From_Airport_ID
+                UNION ALL
+                SELECT To_Airport_ID AS Airport_ID, 0 AS Departures, COUNT(*) AS Arrivals
+                FROM Flight GROUP BY To_Airport_ID
+            ) AS traffic
+            GROUP BY Airport_ID
         """
-        results = db.execute_query(query, (limit,))
+        traffic = {row['Airport_ID']: row for row in db.execute_query(query)}
+        results = []
+        for airport_id, airport in reference.airports().items():
+            counts = traffic.get(airport_id) or {}
+            departures = int(counts.get('Departures') or 0)
+            arrivals = int(counts.get('Arrivals') or 0)
+            results.append({
+                'Airport': airport['Name'],
+                'City': airport['City'],
+                'Departures': departures,
+                'Arrivals': arrivals,
+                'Total_Traffic': departures + arrivals
+            })
+        results.sort(key=lambda row: row['Total_Traffic'], reverse=True)
+        results = results[:max(limit, 0)]
         return jsonify({'success': True, 'data': results}), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
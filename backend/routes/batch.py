@@ -0,0 +1,128 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, current_app, request, jsonify
+from utils.deferred import deferrable
+
+batch_bp = Blueprint('batch', __name__)
+
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 20))
+BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', 4))
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+RETURNED_HEADERS = ('ETag', 'Cache-Control', 'X-Cache')
+
+# Shared by all batches so concurrent batches cannot drain the connection pool
+_executor = ThreadPoolExecutor(max_workers=max(BATCH_MAX_WORKERS, 1), thread_name_prefix='batch')
+
+def _parse_item(item):
+    """Validate one sub-request and normalise it to a dict"""
+    if not isinstance(item, dict):
+        raise ValueError('must be an object')
+    method = str(item.get('method', 'GET')).upper()
+    if method not in BATCH_METHODS:
+        raise ValueError(f'unsupported method {method}')
+    path = item.get('path')
+    if not isinstance(path, str) or not path.startswith('/api/'):
+        raise ValueError('path must start with /api/')
+    if path.startswith('/api/batch'):
+        raise ValueError('batches cannot be nested')
+    query = item.get('query') or None
+    if query is not None and not isinstance(query, dict):
+        raise ValueError('query must be an object')
+    headers = item.get('headers') or {}
+    if not isinstance(headers, dict):
+        raise ValueError('headers must be an object')
+    return {'method': method, 'path': path, 'query': query, 'body': item.get('body'), 'headers': headers}
+
+def _dispatch(app, item, environ_base, client_headers):
+    """Run one sub-request through the app's full request pipeline"""
+    headers = dict(client_headers)
+    headers.update(item['headers'])
+    options = {'method': item['method'], 'headers': headers, 'environ_base': environ_base}
+    if item['query'] is not None:
+        options['query_string'] = item['query']
+    if item['body'] is not None:
+        options['json'] = item['body']
+
+    with app.test_request_context(item['path'], **options):
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            print(f"Batch sub-request {item['method']} {item['path']} failed: {str(e)}")
+            return {'status': 500, 'body': {'success': False, 'error': str(e)}}
+        try:
+            # Read the body here: streamed responses still need the request context
+            body = response.get_json(silent=True)
+            if body is None:
+                body = response.get_data(as_text=True) or None
+            result = {'status': response.status_code, 'body': body}
+            headers = {name: response.headers[name] for name in RETURNED_HEADERS if name in response.headers}
+            if headers:
+                result['headers'] = headers
+            return result
+        finally:
+            response.close()
+
+def _run_lane(app, lane, environ_base, client_headers):
+    # One app context per lane: its sub-requests share a single pooled connection
+    with app.app_context():
+        return [(index, _dispatch(app, item, environ_base, client_headers)) for index, item in lane]
+
+def _run_reads(app, reads, environ_base, client_headers):
+    """Run independent GETs concurrently, spread over at most BATCH_MAX_WORKERS lanes"""
+    lanes = [reads[start::BATCH_MAX_WORKERS] for start in range(min(BATCH_MAX_WORKERS, len(reads)))]
+    if len(lanes) <= 1:
+        return [(index, _dispatch(app, item, environ_base, client_headers)) for index, item in reads]
+    futures = [_executor.submit(_run_lane, app, lane, environ_base, client_headers) for lane in lanes]
+    return [result for future in futures for result in future.result()]
+
+@batch_bp.route('/', methods=['POST'], strict_slashes=False)
+@deferrable
+def run_batch():
+    """Run several API requests in one round trip
+
+    Body: {"requests": [{"method", "path", "query", "body", "headers"}, ...]}.
+    Runs of consecutive GETs execute concurrently; writes execute one at a
+    time, in order, on this request's connection. Each item gets its own
+    status code; the batch itself answers 200 once every item has run.
+    """
+    try:
+        payload = request.get_json(silent=True)
+        items = payload.get('requests') if isinstance(payload, dict) else payload
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'error': 'Body must contain a non-empty list of requests'}), 400
+        if len(items) > BATCH_MAX_REQUESTS:
+            return jsonify({'success': False, 'error': f'At most {BATCH_MAX_REQUESTS} requests per batch'}), 400
+
+        parsed = []
+        for index, item in enumerate(items):
+            try:
+                parsed.append(_parse_item(item))
+            except ValueError as ve:
+                return jsonify({'success': False, 'error': f'Request {index}: {str(ve)}'}), 400
+
+        app = current_app._get_current_object()
+        # Sub-requests keep the caller's identity for read-your-writes routing
+        environ_base = {'REMOTE_ADDR': request.remote_addr}
+        client_headers = {}
+        if request.headers.get('X-Client-ID'):
+            client_headers['X-Client-ID'] = request.headers['X-Client-ID']
+
+        results = [None] * len(parsed)
+        index = 0
+        while index < len(parsed):
+            if parsed[index]['method'] != 'GET':
+                results[index] = _dispatch(app, parsed[index], environ_base, client_headers)
+                index += 1
+                continue
+            reads = []
+            while index < len(parsed) and parsed[index]['method'] == 'GET':
+                reads.append((index, parsed[index]))
+                index += 1
+            for read_index, result in _run_reads(app, reads, environ_base, client_headers):
+                results[read_index] = result
+
+        print(f"Batch ran {len(parsed)} requests")
+        return jsonify({'success': True, 'data': results}), 200
+    except Exception as e:
+        print(f"Error running batch: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -1,8 +1,31 @@
 from flask import Blueprint, request, jsonify
 from database.db import db
+from database.versions import track_writes
+from database.refcache import reference
+from database.booking import GROUP_BOOKING_MAX, BookingError, book_group, book_next_seat, book_seat
+from database.audit import audit_log
+from utils.streaming import stream_rows
+from utils.pagination import Keyset, SortKey, requested_page
+from utils.etags import conditional
+from utils.changes import ChangeFeed
+from utils.idempotency import idempotent
 from datetime import datetime, timedelta
 
 bookings_bp = Blueprint('bookings', __name__)
+# Writes here invalidate cached responses computed from these tables
+track_writes(bookings_bp, 'Booking', 'Flight', 'Passenger', 'BookingAudit')
+
+# Booking_Time and Op_Time are nullable: NULLs sort as the oldest value
+NULL_TIME = datetime(1000, 1, 1)
+BOOKING_KEYSET = Keyset(
+    SortKey('b.Date', 'Date', descending=True),
+    SortKey("COALESCE(b.Booking_Time, CAST('1000-01-01' AS DATETIME))", 'Booking_Time', descending=True, null_as=NULL_TIME),
+    SortKey('b.Booking_ID', 'Booking_ID', descending=True)
+)
+AUDIT_KEYSET = Keyset(
+    SortKey("COALESCE(ba.Op_Time, CAST('1000-01-01' AS DATETIME))", 'Op_Time', descending=True, null_as=NULL_TIME),
+    SortKey('ba.Audit_ID', 'Audit_ID', descending=True)
+)
 
 def convert_ist_to_utc(ist_datetime_str):
     """Convert IST datetime string to UTC for consistent frontend handling"""
@@ -26,9 +49,18 @@ def convert_ist_to_utc(ist_datetime_str):
         return ist_datetime_str
 
 @bookings_bp.route('/', methods=['GET'])
+@conditional('Booking', 'Passenger', 'Flight', 'Airline', 'Airport')
 def get_all_bookings():
-    """Get all bookings with optional filters and timezone conversion"""
+    """Get all bookings with optional filters and timezone conversion (streamed; ?format=ndjson for NDJSON)
+
+    Pass ?limit= (and the returned next_cursor as ?cursor=) to page through results.
+    """
     try:
+        try:
+            page = requested_page(BOOKING_KEYSET)
+        except ValueError as ve:
+            return jsonify({'success': False, 'error': str(ve)}), 400
+        
         status = request.args.get('status')
         passenger_id = request.args.get('passenger_id')
         flight_id = request.args.get('flight_id')
@@ -38,14 +70,10 @@ def get_all_bookings():
                 b.Booking_ID, b.Date, b.Seat_No, b.Status, b.Booking_Time,
                 p.Passenger_ID, p.First_Name, p.Last_Name, p.Email,
                 f.Flight_ID, f.Flight_No, f.Departure_Time, f.Arrival_Time,
-                al.Name AS Airline,
-                a1.City AS From_City, a2.City AS To_City
+                f.Airline_ID, f.From_Airport_ID, f.To_Airport_ID
             FROM Booking b
             JOIN Passenger p ON b.Passenger_ID = p.Passenger_ID
             JOIN Flight f ON b.Flight_ID = f.Flight_ID
-            JOIN Airline al ON f.Airline_ID = al.Airline_ID
-            JOIN Airport a1 ON f.From_Airport_ID = a1.Airport_ID
-            JOIN Airport a2 ON f.To_Airport_ID = a2.Airport_ID
             WHERE 1=1
         """
         params = []
@@ -60,22 +88,27 @@ def get_all_bookings():
             query += " AND b.Flight_ID = %s"
             params.append(flight_id)
         
-        query += " ORDER BY b.Date DESC, b.Booking_Time DESC"
-        
-        bookings = db.execute_query(query, params if params else None)
-        
-        # Convert booking times from IST to UTC for consistent frontend handling
-        for booking in bookings:
+        def convert_booking_time(booking):
+            # Convert booking times from IST to UTC for consistent frontend handling
             if booking.get('Booking_Time'):
                 booking['Booking_Time'] = convert_ist_to_utc(booking['Booking_Time'])
-                print(f"Converted booking {booking['Booking_ID']} time: {booking['Booking_Time']}")
+            # Airline and city names come from the reference cache instead of joins
+            return reference.decorate_flight(booking)
+        
+        if page is not None:
+            query, params = page.apply(query, params)
+            return page.response(db.execute_query(query, params), transform=convert_booking_time)
         
-        return jsonify({'success': True, 'data': bookings}), 200
+        query += BOOKING_KEYSET.order_by()
+        
+        # Stream in batches so large result sets never sit in memory at once
+        return stream_rows(db.stream_query(query, params if params else None), transform=convert_booking_time)
     except Exception as e:
         print(f"Error fetching bookings: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @bookings_bp.route('/<int:booking_id>', methods=['GET'])
+@conditional('Booking', 'Passenger', 'Flight', 'Airline', 'Airport')
 def get_booking(booking_id):
     """Get a specific booking by ID with timezone conversion"""
     try:
@@ -84,18 +117,13 @@ def get_booking(booking_id):
                 b.Booking_ID, b.Date, b.Seat_No, b.Status, b.Booking_Time,
                 p.Passenger_ID, p.First_Name, p.Last_Name, p.Email, p.Phone,
                 f.Flight_ID, f.Flight_No, f.Departure_Time, f.Arrival_Time, f.Status AS Flight_Status,
-                al.Name AS Airline,
-                a1.Name AS From_Airport, a1.City AS From_City,
-                a2.Name AS To_Airport, a2.City AS To_City
+                f.Airline_ID, f.From_Airport_ID, f.To_Airport_ID
             FROM Booking b
             JOIN Passenger p ON b.Passenger_ID = p.Passenger_ID
             JOIN Flight f ON b.Flight_ID = f.Flight_ID
-            JOIN Airline al ON f.Airline_ID = al.Airline_ID
-            JOIN Airport a1 ON f.From_Airport_ID = a1.Airport_ID
-            JOIN Airport a2 ON f.To_Airport_ID = a2.Airport_ID
             WHERE b.Booking_ID = %s
         """
-        booking = db.execute_query(query, (booking_id,), fetch_one=True)
+        booking = db.execute_query(query, (booking_id,), fetch_one=True, prepared=True)
         
         if not booking:
             return jsonify({'success': False, 'error': 'Booking not found'}), 404
@@ -103,6 +131,7 @@ def get_booking(booking_id):
         # Convert booking time from IST to UTC
         if booking.get('Booking_Time'):
             booking['Booking_Time'] = convert_ist_to_utc(booking['Booking_Time'])
+        reference.decorate_flight(booking)
         
         return jsonify({'success': True, 'data': booking}), 200
     except Exception as e:
@@ -110,14 +139,19 @@ def get_booking(booking_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @bookings_bp.route('/', methods=['POST'])
+@idempotent
 def create_booking():
-    """Create a new booking with trigger validation and audit logging"""
+    """Create a new booking through sp_BookSeat (errors carry a code such as SEAT_TAKEN)
+
+    Send "auto_assign": true instead of seat_no to get the first free seat.
+    """
     try:
         data = request.get_json()
         print(f"Received booking data: {data}")  # Debug log
         
-        # Validate required fields
-        required_fields = ['passenger_id', 'flight_id', 'seat_no']
+        # Validate required fields (auto_assign picks the seat instead)
+        auto_assign = bool(data.get('auto_assign'))
+        required_fields = ['passenger_id', 'flight_id'] if auto_assign else ['passenger_id', 'flight_id', 'seat_no']
         for field in required_fields:
             if field not in data:
                 error_msg = f'Missing field: {field}'
@@ -128,96 +162,102 @@ def create_booking():
         try:
             passenger_id = int(data['passenger_id'])
             flight_id = int(data['flight_id'])
-            seat_no = str(data['seat_no']).strip().upper()
+            seat_no = str(data.get('seat_no') or '').strip().upper()
         except (ValueError, TypeError) as ve:
             error_msg = 'Invalid data format for passenger_id or flight_id'
             print(f"Data type error: {error_msg}")
             return jsonify({'success': False, 'error': error_msg}), 400
         
+        if auto_assign:
+            try:
+                booking_id, seat_no = book_next_seat(passenger_id, flight_id)
+            except BookingError as be:
+                print(f"Auto-assign rejected ({be.code}): {str(be)}")
+                return jsonify(be.to_dict()), be.status
+            print(f"Booking created successfully: {booking_id} (auto-assigned seat {seat_no})")
+            return jsonify({
+                'success': True,
+                'message': f'Booking created successfully - seat {seat_no} assigned',
+                'booking_id': booking_id,
+                'seat_no': seat_no
+            }), 201
+        
         if not seat_no:
             error_msg = 'Seat number cannot be empty'
             print(f"Validation error: {error_msg}")
             return jsonify({'success': False, 'error': error_msg}), 400
+        if len(seat_no) > 10:
+            return jsonify({'success': False, 'error': 'Seat number too long (maximum 10 characters)'}), 400
 
-        # OPTION 1: Check if flight is cancelled before creating booking
-        flight_check = db.execute_query(
-            "SELECT Status, Flight_No FROM Flight WHERE Flight_ID = %s", 
-            (flight_id,), 
-            fetch_one=True
-        )
-        
-        if not flight_check:
-            error_msg = 'Selected flight does not exist'
-            print(f"Flight validation error: {error_msg}")
-            return jsonify({'success': False, 'error': error_msg}), 400
-            
-        if flight_check['Status'] == 'Cancelled':
-            error_msg = f'Cannot create booking on cancelled flight {flight_check["Flight_No"]}'
-            print(f"Cancelled flight error: {error_msg}")
-            return jsonify({'success': False, 'error': error_msg}), 400
-        
-        query = """
-            INSERT INTO Booking (Date, Seat_No, Passenger_ID, Flight_ID, Status)
-            VALUES (CURDATE(), %s, %s, %s, 'Booked')
-        """
-        params = (seat_no, passenger_id, flight_id)
-        
+        # Status check, seat claim, capacity check and audit run in one server-side call
         try:
-            with db.get_cursor() as (cursor, connection):
-                cursor.execute(query, params)
-                booking_id = cursor.lastrowid
-                
-                # Log the booking creation in audit table
-                try:
-                    cursor.execute(
-                        "INSERT INTO BookingAudit (Booking_ID, Operation, Details) VALUES (%s, %s, %s)",
-                        (booking_id, 'INSERT', f"Manual booking created - Seat {seat_no} for passenger {passenger_id} on flight {flight_id}")
-                    )
-                except Exception as audit_error:
-                    print(f"Audit logging failed (non-critical): {audit_error}")
-                    pass  # Audit is optional
-            
-            print(f"Booking created successfully: {booking_id}")
-            return jsonify({
-                'success': True,
-                'message': 'Booking created successfully',
-                'booking_id': booking_id
-            }), 201
-            
-        except Exception as insert_error:
-            error_msg = str(insert_error)
-            print(f"Database insert error: {error_msg}")  # Debug log
-            
-            # Parse trigger-specific errors with multiple patterns
-            error_lower = error_msg.lower()
-            
-            if 'seat already booked' in error_lower:
-                user_error = f'Seat {seat_no} is already booked on this flight'
-            elif 'cannot insert booking: flight cancelled' in error_lower:
-                user_error = 'Cannot book on a cancelled flight'
-            elif 'duplicate entry' in error_lower and 'ux_booking_flight_seat' in error_lower:
-                user_error = f'Seat {seat_no} is already booked on this flight'
-            elif 'foreign key constraint fails' in error_lower:
-                if 'passenger_id' in error_lower:
-                    user_error = 'Invalid passenger selected'
-                elif 'flight_id' in error_lower:
-                    user_error = 'Invalid flight selected'
-                else:
-                    user_error = 'Invalid passenger or flight selection'
-            elif 'check constraint' in error_lower:
-                user_error = 'Invalid booking data provided'
-            else:
-                # Generic database error - show more detail for debugging
-                user_error = f'Booking failed: {error_msg}'
-            
-            print(f"Returning user error: {user_error}")
-            return jsonify({'success': False, 'error': user_error}), 400
+            booking_id = book_seat(
+                passenger_id, flight_id, seat_no,
+                f"Manual booking created - Seat {seat_no} for passenger {passenger_id} on flight {flight_id}"
+            )
+        except BookingError as be:
+            print(f"Booking rejected ({be.code}): {str(be)}")
+            return jsonify(be.to_dict()), be.status
+        
+        print(f"Booking created successfully: {booking_id}")
+        return jsonify({
+            'success': True,
+            'message': 'Booking created successfully',
+            'booking_id': booking_id
+        }), 201
         
     except Exception as e:
         error_msg = f'Server error while creating booking: {str(e)}'
         print(f"General error: {error_msg}")
         return jsonify({'success': False, 'error': error_msg}), 500
 
+@bookings_bp.route('/group', methods=['POST'])
+@idempotent
+def create_group_booking():
+    """Book seats for a group of passengers on one flight, all or nothing
+
+    Body: {"flight_id", "passengers": [{"passenger_id", "seat_no" (optional)}, ...]}.
+    Passengers without a seat_no are seated together from the seat map. On
+    rejection the response lists the offending passengers under "seats".
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        passengers = data.get('passengers')
+        if 'flight_id' not in data:
+            return jsonify({'success': False, 'error': 'Missing field: flight_id'}), 400
+        if not isinstance(passengers, list) or not passengers:
+            return jsonify({'success': False, 'error': 'passengers must be a non-empty list'}), 400
+        if len(passengers) > GROUP_BOOKING_MAX:
+            return jsonify({'success': False, 'error': f'At most {GROUP_BOOKING_MAX} passengers per group'}), 400
+
+        members = []
+        try:
+            flight_id = int(data['flight_id'])
+            for passenger in passengers:
+                seat_no = str(passenger.get('seat_no') or '').strip().upper()
+                if len(seat_no) > 10:
+                    return jsonify({'success': False, 'error': 'Seat number too long (maximum 10 characters)'}), 400
+                members.append((int(passenger['passenger_id']), seat_no or None))
+        except (KeyError, ValueError, TypeError, AttributeError):
+            return jsonify({'success': False, 'error': 'flight_id and every passenger_id must be integers'}), 400
+
+        try:
+            seats = book_group(flight_id, members)
+        except BookingError as be:
+            print(f"Group booking rejected ({be.code}): {str(be)}")
+            return jsonify(be.to_dict()), be.status
+
+        print(f"Group booking created: {len(seats)} seats on flight {flight_id}")
+        return jsonify({
+            'success': True,
+            'message': f'{len(seats)} bookings created successfully',
+            'flight_id': flight_id,
+            'data': seats
+        }), 201
+    except Exception as e:
+        print(f"Error creating group booking: {str(e)}")
+        return jsonify({'success': False, 'error': f'Server error while creating group booking: {str(e)}'}), 500
+
 @bookings_bp.route('/<int:booking_id>', methods=['PUT'])
 def update_booking(booking_id):
     """Update an existing booking with audit logging"""
@@ -273,18 +313,10 @@ def update_booking(booking_id):
                     error_msg = 'No changes detected. Please modify at least one field'
                     print(f"Update error: {error_msg}")
                     return jsonify({'success': False, 'error': error_msg}), 404
-                
-                # Log the update in audit table
-                try:
-                    details = f"Updated booking {booking_id}: " + ", ".join([f"{field.split('=')[0].strip()}: {params[i]}" for i, field in enumerate(update_fields)])
-                    cursor.execute(
-                        "INSERT INTO BookingAudit (Booking_ID, Operation, Details) VALUES (%s, %s, %s)",
-                        (booking_id, 'UPDATE', details)
-                    )
-                except Exception as audit_error:
-                    print(f"Audit logging failed (non-critical): {audit_error}")
-                    pass
         
+            # Audit rows are written in the background (non-critical)
+            details = f"Updated booking {booking_id}: " + ", ".join([f"{field.split('=')[0].strip()}: {params[i]}" for i, field in enumerate(update_fields)])
+            audit_log.booking(booking_id, 'UPDATE', details)
             print(f"Booking {booking_id} updated successfully")
             return jsonify({
                 'success': True,
@@ -296,9 +328,7 @@ def update_booking(booking_id):
             error_lower = error_msg.lower()
             print(f"Database update error: {error_msg}")
             
-            if 'seat already booked' in error_lower:
-                user_error = 'New seat is already booked on this flight'
-            elif 'duplicate entry' in error_lower and 'ux_booking_flight_seat' in error_lower:
+            if 'duplicate entry' in error_lower and 'ux_booking_flight_seat' in error_lower:
                 user_error = 'New seat is already booked on this flight'
             else:
                 user_error = f'Update failed: {error_msg}'
@@ -329,25 +359,16 @@ def delete_booking(booking_id):
             print(f"Delete error: {error_msg}")
             return jsonify({'success': False, 'error': error_msg}), 404
         
-        with db.get_cursor() as (cursor, connection):
-            # Log the deletion in audit table before deleting
-            try:
-                cursor.execute(
-                    "INSERT INTO BookingAudit (Booking_ID, Operation, Details) VALUES (%s, %s, %s)",
-                    (booking_id, 'DELETE', f"Deleted booking - Passenger: {booking_details['Passenger_ID']}, Flight: {booking_details['Flight_ID']}, Seat: {booking_details['Seat_No']}")
-                )
-            except Exception as audit_error:
-                print(f"Audit logging failed (non-critical): {audit_error}")
-                pass
-            
-            # Delete the booking
-            cursor.execute("DELETE FROM Booking WHERE Booking_ID = %s", (booking_id,))
-            
-            if cursor.rowcount == 0:
-                error_msg = 'Booking not found or already deleted'
-                print(f"Delete error: {error_msg}")
-                return jsonify({'success': False, 'error': error_msg}), 404
+        if db.execute_update("DELETE FROM Booking WHERE Booking_ID = %s", (booking_id,)) == 0:
+            error_msg = 'Booking not found or already deleted'
+            print(f"Delete error: {error_msg}")
+            return jsonify({'success': False, 'error': error_msg}), 404
         
+        # Audit rows are written in the background (non-critical)
+        audit_log.booking(
+            booking_id, 'DELETE',
+            f"Deleted booking - Passenger: {booking_details['Passenger_ID']}, Flight: {booking_details['Flight_ID']}, Seat: {booking_details['Seat_No']}"
+        )
         print(f"Booking {booking_id} deleted successfully")
         return jsonify({
             'success': True,
@@ -359,26 +380,56 @@ def delete_booking(booking_id):
         return jsonify({'success': False, 'error': error_msg}), 500
 
 @bookings_bp.route('/audit', methods=['GET'])
+@conditional('BookingAudit')
 def get_booking_audit():
-    """Get booking audit log with timezone conversion"""
+    """Get booking audit log with timezone conversion
+
+    Returns the latest 100 entries; pass ?limit= (and the returned
+    next_cursor as ?cursor=) to page through the whole log.
+    """
     try:
+        try:
+            page = requested_page(AUDIT_KEYSET)
+        except ValueError as ve:
+            return jsonify({'success': False, 'error': str(ve)}), 400
+        
         query = """
             SELECT 
                 ba.Audit_ID, ba.Booking_ID, ba.Operation, ba.Op_Time, ba.Details
             FROM BookingAudit ba
-            ORDER BY ba.Op_Time DESC
-            LIMIT 100
+            WHERE 1=1
         """
-        audit_logs = db.execute_query(query)
         
-        # Convert audit timestamps from IST to UTC
-        for log in audit_logs:
+        def convert_op_time(log):
+            # Convert audit timestamps from IST to UTC
             if log.get('Op_Time'):
                 log['Op_Time'] = convert_ist_to_utc(log['Op_Time'])
+            return log
+        
+        if page is not None:
+            query, params = page.apply(query, [])
+            return page.response(db.execute_query(query, params), transform=convert_op_time)
+        
+        query += AUDIT_KEYSET.order_by() + " LIMIT 100"
+        audit_logs = [convert_op_time(log) for log in db.execute_query(query)]
         
         print(f"Retrieved {len(audit_logs)} audit log entries with timezone conversion")
         return jsonify({'success': True, 'data': audit_logs}), 200
     except Exception as e:
         error_msg = f'Error fetching audit logs: {str(e)}'
         print(f"Audit fetch error: {error_msg}")
-        return jsonify({'success': False, 'error': error_msg}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': error_msg}), 500
+
+def convert_change_time(booking):
+    """Convert a change-feed booking's Booking_Time from IST to UTC"""
+    booking['Booking_Time'] = convert_ist_to_utc(booking['Booking_Time'])
+    return booking
+
+BOOKING_CHANGES = ChangeFeed('Booking', 'b', 'Booking_ID', """
+    SELECT
+        b.Booking_ID, b.Date, b.Seat_No, b.Status, b.Booking_Time,
+        b.Passenger_ID, b.Flight_ID, b.Updated_At
+    FROM Booking b
+    WHERE 1=1
+""", transform=convert_change_time)
+BOOKING_CHANGES.register(bookings_bp)
@@ -1,34 +1,52 @@
 from flask import Blueprint, request, jsonify
 from database.db import db
+from database.versions import track_writes
+from database.refcache import reference
+from database.seats import seat_inventory
+from database.cancellation import BULK_CANCEL_MAX_FLIGHTS, cancel_flights, cancel_flights_iter, find_flights
+from database.jobs import submit
 from datetime import datetime
+from utils.bulk import find_existing, insert_valid_rows, read_bulk_rows
+from utils.pagination import Keyset, SortKey, requested_page
+from utils.dates import day_range
+from utils.streaming import stream_rows, wants_ndjson
+from utils.deferred import accepted, deferrable, wants_async
+from utils.response_cache import cached_response
+from utils.etags import conditional
+from utils.changes import ChangeFeed
 
 flights_bp = Blueprint('flights', __name__)
+# Writes here invalidate cached responses computed from these tables
+track_writes(flights_bp, 'Flight', 'Booking', 'Passenger')
+
+FLIGHT_KEYSET = Keyset(SortKey('f.Departure_Time', 'Departure_Time'), SortKey('f.Flight_ID', 'Flight_ID'))
+# Flight.Status ENUM values
+FLIGHT_STATUSES = ('Scheduled', 'Delayed', 'Cancelled', 'Completed')
 
 @flights_bp.route('/', methods=['GET'])
+@conditional('Flight', 'Airline', 'Airport')
 def get_all_flights():
-    """Get all flights with optional filters and available seats calculation"""
+    """Get all flights with optional filters and available seats calculation
+
+    Pass ?limit= (and the returned next_cursor as ?cursor=) to page through results.
+    """
     try:
+        try:
+            page = requested_page(FLIGHT_KEYSET)
+        except ValueError as ve:
+            return jsonify({'success': False, 'error': str(ve)}), 400
+        
         # Get query parameters for filtering
         status = request.args.get('status')
         from_city = request.args.get('from_city')
         to_city = request.args.get('to_city')
-        date = request.args.get('date')
         
         query = """
             SELECT 
                 f.Flight_ID, f.Flight_No, f.Departure_Time, f.Arrival_Time, f.Status,
-                f.Capacity,
-                al.Name AS Airline,
-                a1.Name AS From_Airport, a1.City AS From_City, a1.Country AS From_Country,
-                a2.Name AS To_Airport, a2.City AS To_City, a2.Country AS To_Country,
-                (f.Capacity - COALESCE((
-                    SELECT COUNT(*) FROM Booking b 
-                    WHERE b.Flight_ID = f.Flight_ID AND b.Status = 'Booked'
-                ), 0)) AS available_seats
+                f.Capacity, f.Airline_ID, f.From_Airport_ID, f.To_Airport_ID,
+                (f.Capacity - f.Booked_Count - f.Held_Count) AS available_seats
             FROM Flight f
-            JOIN Airline al ON f.Airline_ID = al.Airline_ID
-            JOIN Airport a1 ON f.From_Airport_ID = a1.Airport_ID
-            JOIN Airport a2 ON f.To_Airport_ID = a2.Airport_ID
             WHERE 1=1
         """
         params = []
@@ -36,51 +54,55 @@ def get_all_flights():
         if status:
             query += " AND f.Status = %s"
             params.append(status)
+        # Airline and airport columns come from the reference cache instead of joins
         if from_city:
-            query += " AND a1.City = %s"
-            params.append(from_city)
+            city_sql, city_params = reference.city_condition('f.From_Airport_ID', from_city)
+            query += city_sql
+            params.extend(city_params)
         if to_city:
-            query += " AND a2.City = %s"
-            params.append(to_city)
-        if date:
-            query += " AND DATE(f.Departure_Time) = %s"
-            params.append(date)
+            city_sql, city_params = reference.city_condition('f.To_Airport_ID', to_city)
+            query += city_sql
+            params.extend(city_params)
         
-        query += " ORDER BY f.Departure_Time"
+        # ?date= or ?date_from=/?date_to= as an index-friendly Departure_Time range
+        try:
+            range_sql, range_params = day_range('f.Departure_Time')
+        except ValueError as ve:
+            return jsonify({'success': False, 'error': str(ve)}), 400
+        query += range_sql
+        params.extend(range_params)
+        
+        if page is not None:
+            query, params = page.apply(query, params)
+            return page.response(db.execute_query(query, params, prepared=True), transform=reference.decorate_flight)
+        
+        query += FLIGHT_KEYSET.order_by()
         
-        flights = db.execute_query(query, params if params else None)
+        flights = db.execute_query(query, params if params else None, prepared=True)
+        flights = [reference.decorate_flight(flight) for flight in flights]
         return jsonify({'success': True, 'data': flights}), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @flights_bp.route('/<int:flight_id>', methods=['GET'])
+@conditional('Flight', 'Airline', 'Airport')
 def get_flight(flight_id):
     """Get a specific flight by ID with available seats"""
     try:
         query = """
             SELECT 
                 f.Flight_ID, f.Flight_No, f.Departure_Time, f.Arrival_Time, f.Status,
-                f.Capacity,
-                al.Airline_ID, al.Name AS Airline,
-                a1.Airport_ID AS From_Airport_ID, a1.Name AS From_Airport, 
-                a1.City AS From_City, a1.Country AS From_Country,
-                a2.Airport_ID AS To_Airport_ID, a2.Name AS To_Airport, 
-                a2.City AS To_City, a2.Country AS To_Country,
-                (f.Capacity - COALESCE((
-                    SELECT COUNT(*) FROM Booking b 
-                    WHERE b.Flight_ID = f.Flight_ID AND b.Status = 'Booked'
-                ), 0)) AS available_seats
+                f.Capacity, f.Airline_ID, f.From_Airport_ID, f.To_Airport_ID,
+                (f.Capacity - f.Booked_Count - f.Held_Count) AS available_seats
             FROM Flight f
-            JOIN Airline al ON f.Airline_ID = al.Airline_ID
-            JOIN Airport a1 ON f.From_Airport_ID = a1.Airport_ID
-            JOIN Airport a2 ON f.To_Airport_ID = a2.Airport_ID
             WHERE f.Flight_ID = %s
         """
-        flight = db.execute_query(query, (flight_id,), fetch_one=True)
+        flight = db.execute_query(query, (flight_id,), fetch_one=True, prepared=True)
         
         if not flight:
             return jsonify({'success': False, 'error': 'Flight not found'}), 404
         
+        reference.decorate_flight(flight)
         return jsonify({'success': True, 'data': flight}), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -149,74 +171,151 @@ def create_flight():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@flights_bp.route('/bulk', methods=['POST'])
+@deferrable
+def bulk_create_flights():
+    """Create many flights from a JSON array or CSV upload, reporting per-row errors"""
+    try:
+        try:
+            rows = read_bulk_rows()
+        except ValueError as ve:
+            return jsonify({'success': False, 'error': str(ve)}), 400
+
+        required_fields = ['flight_no', 'departure_time', 'arrival_time',
+                          'airline_id', 'from_airport_id', 'to_airport_id']
+        existing_flight_nos = find_existing(
+            "SELECT Flight_No FROM Flight WHERE Flight_No IN ({placeholders})",
+            [str(row.get('flight_no', '')).strip() for row in rows]
+        )
+        airline_ids = reference.airlines()
+        airport_ids = reference.airports()
+
+        valid, errors, seen = [], {}, set()
+        now = datetime.now()
+        for index, data in enumerate(rows):
+            missing = [field for field in required_fields if not str(data.get(field) or '').strip()]
+            if missing:
+                errors[index] = f'Missing field: {missing[0]}'
+                continue
+            flight_no = str(data['flight_no']).strip()
+            try:
+                departure_time = datetime.fromisoformat(str(data['departure_time']).replace('T', ' '))
+                arrival_time = datetime.fromisoformat(str(data['arrival_time']).replace('T', ' '))
+                airline_id = int(data['airline_id'])
+                from_airport_id = int(data['from_airport_id'])
+                to_airport_id = int(data['to_airport_id'])
+            except (ValueError, TypeError):
+                errors[index] = 'Invalid date format or ID'
+                continue
+            try:
+                capacity = int(data.get('capacity') or 180)
+            except (ValueError, TypeError):
+                errors[index] = 'Capacity must be an integer'
+                continue
+            status = data.get('status') or 'Scheduled'
+            if status not in FLIGHT_STATUSES:
+                errors[index] = f'status must be one of: {", ".join(FLIGHT_STATUSES)}'
+            elif capacity < 1:
+                errors[index] = 'Capacity must be at least 1'
+            elif departure_time <= now:
+                errors[index] = 'Departure time must be in the future'
+            elif arrival_time <= departure_time:
+                errors[index] = 'Arrival time must be after departure time'
+            elif flight_no in existing_flight_nos or flight_no in seen:
+                errors[index] = 'Flight number already exists'
+            elif airline_id not in airline_ids:
+                errors[index] = 'Invalid airline'
+            elif from_airport_id not in airport_ids or to_airport_id not in airport_ids:
+                errors[index] = 'Invalid airport'
+            elif from_airport_id == to_airport_id:
+                errors[index] = 'Departure and arrival airports must be different'
+            else:
+                seen.add(flight_no)
+                valid.append((index, (
+                    flight_no, departure_time, arrival_time, status,
+                    airline_id, from_airport_id, to_airport_id, capacity
+                )))
+
+        query = """
+            INSERT INTO Flight
+            (Flight_No, Departure_Time, Arrival_Time, Status, Airline_ID,
+             From_Airport_ID, To_Airport_ID, Capacity)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        return insert_valid_rows(query, len(rows), valid, errors, 'flight_id')
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @flights_bp.route('/<int:flight_id>', methods=['PUT'])
 def update_flight(flight_id):
     """Update an existing flight"""
     try:
         data = request.get_json()
         
-        # Check if flight exists
-        existing_flight = db.execute_query(
-            "SELECT Flight_ID, Status FROM Flight WHERE Flight_ID = %s", 
-            (flight_id,), 
-            fetch_one=True
-        )
-        if not existing_flight:
-            return jsonify({'success': False, 'error': 'Flight not found'}), 404
+        # Checks and update share one connection and commit together
+        with db.transaction():
+            # Check if flight exists
+            existing_flight = db.execute_query(
+                "SELECT Flight_ID, Status FROM Flight WHERE Flight_ID = %s", 
+                (flight_id,), 
+                fetch_one=True
+            )
+            if not existing_flight:
+                return jsonify({'success': False, 'error': 'Flight not found'}), 404
         
-        update_fields = []
-        params = []
+            update_fields = []
+            params = []
+        
+            field_mapping = {
+                'flight_no': 'Flight_No',
+                'departure_time': 'Departure_Time',
+                'arrival_time': 'Arrival_Time',
+                'status': 'Status',
+                'capacity': 'Capacity'
+            }
         
-        field_mapping = {
-            'flight_no': 'Flight_No',
-            'departure_time': 'Departure_Time',
-            'arrival_time': 'Arrival_Time',
-            'status': 'Status',
-            'capacity': 'Capacity'
-        }
-        
-        for json_field, db_field in field_mapping.items():
-            if json_field in data:
-                # Validate flight_no uniqueness if being updated
-                if json_field == 'flight_no':
-                    existing_flight_no = db.execute_query(
-                        "SELECT Flight_ID FROM Flight WHERE Flight_No = %s AND Flight_ID != %s", 
-                        (data[json_field], flight_id), 
-                        fetch_one=True
-                    )
-                    if existing_flight_no:
-                        return jsonify({'success': False, 'error': 'Flight number already exists'}), 400
+            for json_field, db_field in field_mapping.items():
+                if json_field in data:
+                    # Validate flight_no uniqueness if being updated
+                    if json_field == 'flight_no':
+                        existing_flight_no = db.execute_query(
+                            "SELECT Flight_ID FROM Flight WHERE Flight_No = %s AND Flight_ID != %s", 
+                            (data[json_field], flight_id), 
+                            fetch_one=True
+                        )
+                        if existing_flight_no:
+                            return jsonify({'success': False, 'error': 'Flight number already exists'}), 400
                 
-                # Validate datetime fields
-                if json_field in ['departure_time', 'arrival_time']:
-                    try:
-                        datetime.fromisoformat(data[json_field].replace('T', ' '))
-                    except ValueError:
-                        return jsonify({'success': False, 'error': f'Invalid {json_field} format'}), 400
+                    # Validate datetime fields
+                    if json_field in ['departure_time', 'arrival_time']:
+                        try:
+                            datetime.fromisoformat(data[json_field].replace('T', ' '))
+                        except ValueError:
+                            return jsonify({'success': False, 'error': f'Invalid {json_field} format'}), 400
                 
-                # Validate capacity
-                if json_field == 'capacity':
-                    if int(data[json_field]) < 1:
-                        return jsonify({'success': False, 'error': 'Capacity must be at least 1'}), 400
+                    # Validate capacity
+                    if json_field == 'capacity':
+                        if int(data[json_field]) < 1:
+                            return jsonify({'success': False, 'error': 'Capacity must be at least 1'}), 400
                 
-                update_fields.append(f'{db_field} = %s')
-                params.append(data[json_field])
+                    update_fields.append(f'{db_field} = %s')
+                    params.append(data[json_field])
         
-        if not update_fields:
-            return jsonify({'success': False, 'error': 'No fields to update'}), 400
+            if not update_fields:
+                return jsonify({'success': False, 'error': 'No fields to update'}), 400
         
-        params.append(flight_id)
-        query = f"UPDATE Flight SET {', '.join(update_fields)} WHERE Flight_ID = %s"
+            params.append(flight_id)
+            query = f"UPDATE Flight SET {', '.join(update_fields)} WHERE Flight_ID = %s"
         
-        rows_affected = db.execute_update(query, params)
+            rows_affected = db.execute_update(query, params)
         
-        if rows_affected == 0:
-            return jsonify({'success': False, 'error': 'Flight not found'}), 404
+            if rows_affected == 0:
+                return jsonify({'success': False, 'error': 'Flight not found'}), 404
         
-        return jsonify({
-            'success': True,
-            'message': 'Flight updated successfully'
-        }), 200
+            return jsonify({
+                'success': True,
+                'message': 'Flight updated successfully'
+            }), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -235,7 +334,7 @@ def delete_flight(flight_id):
         
         # Check if there are active bookings
         active_bookings = db.execute_query(
-            "SELECT COUNT(*) as count FROM Booking WHERE Flight_ID = %s AND Status = 'Booked'", 
+            "SELECT Booked_Count as count FROM Flight WHERE Flight_ID = %s", 
             (flight_id,), 
             fetch_one=True
         )
@@ -285,7 +384,100 @@ def cancel_flight():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _bulk_cancel_selection(data):
+    """(flights, missing) for a bulk cancel body; raises ValueError when it is malformed"""
+    if data.get('flight_ids'):
+        try:
+            flight_ids = sorted({int(flight_id) for flight_id in data['flight_ids']})
+        except (ValueError, TypeError):
+            raise ValueError('flight_ids must be a list of integers')
+        if len(flight_ids) > BULK_CANCEL_MAX_FLIGHTS:
+            raise ValueError(f'At most {BULK_CANCEL_MAX_FLIGHTS} flights per request')
+        flights = find_flights(flight_ids=flight_ids)
+        found = {flight['Flight_ID'] for flight in flights}
+        return flights, [flight_id for flight_id in flight_ids if flight_id not in found]
+
+    if data.get('flight_nos'):
+        flight_nos = sorted({str(flight_no).strip() for flight_no in data['flight_nos']})
+        if len(flight_nos) > BULK_CANCEL_MAX_FLIGHTS:
+            raise ValueError(f'At most {BULK_CANCEL_MAX_FLIGHTS} flights per request')
+        flights = find_flights(flight_nos=flight_nos)
+        found = {flight['Flight_No'] for flight in flights}
+        return flights, [flight_no for flight_no in flight_nos if flight_no not in found]
+
+    if data.get('airport_id') is not None:
+        if not data.get('from') or not data.get('to'):
+            raise ValueError('from and to are required with airport_id')
+        try:
+            airport_id = int(data['airport_id'])
+            start = datetime.fromisoformat(str(data['from']))
+            end = datetime.fromisoformat(str(data['to']))
+        except (ValueError, TypeError):
+            raise ValueError('airport_id must be an integer and from/to ISO datetimes')
+        if end <= start:
+            raise ValueError('to must be after from')
+        flights = find_flights(airport_id=airport_id, start=start, end=end)
+        if len(flights) > BULK_CANCEL_MAX_FLIGHTS:
+            raise ValueError(f'{len(flights)} flights match; at most {BULK_CANCEL_MAX_FLIGHTS} per request')
+        return flights, []
+
+    raise ValueError('Provide flight_ids, flight_nos, or airport_id with from and to')
+
+@flights_bp.route('/cancel/bulk', methods=['POST'])
+def cancel_flights_bulk():
+    """Cancel many flights, their bookings in short chunked transactions, and notify passengers
+
+    Body: {"flight_ids": [...]} or {"flight_nos": [...]} or
+    {"airport_id", "from", "to"} (departures from or arrivals to the airport
+    in [from, to)), plus optional "chunk_size", "notify" (default true) and
+    "reason". Ask for application/x-ndjson (or ?format=ndjson) to receive
+    progress events as each chunk commits, or pass ?async=1 to run it as a
+    background job and poll GET /api/jobs/<id> for progress.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            flights, missing = _bulk_cancel_selection(data)
+            chunk_size = int(data['chunk_size']) if data.get('chunk_size') is not None else None
+        except (ValueError, TypeError) as ve:
+            return jsonify({'success': False, 'error': str(ve)}), 400
+        if chunk_size is not None and not 0 < chunk_size <= 5000:
+            return jsonify({'success': False, 'error': 'chunk_size must be between 1 and 5000'}), 400
+        if not flights:
+            return jsonify({'success': False, 'error': 'No matching flights', 'missing': missing}), 404
+
+        notify = data.get('notify', True) is not False
+        reason = data.get('reason')
+        if reason is not None and not isinstance(reason, str):
+            return jsonify({'success': False, 'error': 'reason must be a string'}), 400
+        print(f"Bulk cancel of {len(flights)} flights requested")
+
+        if wants_async():
+            job_id = submit('cancel_flights', {
+                'flight_ids': [flight['Flight_ID'] for flight in flights],
+                'chunk_size': chunk_size,
+                'notify': notify,
+                'reason': reason
+            })
+            return accepted(job_id, f'Cancellation of {len(flights)} flights queued')
+
+        if wants_ndjson():
+            events = cancel_flights_iter(flights, chunk_size, notify, reason)
+            return stream_rows([event] for event in events)
+
+        summary = cancel_flights(flights, chunk_size, notify, reason)
+        return jsonify({
+            'success': True,
+            'message': f"{summary['flights_done']} flights cancelled, {summary['bookings_cancelled']} bookings cancelled",
+            'data': summary,
+            'missing': missing
+        }), 200
+    except Exception as e:
+        print(f"Error in bulk flight cancellation: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @flights_bp.route('/<int:flight_id>/available-seats', methods=['GET'])
+@conditional('Flight', 'Booking')
 def get_available_seats(flight_id):
     """Get available seats using MySQL function"""
     try:
@@ -302,7 +494,26 @@ def get_available_seats(flight_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@flights_bp.route('/<int:flight_id>/seat-map', methods=['GET'])
+@conditional('Flight', 'Booking')
+def get_seat_map(flight_id):
+    """Get the flight's booked seats as a compact bitmap
+
+    Seat i (row = i // len(seat_letters) + 1, letter = seat_letters[i % len])
+    is booked when bit i % 8 of byte i // 8 of the base64-decoded bitmap is set.
+    held_bitmap and blocked_bitmap (seats of cancelled bookings, which cannot
+    be rebooked) use the same layout; a seat is free when no bitmap has it.
+    """
+    try:
+        seat_map = seat_inventory.current(flight_id)
+        if seat_map is None:
+            return jsonify({'success': False, 'error': 'Flight not found'}), 404
+        return jsonify({'success': True, 'data': seat_map.to_dict()}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @flights_bp.route('/<int:flight_id>/bookings', methods=['GET'])
+@conditional('Flight', 'Booking', 'Passenger')
 def get_flight_bookings(flight_id):
     """Get all bookings for a specific flight"""
     try:
@@ -330,6 +541,7 @@ def get_flight_bookings(flight_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @flights_bp.route('/search', methods=['GET'])
+@conditional('Flight', 'Airline', 'Airport')
 def search_flights():
     """Search flights with advanced filters"""
     try:
@@ -343,39 +555,39 @@ def search_flights():
         query = """
             SELECT 
                 f.Flight_ID, f.Flight_No, f.Departure_Time, f.Arrival_Time, f.Status,
-                f.Capacity,
-                al.Name AS Airline,
-                a1.Name AS From_Airport, a1.City AS From_City,
-                a2.Name AS To_Airport, a2.City AS To_City,
-                (f.Capacity - COALESCE((
-                    SELECT COUNT(*) FROM Booking b 
-                    WHERE b.Flight_ID = f.Flight_ID AND b.Status = 'Booked'
-                ), 0)) AS available_seats
+                f.Capacity, f.Airline_ID, f.From_Airport_ID, f.To_Airport_ID,
+                (f.Capacity - f.Booked_Count - f.Held_Count) AS available_seats
             FROM Flight f
-            JOIN Airline al ON f.Airline_ID = al.Airline_ID
-            JOIN Airport a1 ON f.From_Airport_ID = a1.Airport_ID
-            JOIN Airport a2 ON f.To_Airport_ID = a2.Airport_ID
             WHERE f.Status = %s
         """
         params = [status]
         
+        # City filters become airport ID lists so Flight is searched on its own indexes
         if from_city:
-            query += " AND a1.City = %s"
-            params.append(from_city)
+            city_sql, city_params = reference.city_condition('f.From_Airport_ID', from_city)
+            query += city_sql
+            params.extend(city_params)
         if to_city:
-            query += " AND a2.City = %s"
-            params.append(to_city)
-        if departure_date:
-            query += " AND DATE(f.Departure_Time) = %s"
-            params.append(departure_date)
+            city_sql, city_params = reference.city_condition('f.To_Airport_ID', to_city)
+            query += city_sql
+            params.extend(city_params)
+        
+        # ?departure_date= or ?date_from=/?date_to= as an index-friendly Departure_Time range
+        try:
+            range_sql, range_params = day_range('f.Departure_Time', day_param='departure_date')
+        except ValueError as ve:
+            return jsonify({'success': False, 'error': str(ve)}), 400
+        query += range_sql
+        params.extend(range_params)
         
         # Filter by minimum available seats
-        query += f" HAVING available_seats >= %s"
+        query += " AND f.Capacity - f.Booked_Count - f.Held_Count >= %s"
         params.append(min_seats)
         
         query += " ORDER BY f.Departure_Time"
         
-        flights = db.execute_query(query, params)
+        flights = db.execute_query(query, params, prepared=True)
+        flights = [reference.decorate_flight(flight) for flight in flights]
         return jsonify({
             'success': True, 
             'data': flights,
@@ -383,6 +595,8 @@ def search_flights():
                 'from_city': from_city,
                 'to_city': to_city,
                 'departure_date': departure_date,
+                'date_from': request.args.get('date_from'),
+                'date_to': request.args.get('date_to'),
                 'status': status,
                 'min_seats': min_seats
             }
@@ -391,6 +605,8 @@ def search_flights():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @flights_bp.route('/statistics', methods=['GET'])
+@conditional('Flight', 'Airport')
+@cached_response('Flight', 'Airport')
 def get_flight_statistics():
     """Get flight statistics"""
     try:
@@ -403,10 +619,7 @@ def get_flight_statistics():
                 COUNT(CASE WHEN Status = 'Completed' THEN 1 END) as completed_flights,
                 AVG(Capacity) as avg_capacity,
                 SUM(Capacity) as total_capacity,
-                SUM(Capacity - COALESCE((
-                    SELECT COUNT(*) FROM Booking b 
-                    WHERE b.Flight_ID = f.Flight_ID AND b.Status = 'Booked'
-                ), 0)) as total_available_seats
+                SUM(Capacity - Booked_Count - Held_Count) as total_available_seats
             FROM Flight f
         """
         
@@ -436,4 +649,14 @@ def get_flight_statistics():
             }
         }), 200
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+FLIGHT_CHANGES = ChangeFeed('Flight', 'f', 'Flight_ID', """
+    SELECT
+        f.Flight_ID, f.Flight_No, f.Departure_Time, f.Arrival_Time, f.Status,
+        f.Capacity, f.Airline_ID, f.From_Airport_ID, f.To_Airport_ID,
+        (f.Capacity - f.Booked_Count - f.Held_Count) AS available_seats, f.Updated_At
+    FROM Flight f
+    WHERE 1=1
+""", transform=reference.decorate_flight)
+FLIGHT_CHANGES.register(flights_bp)
@@ -0,0 +1,98 @@
+from flask import Blueprint, request, jsonify
+from database.versions import track_writes
+from database.booking import BookingError
+from database.holds import SEAT_HOLD_MAX_TTL, confirm_hold, hold_seat, release_hold, start_sweeper
+
+holds_bp = Blueprint('holds', __name__)
+# Writes here invalidate cached responses computed from these tables
+track_writes(holds_bp, 'Flight', 'Booking', 'Passenger', 'BookingAudit')
+
+@holds_bp.record_once
+def start_hold_sweeper(state):
+    # Expired holds are released in the background of every worker that serves holds
+    start_sweeper()
+
+def _hold_token(data):
+    return (data or {}).get('hold_token') or request.headers.get('X-Hold-Token')
+
+@holds_bp.route('/', methods=['POST'], strict_slashes=False)
+def create_hold():
+    """Hold a seat for a few minutes before checkout
+
+    Body: {"flight_id", "seat_no", "ttl_seconds" (optional)}. The returned
+    hold_token confirms (POST /<hold_id>/confirm) or releases (DELETE) it.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        for field in ('flight_id', 'seat_no'):
+            if field not in data:
+                return jsonify({'success': False, 'error': f'Missing field: {field}'}), 400
+        try:
+            flight_id = int(data['flight_id'])
+            ttl = int(data['ttl_seconds']) if data.get('ttl_seconds') is not None else None
+        except (ValueError, TypeError):
+            return jsonify({'success': False, 'error': 'flight_id and ttl_seconds must be integers'}), 400
+        seat_no = str(data['seat_no']).strip().upper()
+        if not seat_no or len(seat_no) > 10:
+            return jsonify({'success': False, 'error': 'Seat number must be 1-10 characters'}), 400
+        if ttl is not None and not 0 < ttl <= SEAT_HOLD_MAX_TTL:
+            return jsonify({'success': False, 'error': f'ttl_seconds must be between 1 and {SEAT_HOLD_MAX_TTL}'}), 400
+
+        try:
+            hold = hold_seat(flight_id, seat_no, ttl)
+        except BookingError as be:
+            print(f"Seat hold rejected ({be.code}): {str(be)}")
+            return jsonify(be.to_dict()), be.status
+
+        print(f"Seat {seat_no} on flight {flight_id} held as {hold['hold_id']}")
+        return jsonify({'success': True, 'data': hold}), 201
+    except Exception as e:
+        print(f"Error creating seat hold: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@holds_bp.route('/<int:hold_id>/confirm', methods=['POST'])
+def confirm_seat_hold(hold_id):
+    """Turn a live hold into a booking for a passenger
+
+    Body: {"hold_token", "passenger_id"}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        token = _hold_token(data)
+        if not token:
+            return jsonify({'success': False, 'error': 'Missing field: hold_token'}), 400
+        try:
+            passenger_id = int(data['passenger_id'])
+        except (KeyError, ValueError, TypeError):
+            return jsonify({'success': False, 'error': 'passenger_id must be an integer'}), 400
+
+        try:
+            booking_id, seat_no = confirm_hold(hold_id, token, passenger_id)
+        except BookingError as be:
+            print(f"Seat hold {hold_id} not confirmed ({be.code}): {str(be)}")
+            return jsonify(be.to_dict()), be.status
+
+        print(f"Seat hold {hold_id} confirmed as booking {booking_id}")
+        return jsonify({
+            'success': True,
+            'message': f'Booking created successfully - seat {seat_no}',
+            'booking_id': booking_id,
+            'seat_no': seat_no
+        }), 201
+    except Exception as e:
+        print(f"Error confirming seat hold: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@holds_bp.route('/<int:hold_id>', methods=['DELETE'])
+def release_seat_hold(hold_id):
+    """Release a hold before it expires (token in the body or X-Hold-Token)"""
+    try:
+        token = _hold_token(request.get_json(silent=True))
+        if not token:
+            return jsonify({'success': False, 'error': 'Missing field: hold_token'}), 400
+        if not release_hold(hold_id, token):
+            return jsonify({'success': False, 'error': 'Seat hold not found', 'code': 'HOLD_NOT_FOUND'}), 404
+        return jsonify({'success': True, 'message': 'Seat hold released'}), 200
+    except Exception as e:
+        print(f"Error releasing seat hold: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,69 @@
+from flask import Blueprint, request, jsonify
+from database.jobs import JOB_HANDLERS, JOB_STATUSES, get_job, list_jobs, start_workers, submit
+from utils.deferred import accepted
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.record_once
+def start_job_workers(state):
+    # In-process workers (JOB_WORKERS=0 leaves jobs to `python -m database.jobs`)
+    start_workers(state.app)
+
+@jobs_bp.route('/', methods=['POST'], strict_slashes=False)
+def submit_job():
+    """Queue a background job
+
+    Body: {"type", "payload", "max_attempts" (optional), "delay_seconds" (optional)}.
+    Deferred API requests are queued with ?async=1 on the endpoint instead.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        job_type = data.get('type')
+        if not job_type or job_type == 'request' or job_type not in JOB_HANDLERS:
+            types = sorted(name for name in JOB_HANDLERS if name != 'request')
+            return jsonify({'success': False, 'error': f'type must be one of: {", ".join(types)}'}), 400
+        try:
+            max_attempts = int(data['max_attempts']) if data.get('max_attempts') is not None else None
+            delay = int(data.get('delay_seconds') or 0)
+        except (ValueError, TypeError):
+            return jsonify({'success': False, 'error': 'max_attempts and delay_seconds must be integers'}), 400
+        if max_attempts is not None and not 0 < max_attempts <= 20:
+            return jsonify({'success': False, 'error': 'max_attempts must be between 1 and 20'}), 400
+        if delay < 0:
+            return jsonify({'success': False, 'error': 'delay_seconds cannot be negative'}), 400
+
+        job_id = submit(job_type, data.get('payload') or {}, max_attempts, delay)
+        print(f"Queued {job_type} job {job_id}")
+        return accepted(job_id)
+    except Exception as e:
+        print(f"Error submitting job: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Status, progress and (once finished) the result of a job"""
+    try:
+        job = get_job(job_id)
+        if not job:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        return jsonify({'success': True, 'data': job}), 200
+    except Exception as e:
+        print(f"Error fetching job {job_id}: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@jobs_bp.route('/', methods=['GET'], strict_slashes=False)
+def get_jobs():
+    """Recent jobs, newest first; filter with ?status= and ?type=, cap with ?limit= (max 200)"""
+    try:
+        status = request.args.get('status')
+        if status and status not in JOB_STATUSES:
+            return jsonify({'success': False, 'error': f'status must be one of: {", ".join(JOB_STATUSES)}'}), 400
+        try:
+            limit = min(int(request.args.get('limit', 50)), 200)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+        jobs = list_jobs(status, request.args.get('type'), max(limit, 1))
+        return jsonify({'success': True, 'data': jobs, 'count': len(jobs)}), 200
+    except Exception as e:
+        print(f"Error listing jobs: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
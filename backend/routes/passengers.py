@@ -1,39 +1,72 @@
 from flask import Blueprint, request, jsonify
 from database.db import db
+from database.versions import track_writes
+from database.booking import BookingError, create_passenger_booking
+from database.audit import audit_log
+from utils.streaming import stream_rows
+from utils.bulk import find_existing, insert_valid_rows, read_bulk_rows
+from utils.pagination import Keyset, SortKey, requested_page
+from utils.etags import conditional
+from utils.changes import ChangeFeed
+from utils.deferred import deferrable
+from utils.idempotency import idempotent
 import re
 
 passengers_bp = Blueprint('passengers', __name__)
+# Writes here invalidate cached responses computed from these tables
+track_writes(passengers_bp, 'Passenger', 'Booking', 'Flight', 'PassengerAudit', 'BookingAudit')
+
+PASSENGER_KEYSET = Keyset(SortKey('p.Passenger_ID', 'Passenger_ID'))
+
+# Messages and statuses create-with-booking has always answered with
+CREATE_WITH_BOOKING_ERRORS = {
+    'FLIGHT_NOT_FOUND': ('Flight not found', 404),
+    'FLIGHT_CANCELLED': ('Cannot book a cancelled flight', 400),
+    'SEAT_TAKEN': ('Seat already booked on this flight', 400),
+    'EMAIL_EXISTS': ('Email already exists. Use a different email address.', 400),
+    'PHONE_EXISTS': ('Phone number already exists. Use a different phone number.', 400),
+    'FLIGHT_FULL': ('No seats available on this flight', 400)
+}
 
 @passengers_bp.route('/', methods=['GET'])
+@conditional('Passenger')
 def get_all_passengers():
-    """Get all passengers with booking count"""
+    """Get all passengers with booking count (streamed; ?format=ndjson for NDJSON)
+
+    Pass ?limit= (and the returned next_cursor as ?cursor=) to page through results.
+    """
     try:
+        try:
+            page = requested_page(PASSENGER_KEYSET)
+        except ValueError as ve:
+            return jsonify({'success': False, 'error': str(ve)}), 400
+        
         query = """
             SELECT 
                 p.Passenger_ID, p.First_Name, p.Last_Name, p.Email, p.Phone,
-                COUNT(CASE WHEN b.Status = 'Booked' THEN 1 END) as booking_count
+                p.Active_Bookings as booking_count
             FROM Passenger p
-            LEFT JOIN Booking b ON p.Passenger_ID = b.Passenger_ID
-            GROUP BY p.Passenger_ID, p.First_Name, p.Last_Name, p.Email, p.Phone
-            ORDER BY p.Passenger_ID
+            WHERE 1=1
         """
-        passengers = db.execute_query(query)
-        return jsonify({'success': True, 'data': passengers}), 200
+        if page is not None:
+            query, params = page.apply(query, [])
+            return page.response(db.execute_query(query, params))
+        
+        return stream_rows(db.stream_query(query + PASSENGER_KEYSET.order_by()))
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @passengers_bp.route('/<int:passenger_id>', methods=['GET'])
+@conditional('Passenger')
 def get_passenger(passenger_id):
     """Get a specific passenger by ID with booking count"""
     try:
         query = """
             SELECT 
                 p.Passenger_ID, p.First_Name, p.Last_Name, p.Email, p.Phone,
-                COUNT(CASE WHEN b.Status = 'Booked' THEN 1 END) as booking_count
+                p.Active_Bookings as booking_count
             FROM Passenger p
-            LEFT JOIN Booking b ON p.Passenger_ID = b.Passenger_ID
             WHERE p.Passenger_ID = %s
-            GROUP BY p.Passenger_ID, p.First_Name, p.Last_Name, p.Email, p.Phone
         """
         passenger = db.execute_query(query, (passenger_id,), fetch_one=True)
         
@@ -118,6 +151,65 @@ def create_passenger():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@passengers_bp.route('/bulk', methods=['POST'])
+@deferrable
+def bulk_create_passengers():
+    """Create many passengers from a JSON array or CSV upload, reporting per-row errors"""
+    try:
+        try:
+            rows = read_bulk_rows()
+        except ValueError as ve:
+            return jsonify({'success': False, 'error': str(ve)}), 400
+
+        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+        cleaned = []
+        for data in rows:
+            phone = str(data.get('phone') or '').strip()
+            clean_phone = phone.replace('-', '').replace(' ', '').replace('(', '').replace(')', '').replace('+', '')
+            cleaned.append((str(data.get('email') or '').strip().lower(), clean_phone))
+
+        existing_emails = {email.lower() for email in find_existing(
+            "SELECT Email FROM Passenger WHERE Email IN ({placeholders})",
+            [email for email, _ in cleaned if email]
+        )}
+        existing_phones = find_existing(
+            "SELECT Phone FROM Passenger WHERE Phone IN ({placeholders})",
+            [phone for _, phone in cleaned if phone]
+        )
+
+        valid, errors, seen_emails, seen_phones = [], {}, set(), set()
+        for index, data in enumerate(rows):
+            missing = [field for field in ['first_name', 'last_name', 'email', 'phone']
+                       if not str(data.get(field) or '').strip()]
+            if missing:
+                errors[index] = f'Missing or empty field: {missing[0]}'
+                continue
+            email, clean_phone = cleaned[index]
+            if not re.match(email_pattern, email):
+                errors[index] = 'Invalid email format'
+            elif email in existing_emails or email in seen_emails:
+                errors[index] = 'Email already exists'
+            elif not clean_phone.isdigit():
+                errors[index] = 'Phone number must contain only digits'
+            elif len(clean_phone) != 10:
+                errors[index] = 'Phone number must be exactly 10 digits'
+            elif clean_phone in existing_phones or clean_phone in seen_phones:
+                errors[index] = 'Phone number already exists'
+            else:
+                seen_emails.add(email)
+                seen_phones.add(clean_phone)
+                valid.append((index, (
+                    str(data['first_name']).strip(), str(data['last_name']).strip(), email, clean_phone
+                )))
+
+        query = """
+            INSERT INTO Passenger (First_Name, Last_Name, Email, Phone)
+            VALUES (%s, %s, %s, %s)
+        """
+        return insert_valid_rows(query, len(rows), valid, errors, 'passenger_id')
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @passengers_bp.route('/<int:passenger_id>', methods=['PUT'])
 def update_passenger(passenger_id):
     """Update an existing passenger"""
@@ -230,7 +322,7 @@ def delete_passenger(passenger_id):
         
         # Check for active bookings
         active_bookings = db.execute_query(
-            "SELECT COUNT(*) as count FROM Booking WHERE Passenger_ID = %s AND Status = 'Booked'", 
+            "SELECT Active_Bookings as count FROM Passenger WHERE Passenger_ID = %s", 
             (passenger_id,), 
             fetch_one=True
         )
@@ -241,21 +333,10 @@ def delete_passenger(passenger_id):
                 'error': f'Cannot delete passenger with {active_bookings["count"]} active bookings. Cancel bookings first.'
             }), 400
         
-        # Log passenger deletion for audit
-        try:
-            with db.get_cursor() as (cursor, connection):
-                # Insert audit record
-                cursor.execute(
-                    "INSERT INTO PassengerAudit (Passenger_ID, Action, Details) VALUES (%s, %s, %s)",
-                    (passenger_id, 'DELETE', f"Deleted passenger: {passenger['First_Name']} {passenger['Last_Name']}")
-                )
-                
-                # Delete passenger
-                cursor.execute("DELETE FROM Passenger WHERE Passenger_ID = %s", (passenger_id,))
-                
-        except Exception as audit_error:
-            # If audit table doesn't exist, just delete the passenger
-            db.execute_update("DELETE FROM Passenger WHERE Passenger_ID = %s", (passenger_id,))
+        db.execute_update("DELETE FROM Passenger WHERE Passenger_ID = %s", (passenger_id,))
+        
+        # Log passenger deletion for audit (written in the background)
+        audit_log.passenger(passenger_id, 'DELETE', f"Deleted passenger: {passenger['First_Name']} {passenger['Last_Name']}")
         
         return jsonify({
             'success': True,
@@ -265,6 +346,7 @@ def delete_passenger(passenger_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @passengers_bp.route('/<int:passenger_id>/bookings', methods=['GET'])
+@conditional('Passenger', 'Booking', 'Flight', 'Airline', 'Airport')
 def get_passenger_bookings(passenger_id):
     """Get all bookings for a specific passenger"""
     try:
@@ -305,6 +387,7 @@ def get_passenger_bookings(passenger_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @passengers_bp.route('/<int:passenger_id>/booking-count', methods=['GET'])
+@conditional('Passenger', 'Booking')
 def get_passenger_booking_count(passenger_id):
     """Get total booking count using MySQL function"""
     try:
@@ -327,8 +410,9 @@ def get_passenger_booking_count(passenger_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @passengers_bp.route('/create-with-booking', methods=['POST'])
+@idempotent
 def create_passenger_with_booking():
-    """Create passenger and booking with comprehensive business logic validation"""
+    """Create passenger and booking in one sp_CreatePassengerBooking call"""
     try:
         data = request.get_json()
         
@@ -358,180 +442,38 @@ def create_passenger_with_booking():
         
         print(f"Attempting to create booking with data: {data}")
         
-        # ==== COMPREHENSIVE BUSINESS LOGIC VALIDATION ====
-        
-        # 1. CHECK IF FLIGHT EXISTS AND GET STATUS
-        flight_check = db.execute_query(
-            "SELECT Flight_ID, Status, Flight_No, Capacity FROM Flight WHERE Flight_No = %s", 
-            (data['flight_no'],), 
-            fetch_one=True
-        )
-        
-        if not flight_check:
-            print(f"Flight not found: {data['flight_no']}")
-            return jsonify({'success': False, 'error': 'Flight not found'}), 404
-        
-        flight_id = flight_check['Flight_ID']
-        flight_status = flight_check['Status']
-        flight_capacity = flight_check['Capacity']
-        
-        print(f"Flight found: {data['flight_no']}, Status: {flight_status}, Capacity: {flight_capacity}")
-        
-        # 2. CHECK IF FLIGHT IS CANCELLED
-        if flight_status == 'Cancelled':
-            print(f"Cannot book on cancelled flight: {data['flight_no']}")
-            return jsonify({'success': False, 'error': 'Cannot book a cancelled flight'}), 400
-        
-        # 3. CHECK IF SEAT IS ALREADY BOOKED
-        seat_check = db.execute_query(
-            """SELECT b.Booking_ID, p.First_Name, p.Last_Name 
-               FROM Booking b 
-               JOIN Passenger p ON b.Passenger_ID = p.Passenger_ID
-               WHERE b.Flight_ID = %s AND b.Seat_No = %s AND b.Status = 'Booked'""", 
-            (flight_id, data['seat_no']), 
-            fetch_one=True
-        )
-        
-        if seat_check:
-            print(f"Seat already booked: {data['seat_no']} on flight {data['flight_no']}")
-            return jsonify({'success': False, 'error': 'Seat already booked on this flight'}), 400
-        
-        # 4. CHECK IF EMAIL ALREADY EXISTS
-        email_check = db.execute_query(
-            "SELECT Passenger_ID, First_Name, Last_Name FROM Passenger WHERE Email = %s", 
-            (data['email'],), 
-            fetch_one=True
-        )
-        
-        if email_check:
-            print(f"Email already exists: {data['email']}")
-            return jsonify({'success': False, 'error': 'Email already exists. Use a different email address.'}), 400
-        
-        # 5. CHECK IF PHONE NUMBER ALREADY EXISTS
-        phone_check = db.execute_query(
-            "SELECT Passenger_ID, First_Name, Last_Name FROM Passenger WHERE Phone = %s", 
-            (clean_phone,), 
-            fetch_one=True
-        )
-        
-        if phone_check:
-            print(f"Phone number already exists: {clean_phone}")
-            return jsonify({'success': False, 'error': 'Phone number already exists. Use a different phone number.'}), 400
-        
-        # 6. CHECK IF FLIGHT IS FULL
-        booked_seats = db.execute_query(
-            "SELECT COUNT(*) as count FROM Booking WHERE Flight_ID = %s AND Status = 'Booked'", 
-            (flight_id,), 
-            fetch_one=True
-        )
-        
-        if booked_seats and booked_seats['count'] >= flight_capacity:
-            print(f"Flight full: {data['flight_no']}, Booked: {booked_seats['count']}, Capacity: {flight_capacity}")
-            return jsonify({'success': False, 'error': 'No seats available on this flight'}), 400
-        
-        print("All validations passed, proceeding with creation...")
-        
-        # ==== CALL STORED PROCEDURE WITH FALLBACK ====
-        booking_id = None
-        creation_method = 'unknown'
-        first_name = data['first_name']
-        last_name = data['last_name']
-        
+        # Flight, seat, email and phone rules are enforced by sp_CreatePassengerBooking
+        # and the unique indexes; rejections come back as an error code
+        first_name = data['first_name'].strip()
+        last_name = data['last_name'].strip()
         try:
-            # Try using stored procedure first
-            with db.get_cursor() as (cursor, connection):
-                cursor.callproc('sp_CreateBooking', [
-                    data['first_name'],
-                    data['last_name'], 
-                    data['email'],
-                    clean_phone,  # Use clean phone (digits only)
-                    data['flight_no'],
-                    data['seat_no'],
-                    0  # placeholder for output parameter
-                ])
-                
-                # Fetch any results from the procedure
-                for result in cursor.stored_results():
-                    rows = result.fetchall()
-                    if rows:
-                        print(f"Stored procedure results: {rows}")
-                
-                # Get the booking ID of the created booking
-                booking_query = """
-                    SELECT b.Booking_ID, b.Status, p.First_Name, p.Last_Name
-                    FROM Booking b 
-                    JOIN Passenger p ON b.Passenger_ID = p.Passenger_ID 
-                    WHERE p.Email = %s 
-                    ORDER BY b.Booking_ID DESC 
-                    LIMIT 1
-                """
-                
-                cursor.execute(booking_query, (data['email'],))
-                booking_result = cursor.fetchone()
-                
-                if booking_result:
-                    if isinstance(booking_result, tuple):
-                        booking_id, booking_status, first_name, last_name = booking_result
-                    else:
-                        booking_id = booking_result['Booking_ID']
-                        booking_status = booking_result['Status']
-                        first_name = booking_result['First_Name']
-                        last_name = booking_result['Last_Name']
-                    
-                    creation_method = 'stored_procedure'
-                    print(f"Booking created via stored procedure: ID={booking_id}, Status={booking_status}")
-        
-        except Exception as proc_error:
-            print(f"Stored procedure failed: {proc_error}")
-            print("Falling back to manual creation...")
-            
-            # ==== MANUAL CREATION FALLBACK ====
-            try:
-                with db.get_cursor() as (cursor, connection):
-                    # Create passenger
-                    passenger_query = """
-                        INSERT INTO Passenger (First_Name, Last_Name, Email, Phone)
-                        VALUES (%s, %s, %s, %s)
-                    """
-                    cursor.execute(passenger_query, (
-                        data['first_name'].strip(),
-                        data['last_name'].strip(),
-                        data['email'].strip().lower(),
-                        clean_phone  # Store clean phone
-                    ))
-                    passenger_id = cursor.lastrowid
-                    
-                    # Create booking with current timestamp
-                    booking_query = """
-                        INSERT INTO Booking (Date, Seat_No, Passenger_ID, Flight_ID, Status, Booking_Time)
-                        VALUES (CURDATE(), %s, %s, %s, 'Booked', NOW())
-                    """
-                    cursor.execute(booking_query, (data['seat_no'], passenger_id, flight_id))
-                    booking_id = cursor.lastrowid
-                    
-                    creation_method = 'manual'
-                    
-                    print(f"Booking created manually: ID={booking_id}, Passenger ID={passenger_id}")
-            
-            except Exception as manual_error:
-                print(f"Manual creation also failed: {manual_error}")
-                return jsonify({'success': False, 'error': f'Booking creation failed: {str(manual_error)}'}), 500
+            booking_id = create_passenger_booking(
+                first_name,
+                last_name,
+                data['email'].strip().lower(),
+                clean_phone,  # Store only digits
+                data['flight_no'],
+                data['seat_no']
+            )
+        except BookingError as be:
+            message, status = CREATE_WITH_BOOKING_ERRORS.get(be.code, (str(be), be.status))
+            print(f"Booking rejected ({be.code}) for flight {data['flight_no']} seat {data['seat_no']}")
+            return jsonify({'success': False, 'error': message, 'code': be.code}), status
         
-        if booking_id:
-            return jsonify({
-                'success': True,
-                'message': f'Passenger {first_name} {last_name} and booking created successfully',
-                'booking_id': booking_id,
-                'method': creation_method
-            }), 201
-        else:
-            return jsonify({'success': False, 'error': 'Booking creation failed - no booking ID returned'}), 500
+        print(f"Booking created via stored procedure: ID={booking_id}")
+        return jsonify({
+            'success': True,
+            'message': f'Passenger {first_name} {last_name} and booking created successfully',
+            'booking_id': booking_id,
+            'method': 'stored_procedure'
+        }), 201
                 
     except Exception as e:
         print(f"General error in create_passenger_with_booking: {str(e)}")
         return jsonify({'success': False, 'error': f'Server error: {str(e)}'}), 500
 
 @passengers_bp.route('/search', methods=['GET'])
+@conditional('Passenger')
 def search_passengers():
     """Search passengers with advanced filters"""
     try:
@@ -542,9 +484,8 @@ def search_passengers():
         query = """
             SELECT 
                 p.Passenger_ID, p.First_Name, p.Last_Name, p.Email, p.Phone,
-                COUNT(CASE WHEN b.Status = 'Booked' THEN 1 END) as booking_count
+                p.Active_Bookings as booking_count
             FROM Passenger p
-            LEFT JOIN Booking b ON p.Passenger_ID = b.Passenger_ID
             WHERE 1=1
         """
         params = []
@@ -556,13 +497,11 @@ def search_passengers():
             query += " AND p.Email LIKE %s"
             params.append(f'%{email}%')
         
-        query += " GROUP BY p.Passenger_ID, p.First_Name, p.Last_Name, p.Email, p.Phone"
-        
         if min_bookings > 0:
-            query += f" HAVING booking_count >= %s"
+            query += " AND p.Active_Bookings >= %s"
             params.append(min_bookings)
         
-        query += " ORDER BY booking_count DESC, p.Last_Name"
+        query += " ORDER BY p.Active_Bookings DESC, p.Last_Name"
         
         passengers = db.execute_query(query, params)
         return jsonify({
@@ -575,4 +514,13 @@ def search_passengers():
             }
         }), 200
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+PASSENGER_CHANGES = ChangeFeed('Passenger', 'p', 'Passenger_ID', """
+    SELECT
+        p.Passenger_ID, p.First_Name, p.Last_Name, p.Email, p.Phone,
+        p.Active_Bookings AS booking_count, p.Updated_At
+    FROM Passenger p
+    WHERE 1=1
+""")
+PASSENGER_CHANGES.register(passengers_bp)
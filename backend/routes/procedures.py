@@ -1,9 +1,14 @@
 from flask import Blueprint, request, jsonify
 from database.db import db
+from database.versions import track_writes
+from utils.idempotency import idempotent
 
 procedures_bp = Blueprint('procedures', __name__)
+# Writes here invalidate cached responses computed from these tables
+track_writes(procedures_bp, 'Booking', 'Passenger', 'Flight', 'Staff', 'StaffHistory', 'BookingAudit')
 
 @procedures_bp.route('/create-booking', methods=['POST'])
+@idempotent
 def create_booking_procedure():
     """
     Create a booking using sp_CreateBooking stored procedure
@@ -32,7 +37,7 @@ def create_booking_procedure():
                 data['first_name'],
                 data['last_name'],
                 data['email'],
-                data.get('phone', ''),
+                data.get('phone') or None,  # ux_passenger_phone: blank phones are stored as NULL
                 data['flight_no'],
                 data['seat_no'],
                 0  # OUT parameter for booking_id
@@ -1,24 +1,50 @@
 from flask import Blueprint, request, jsonify
 from database.db import db
+from database.versions import track_writes
+from database.refcache import reference
+from utils.bulk import insert_valid_rows, read_bulk_rows
+from utils.pagination import Keyset, SortKey, requested_page
+from utils.response_cache import cached_response
+from utils.etags import conditional
+from utils.changes import ChangeFeed
+from utils.deferred import deferrable
 import re
 
 staff_bp = Blueprint('staff', __name__)
+# Writes here invalidate cached responses computed from these tables
+track_writes(staff_bp, 'Staff', 'StaffHistory')
+
+STAFF_KEYSET = Keyset(
+    SortKey('s.Last_Name', 'Last_Name'),
+    SortKey('s.First_Name', 'First_Name'),
+    SortKey('s.Staff_ID', 'Staff_ID')
+)
 
 @staff_bp.route('/', methods=['GET'])
+@conditional('Staff', 'Airline', 'Airport')
 def get_all_staff():
-    """Get all staff members with enhanced details"""
+    """Get all staff members with enhanced details
+
+    Pass ?limit= (and the returned next_cursor as ?cursor=) to page through results.
+    """
     try:
+        try:
+            page = requested_page(STAFF_KEYSET)
+        except ValueError as ve:
+            return jsonify({'success': False, 'error': str(ve)}), 400
+        
         query = """
             SELECT 
                 s.Staff_ID, s.First_Name, s.Last_Name, s.Role,
-                s.Airline_ID, al.Name AS Airline,
-                s.Airport_ID, a.Name AS Airport, a.City AS Airport_City, a.Country AS Airport_Country
+                s.Airline_ID, s.Airport_ID
             FROM Staff s
-            JOIN Airline al ON s.Airline_ID = al.Airline_ID
-            JOIN Airport a ON s.Airport_ID = a.Airport_ID
-            ORDER BY s.Last_Name, s.First_Name
+            WHERE 1=1
         """
-        staff = db.execute_query(query)
+        if page is not None:
+            query, params = page.apply(query, [])
+            return page.response(db.execute_query(query, params), transform=reference.decorate_staff)
+        
+        staff = [reference.decorate_staff(row) for row in db.execute_query(query + STAFF_KEYSET.order_by())]
         print(f"Retrieved {len(staff)} staff members")
         return jsonify({'success': True, 'data': staff}), 200
     except Exception as e:
@@ -26,17 +52,15 @@ def get_all_staff():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @staff_bp.route('/<int:staff_id>', methods=['GET'])
+@conditional('Staff', 'Airline', 'Airport')
 def get_staff(staff_id):
     """Get a specific staff member by ID"""
     try:
         query = """
             SELECT 
                 s.Staff_ID, s.First_Name, s.Last_Name, s.Role,
-                s.Airline_ID, al.Name AS Airline,
-                s.Airport_ID, a.Name AS Airport, a.City AS Airport_City, a.Country AS Airport_Country
+                s.Airline_ID, s.Airport_ID
             FROM Staff s
-            JOIN Airline al ON s.Airline_ID = al.Airline_ID
-            JOIN Airport a ON s.Airport_ID = a.Airport_ID
             WHERE s.Staff_ID = %s
         """
         staff = db.execute_query(query, (staff_id,), fetch_one=True)
@@ -44,7 +68,7 @@ def get_staff(staff_id):
         if not staff:
             return jsonify({'success': False, 'error': 'Staff not found'}), 404
         
-        return jsonify({'success': True, 'data': staff}), 200
+        return jsonify({'success': True, 'data': reference.decorate_staff(staff)}), 200
     except Exception as e:
         print(f"Error fetching staff {staff_id}: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -94,21 +118,12 @@ def create_staff():
             return jsonify({'success': False, 'error': f'Invalid role. Must be one of: {", ".join(valid_roles)}'}), 400
         
         # Validate airline exists
-        airline_check = db.execute_query(
-            "SELECT Airline_ID, Name FROM Airline WHERE Airline_ID = %s", 
-            (airline_id,), 
-            fetch_one=True
-        )
+        airline_check = reference.airline(airline_id)
         if not airline_check:
             return jsonify({'success': False, 'error': 'Invalid airline selected'}), 400
         
         # Validate airport exists
-        airport_check = db.execute_query(
-            "SELECT Airport_ID, Name FROM Airport WHERE Airport_ID = %s", 
-            (airport_id,), 
-            fetch_one=True
-        )
-        if not airport_check:
+        if not reference.airport(airport_id):
             return jsonify({'success': False, 'error': 'Invalid airport selected'}), 400
         
         # Check for duplicate staff (same name, role, airline)
@@ -148,6 +163,85 @@ def create_staff():
         print(f"Error creating staff: {str(e)}")
         return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
 
+@staff_bp.route('/bulk', methods=['POST'])
+@deferrable
+def bulk_create_staff():
+    """Create many staff members from a JSON array or CSV upload, reporting per-row errors"""
+    try:
+        try:
+            rows = read_bulk_rows()
+        except ValueError as ve:
+            return jsonify({'success': False, 'error': str(ve)}), 400
+
+        valid_roles = [
+            'Pilot', 'Flight Attendant', 'Ground Staff', 'Engineer',
+            'Cabin Crew', 'Technician', 'Security Officer',
+            'Check-in Staff', 'Flight Supervisor'
+        ]
+        name_pattern = r"^[a-zA-Z\s\-'\.]+$"
+        airline_ids = {
+            int(row['airline_id']) for row in rows if str(row.get('airline_id', '')).strip().isdigit()
+        }
+        known_airlines = airline_ids & reference.airlines().keys()
+        known_airports = reference.airports()
+        # Existing (first, last, role, airline) combinations for the airlines in this batch
+        existing_staff = set()
+        if known_airlines:
+            placeholders = ', '.join(['%s'] * len(known_airlines))
+            for staff in db.execute_query(
+                f"""
+                SELECT LOWER(First_Name) AS first_name, LOWER(Last_Name) AS last_name, Role, Airline_ID
+                FROM Staff WHERE Airline_ID IN ({placeholders})
+                """,
+                tuple(known_airlines)
+            ):
+                existing_staff.add((staff['first_name'], staff['last_name'], staff['Role'], staff['Airline_ID']))
+
+        valid, errors = [], {}
+        for index, data in enumerate(rows):
+            missing = [field for field in ['first_name', 'last_name', 'role', 'airline_id', 'airport_id']
+                       if not str(data.get(field) or '').strip()]
+            if missing:
+                errors[index] = f'Missing or empty field: {missing[0]}'
+                continue
+            first_name = str(data['first_name']).strip()
+            last_name = str(data['last_name']).strip()
+            role = str(data['role']).strip()
+            try:
+                airline_id = int(data['airline_id'])
+                airport_id = int(data['airport_id'])
+            except ValueError:
+                errors[index] = 'Invalid airline or airport ID format'
+                continue
+            key = (first_name.lower(), last_name.lower(), role, airline_id)
+
+            if len(first_name) > 100 or len(last_name) > 100 or len(role) > 100:
+                errors[index] = 'Field too long (maximum 100 characters)'
+            elif not re.match(name_pattern, first_name):
+                errors[index] = 'First name contains invalid characters'
+            elif not re.match(name_pattern, last_name):
+                errors[index] = 'Last name contains invalid characters'
+            elif role not in valid_roles:
+                errors[index] = f'Invalid role. Must be one of: {", ".join(valid_roles)}'
+            elif airline_id not in known_airlines:
+                errors[index] = 'Invalid airline selected'
+            elif airport_id not in known_airports:
+                errors[index] = 'Invalid airport selected'
+            elif key in existing_staff:
+                errors[index] = f'Staff member {first_name} {last_name} with role {role} already exists for this airline'
+            else:
+                existing_staff.add(key)
+                valid.append((index, (first_name, last_name, role, airline_id, airport_id)))
+
+        query = """
+            INSERT INTO Staff (First_Name, Last_Name, Role, Airline_ID, Airport_ID)
+            VALUES (%s, %s, %s, %s, %s)
+        """
+        return insert_valid_rows(query, len(rows), valid, errors, 'staff_id')
+    except Exception as e:
+        print(f"Error bulk creating staff: {str(e)}")
+        return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
+
 @staff_bp.route('/<int:staff_id>', methods=['PUT'])
 def update_staff(staff_id):
     """Update an existing staff member with enhanced validation"""
@@ -158,11 +252,8 @@ def update_staff(staff_id):
         # Check if staff exists and get current details
         existing_staff = db.execute_query(
             """
-            SELECT s.Staff_ID, s.First_Name, s.Last_Name, s.Role, s.Airline_ID, s.Airport_ID,
-                   al.Name as Airline_Name, a.Name as Airport_Name
+            SELECT s.Staff_ID, s.First_Name, s.Last_Name, s.Role, s.Airline_ID, s.Airport_ID
             FROM Staff s
-            JOIN Airline al ON s.Airline_ID = al.Airline_ID
-            JOIN Airport a ON s.Airport_ID = a.Airport_ID
             WHERE s.Staff_ID = %s
             """, 
             (staff_id,), 
@@ -221,21 +312,11 @@ def update_staff(staff_id):
                     
                     # Validate foreign keys
                     if json_field == 'airline_id':
-                        airline_check = db.execute_query(
-                            "SELECT Airline_ID, Name FROM Airline WHERE Airline_ID = %s", 
-                            (new_value,), 
-                            fetch_one=True
-                        )
-                        if not airline_check:
+                        if not reference.airline(new_value):
                             return jsonify({'success': False, 'error': 'Invalid airline selected'}), 400
                     
                     if json_field == 'airport_id':
-                        airport_check = db.execute_query(
-                            "SELECT Airport_ID, Name FROM Airport WHERE Airport_ID = %s", 
-                            (new_value,), 
-                            fetch_one=True
-                        )
-                        if not airport_check:
+                        if not reference.airport(new_value):
                             return jsonify({'success': False, 'error': 'Invalid airport selected'}), 400
                 
                 # Only update if actually changed
@@ -355,10 +436,8 @@ def transfer_staff():
         # Validate staff exists and get current details
         staff_check = db.execute_query(
             """
-            SELECT s.Staff_ID, s.First_Name, s.Last_Name, s.Airport_ID, s.Role,
-                   a.Name as Current_Airport, a.City as Current_City
+            SELECT s.Staff_ID, s.First_Name, s.Last_Name, s.Airport_ID, s.Role
             FROM Staff s
-            JOIN Airport a ON s.Airport_ID = a.Airport_ID
             WHERE s.Staff_ID = %s
             """, 
             (staff_id,), 
@@ -366,17 +445,16 @@ def transfer_staff():
         )
         if not staff_check:
             return jsonify({'success': False, 'error': 'Staff member not found'}), 404
+        current_airport = reference.airport(staff_check['Airport_ID']) or {}
+        staff_check['Current_Airport'] = current_airport.get('Name')
+        staff_check['Current_City'] = current_airport.get('City')
         
         # Check if trying to transfer to same airport
         if staff_check['Airport_ID'] == new_airport_id:
             return jsonify({'success': False, 'error': f'Staff member is already assigned to this airport ({staff_check["Current_Airport"]})'}), 400
         
         # Validate new airport exists
-        airport_check = db.execute_query(
-            "SELECT Airport_ID, Name, City FROM Airport WHERE Airport_ID = %s", 
-            (new_airport_id,), 
-            fetch_one=True
-        )
+        airport_check = reference.airport(new_airport_id)
         if not airport_check:
             return jsonify({'success': False, 'error': 'Invalid destination airport'}), 400
         
@@ -405,6 +483,7 @@ def transfer_staff():
         return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
 
 @staff_bp.route('/<int:staff_id>/history', methods=['GET'])
+@conditional('Staff', 'StaffHistory', 'Airport')
 def get_staff_history(staff_id):
     """Get transfer history for a staff member with enhanced validation"""
     try:
@@ -419,18 +498,20 @@ def get_staff_history(staff_id):
         
         query = """
             SELECT 
-                sh.History_ID,
-                a1.Name AS Old_Airport, a1.City AS Old_City, a1.Country AS Old_Country,
-                a2.Name AS New_Airport, a2.City AS New_City, a2.Country AS New_Country,
+                sh.History_ID, sh.Old_Airport_ID, sh.New_Airport_ID,
                 sh.Changed_At,
                 sh.Notes
             FROM StaffHistory sh
-            LEFT JOIN Airport a1 ON sh.Old_Airport_ID = a1.Airport_ID
-            LEFT JOIN Airport a2 ON sh.New_Airport_ID = a2.Airport_ID
             WHERE sh.Staff_ID = %s
             ORDER BY sh.Changed_At DESC
         """
         history = db.execute_query(query, (staff_id,))
+        for entry in history:
+            for prefix in ('Old', 'New'):
+                airport = reference.airport(entry.pop(f'{prefix}_Airport_ID')) or {}
+                entry[f'{prefix}_Airport'] = airport.get('Name')
+                entry[f'{prefix}_City'] = airport.get('City')
+                entry[f'{prefix}_Country'] = airport.get('Country')
         
         print(f"Retrieved {len(history)} transfer history records for staff {staff_id}")
         return jsonify({
@@ -444,6 +525,8 @@ def get_staff_history(staff_id):
         return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
 
 @staff_bp.route('/statistics', methods=['GET'])
+@conditional('Staff', 'Airline', 'Airport')
+@cached_response('Staff', 'Airline', 'Airport')
 def get_staff_statistics():
     """Get comprehensive staff statistics"""
     try:
@@ -501,30 +584,24 @@ def get_staff_statistics():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @staff_bp.route('/by-airline/<int:airline_id>', methods=['GET'])
+@conditional('Staff', 'Airline', 'Airport')
 def get_staff_by_airline(airline_id):
     """Get all staff members for a specific airline"""
     try:
         # Validate airline exists
-        airline_check = db.execute_query(
-            "SELECT Name FROM Airline WHERE Airline_ID = %s", 
-            (airline_id,), 
-            fetch_one=True
-        )
+        airline_check = reference.airline(airline_id)
         if not airline_check:
             return jsonify({'success': False, 'error': 'Airline not found'}), 404
         
         query = """
             SELECT 
                 s.Staff_ID, s.First_Name, s.Last_Name, s.Role,
-                al.Name AS Airline,
-                a.Name AS Airport, a.City AS Airport_City
+                s.Airline_ID, s.Airport_ID
             FROM Staff s
-            JOIN Airline al ON s.Airline_ID = al.Airline_ID
-            JOIN Airport a ON s.Airport_ID = a.Airport_ID
             WHERE s.Airline_ID = %s
             ORDER BY s.Last_Name, s.First_Name
         """
-        staff = db.execute_query(query, (airline_id,))
+        staff = [reference.decorate_staff(row) for row in db.execute_query(query, (airline_id,))]
         return jsonify({
             'success': True, 
             'data': staff,
@@ -534,34 +611,39 @@ def get_staff_by_airline(airline_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @staff_bp.route('/by-airport/<int:airport_id>', methods=['GET'])
+@conditional('Staff', 'Airline', 'Airport')
 def get_staff_by_airport(airport_id):
     """Get all staff members for a specific airport"""
     try:
         # Validate airport exists
-        airport_check = db.execute_query(
-            "SELECT Name FROM Airport WHERE Airport_ID = %s", 
-            (airport_id,), 
-            fetch_one=True
-        )
+        airport_check = reference.airport(airport_id)
         if not airport_check:
             return jsonify({'success': False, 'error': 'Airport not found'}), 404
         
         query = """
             SELECT 
                 s.Staff_ID, s.First_Name, s.Last_Name, s.Role,
-                al.Name AS Airline,
-                a.Name AS Airport, a.City AS Airport_City
+                s.Airline_ID, s.Airport_ID
             FROM Staff s
-            JOIN Airline al ON s.Airline_ID = al.Airline_ID
-            JOIN Airport a ON s.Airport_ID = a.Airport_ID
             WHERE s.Airport_ID = %s
-            ORDER BY al.Name, s.Last_Name, s.First_Name
+            ORDER BY s.Last_Name, s.First_Name
         """
-        staff = db.execute_query(query, (airport_id,))
+        staff = [reference.decorate_staff(row) for row in db.execute_query(query, (airport_id,))]
+        # Stable sort keeps the name order within each airline
+        staff.sort(key=lambda row: row['Airline'] or '')
         return jsonify({
             'success': True, 
             'data': staff,
             'airport_name': airport_check['Name']
         }), 200
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+STAFF_CHANGES = ChangeFeed('Staff', 's', 'Staff_ID', """
+    SELECT
+        s.Staff_ID, s.First_Name, s.Last_Name, s.Role,
+        s.Airline_ID, s.Airport_ID, s.Updated_At
+    FROM Staff s
+    WHERE 1=1
+""", transform=reference.decorate_staff)
+STAFF_CHANGES.register(staff_bp)
@@ -0,0 +1,91 @@
+import csv
+import io
+import os
+from flask import jsonify, request
+from database.db import db
+
+BULK_MAX_ROWS = int(os.getenv('BULK_MAX_ROWS', 10000))
+
+def read_bulk_rows():
+    """Rows of a bulk request as a list of dicts
+
+    Accepts a JSON array (or {"rows": [...]}), a CSV file uploaded as the
+    multipart field "file", or a text/csv request body. CSV headers are
+    lower-cased so they match the JSON field names.
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        return _parse_csv(upload.read().decode('utf-8-sig'))
+    if request.mimetype in ('text/csv', 'application/csv'):
+        return _parse_csv(request.get_data(as_text=True))
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('rows')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of rows or a CSV upload')
+    if len(data) > BULK_MAX_ROWS:
+        raise ValueError(f'Too many rows (maximum {BULK_MAX_ROWS})')
+    for row in data:
+        if not isinstance(row, dict):
+            raise ValueError('Every row must be a JSON object')
+    return data
+
+def _parse_csv(text):
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames:
+        raise ValueError('CSV upload has no header row')
+    rows = []
+    for row in reader:
+        if len(rows) >= BULK_MAX_ROWS:
+            raise ValueError(f'Too many rows (maximum {BULK_MAX_ROWS})')
+        rows.append({
+            (key or '').strip().lower(): value.strip() if isinstance(value, str) else value
+            for key, value in row.items()
+        })
+    return rows
+
+def find_existing(query, values, chunk_size=1000):
+    """Run query once per chunk of values and return the first column of every row
+
+    query must contain a {placeholders} marker for the IN list.
+    """
+    values = list(dict.fromkeys(values))
+    found = set()
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        placeholders = ', '.join(['%s'] * len(chunk))
+        for row in db.execute_query(query.format(placeholders=placeholders), tuple(chunk)):
+            found.add(next(iter(row.values())))
+    return found
+
+def insert_valid_rows(query, total, valid, errors, id_field):
+    """Insert validated rows with execute_many and build the per-row report
+
+    valid is a list of (row_index, params); errors maps row_index to a message.
+    """
+    result = db.execute_many(query, [params for _, params in valid], row_errors=True)
+
+    results = []
+    for position, (index, _) in enumerate(valid):
+        if position in result['errors']:
+            errors[index] = result['errors'][position]
+        else:
+            results.append({'row': index + 1, id_field: result['ids'][position]})
+    failed = [{'row': index + 1, 'error': message} for index, message in sorted(errors.items())]
+
+    inserted = len(results)
+    if not failed:
+        status = 201
+    elif inserted:
+        status = 207
+    else:
+        status = 400
+    return jsonify({
+        'success': inserted > 0 or total == 0,
+        'message': f'{inserted} of {total} rows inserted',
+        'inserted': inserted,
+        'failed': len(failed),
+        'data': results,
+        'errors': failed
+    }), status
@@ -0,0 +1,161 @@
+import os
+import time
+import mysql.connector
+from flask import jsonify, request
+from database.db import db
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Keyset, SortKey
+
+# Rows changed within the last SETTLE_SECONDS are held back for a later call,
+# so a transaction committing after a younger one is not skipped. Updated_At
+# is stamped when a statement runs but visible only at commit, so the window
+# alone misses rows of longer transactions (bulk imports, slow
+# db.transaction() blocks): the cutoff also stops at the start of the oldest
+# open transaction that has written or is running a statement
+# (information_schema.INNODB_TRX, which needs the PROCESS privilege; without
+# it only the window applies).
+SETTLE_SECONDS = float(os.getenv('CHANGES_SETTLE_SECONDS', 2))
+TOMBSTONE_RETENTION_DAYS = int(os.getenv('CHANGES_TOMBSTONE_RETENTION_DAYS', 30))
+
+_CUTOFF_QUERY = """
+    SELECT LEAST(NOW(6) - INTERVAL %s MICROSECOND, COALESCE(MIN(trx_started), NOW(6))) AS cutoff
+    FROM information_schema.INNODB_TRX
+    WHERE trx_mysql_thread_id <> CONNECTION_ID()
+      AND (trx_rows_modified > 0 OR trx_query IS NOT NULL)
+"""
+_trx_visible = True
+
+def _cutoff(cursor, settle_us):
+    """Newest Updated_At a feed may hand out: nothing older can still commit"""
+    global _trx_visible
+    if _trx_visible:
+        try:
+            cursor.execute(_CUTOFF_QUERY, (settle_us,))
+            return cursor.fetchone()['cutoff']
+        except mysql.connector.ProgrammingError as e:
+            _trx_visible = False
+            print(f"Change feeds cannot see open transactions, using the settle window only: {str(e)}")
+    cursor.execute("SELECT NOW(6) - INTERVAL %s MICROSECOND AS cutoff", (settle_us,))
+    return cursor.fetchone()['cutoff']
+
+class ChangeFeed:
+    """Rows of one table inserted or updated since a token, plus delete tombstones
+
+    The query selects the table's Updated_At and primary key and ends in a
+    WHERE clause. Tokens are opaque: "<row cursor>.<last tombstone>.<issued at>".
+    register() serves the feed as GET /changes on a blueprint.
+    """
+
+    def __init__(self, table, alias, key_column, query, transform=None):
+        self.table = table
+        self.query = query
+        self.transform = transform
+        self.updated_at = f'{alias}.Updated_At'
+        self.keyset = Keyset(
+            SortKey(self.updated_at, 'Updated_At'),
+            SortKey(f'{alias}.{key_column}', key_column)
+        )
+
+    def _parse(self, since):
+        try:
+            row_cursor, tombstone_id, issued_at = since.split('.')
+            after = self.keyset.decode(row_cursor) if row_cursor else None
+            return after, int(tombstone_id), float(issued_at)
+        except ValueError:
+            raise ValueError('Invalid since token')
+
+    def _token(self, after, tombstone_id):
+        row_cursor = ''
+        if after is not None:
+            row_cursor = self.keyset.encode(dict(zip([key.column for key in self.keyset.keys], after)))
+        return f'{row_cursor}.{tombstone_id}.{int(time.time())}'
+
+    def register(self, blueprint):
+        """Serve this feed as GET /changes on blueprint; returns the feed"""
+        name = blueprint.name
+
+        def get_changes():
+            try:
+                return self.response()
+            except Exception as e:
+                print(f"Error fetching {name} changes: {str(e)}")
+                return jsonify({'success': False, 'error': str(e)}), 500
+
+        get_changes.__doc__ = (f"Get {name} inserted or updated since ?since= plus IDs deleted since then\n\n"
+                               "Omit since for an initial sync; pass each response's next_since to the next call.")
+        blueprint.add_url_rule('/changes', f'get_{name}_changes', get_changes, methods=['GET'])
+        return self
+
+    def response(self):
+        """Answer GET /changes?since=&limit= for this table"""
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+        if limit < 1:
+            return jsonify({'success': False, 'error': 'limit must be positive'}), 400
+        limit = min(limit, MAX_PAGE_SIZE)
+
+        since = request.args.get('since')
+        if since:
+            try:
+                after, tombstone_id, issued_at = self._parse(since)
+            except ValueError as ve:
+                return jsonify({'success': False, 'error': str(ve)}), 400
+            # Tombstones older than the retention window may already be pruned
+            if issued_at < time.time() - TOMBSTONE_RETENTION_DAYS * 86400 + SETTLE_SECONDS:
+                return jsonify({'success': False, 'error': 'since token expired; reload the full collection'}), 410
+        else:
+            # Initial sync: every current row, and only deletes from now on
+            after = None
+            latest = db.execute_query(
+                "SELECT COALESCE(MAX(Tombstone_ID), 0) AS last_id FROM RowTombstone WHERE Table_Name = %s",
+                (self.table,), fetch_one=True
+            )
+            tombstone_id = latest['last_id']
+
+        query = self.query + f' AND {self.updated_at} < %s'
+        condition_params = []
+        if after is not None:
+            condition, condition_params = self.keyset.where(after)
+            query += ' AND ' + condition
+        query += self.keyset.order_by() + ' LIMIT %s'
+        # Feeds always read the primary: a lagging replica would advance the token past unseen rows
+        with db.get_cursor() as (cursor, connection):
+            cutoff = _cutoff(cursor, int(SETTLE_SECONDS * 1000000))
+            cursor.execute(query, [cutoff] + list(condition_params) + [limit + 1])
+            rows = cursor.fetchall()
+            cursor.execute(
+                """
+                SELECT Tombstone_ID, Row_ID FROM RowTombstone
+                WHERE Table_Name = %s AND Tombstone_ID > %s AND Deleted_At < %s
+                ORDER BY Tombstone_ID
+                LIMIT %s
+                """,
+                (self.table, tombstone_id, cutoff, limit + 1)
+            )
+            tombstones = cursor.fetchall()
+
+        has_more = len(rows) > limit or len(tombstones) > limit
+        rows, tombstones = rows[:limit], tombstones[:limit]
+        if rows:
+            after = [key.value(rows[-1]) for key in self.keyset.keys]
+        if tombstones:
+            tombstone_id = tombstones[-1]['Tombstone_ID']
+        next_since = self._token(after, tombstone_id)
+
+        if self.transform is not None:
+            rows = [self.transform(row) for row in rows]
+        return jsonify({
+            'success': True,
+            'data': rows,
+            'deleted': [tombstone['Row_ID'] for tombstone in tombstones],
+            'next_since': next_since,
+            'has_more': has_more
+        }), 200
+
+def prune_tombstones():
+    """Delete tombstones older than the retention window; returns the number removed"""
+    return db.execute_update(
+        "DELETE FROM RowTombstone WHERE Deleted_At < NOW(6) - INTERVAL %s DAY",
+        (TOMBSTONE_RETENTION_DAYS,)
+    )
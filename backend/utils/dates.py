@@ -0,0 +1,34 @@
+from datetime import date, timedelta
+from flask import request
+
+def _parse_day(name, value):
+    try:
+        return date.fromisoformat(value.strip()[:10])
+    except ValueError:
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+
+def day_range(column, day_param='date'):
+    """Half-open range filter on a DATETIME column from ?date= / ?date_from= / ?date_to=
+
+    Returns (sql, params) to append to a WHERE clause; sql is empty when no
+    date was requested. date_to is inclusive of the whole day. Comparing the
+    bare column (instead of DATE(column) = ...) lets MySQL use an index on it.
+    Raises ValueError for malformed dates.
+    """
+    clauses, params = [], []
+    single = request.args.get(day_param)
+    date_from = request.args.get('date_from')
+    date_to = request.args.get('date_to')
+
+    if single:
+        day = _parse_day(day_param, single)
+        clauses.append(f'{column} >= %s AND {column} < %s')
+        params.extend([day, day + timedelta(days=1)])
+    if date_from:
+        clauses.append(f'{column} >= %s')
+        params.append(_parse_day('date_from', date_from))
+    if date_to:
+        clauses.append(f'{column} < %s')
+        params.append(_parse_day('date_to', date_to) + timedelta(days=1))
+
+    return ''.join(f' AND {clause}' for clause in clauses), params
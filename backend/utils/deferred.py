@@ -0,0 +1,80 @@
+import base64
+from functools import wraps
+from urllib.parse import urlencode
+from flask import jsonify, request
+from database.jobs import JobError, job_handler, submit
+
+def wants_async():
+    return request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+def accepted(job_id, message='Job queued'):
+    """The 202 response for a queued job, pointing at its status URL"""
+    status_url = f'/api/jobs/{job_id}'
+    return jsonify({
+        'success': True,
+        'message': message,
+        'job_id': job_id,
+        'status_url': status_url
+    }), 202, {'Location': status_url}
+
+def deferrable(view):
+    """Run the endpoint as a background job when called with ?async=1
+
+    The request (method, path, query, body) is stored in a 'request' job and
+    replayed through the app by a worker; the client gets 202 with the job id
+    and polls GET /api/jobs/<id> for the response. Place directly under @route.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not wants_async():
+            return view(*args, **kwargs)
+        payload = {
+            'method': request.method,
+            'path': request.path,
+            'query': urlencode([(key, value) for key, value in request.args.items(multi=True) if key != 'async']),
+            'content_type': request.content_type,
+            'body': base64.b64encode(request.get_data()).decode('ascii')
+        }
+        job_id = submit('request', payload)
+        print(f"Deferred {request.method} {request.path} as job {job_id}")
+        return accepted(job_id)
+    return wrapper
+
+@job_handler('request')
+def replay_request(payload, job):
+    """Replay a deferred request through the app's full request pipeline
+
+    Server errors raise so the job is retried; client errors fail it for good.
+    """
+    app = job.app
+    options = {
+        'method': payload['method'],
+        'query_string': payload['query'],
+        'data': base64.b64decode(payload['body']),
+        'headers': {'X-Job-ID': str(job.job_id)}
+    }
+    if payload.get('content_type'):
+        options['content_type'] = payload['content_type']
+
+    # Same pipeline as /api/batch sub-requests: one app context, one pooled connection
+    with app.app_context():
+        with app.test_request_context(payload['path'], **options):
+            response = app.full_dispatch_request()
+            try:
+                body = response.get_json(silent=True)
+                if body is None:
+                    body = response.get_data(as_text=True) or None
+            finally:
+                response.close()
+
+    result = {'status': response.status_code, 'body': body}
+    if response.status_code >= 500:
+        raise Exception(_error_text(body) or f'HTTP {response.status_code}')
+    if response.status_code >= 400:
+        raise JobError(_error_text(body) or f'HTTP {response.status_code}', result)
+    return result
+
+def _error_text(body):
+    if isinstance(body, dict):
+        return body.get('error')
+    return body
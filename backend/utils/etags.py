@@ -0,0 +1,51 @@
+import hashlib
+import os
+from functools import wraps
+from flask import Response, make_response, request
+from database.versions import table_versions
+
+# 0 reads TableVersion on every request, so a write in any worker changes the ETag at once
+ETAG_VERSION_MAX_AGE = float(os.getenv('ETAG_VERSION_MAX_AGE', 0))
+CACHE_CONTROL = 'private, no-cache'
+
+def version_etag(tables, versions):
+    """Strong ETag for the current request given the versions of the tables it reads"""
+    parts = [
+        request.path,
+        repr(sorted(request.args.items(multi=True))),
+        # Streamed lists answer as JSON or NDJSON depending on Accept
+        request.headers.get('Accept', ''),
+        ','.join(f'{table}={version}' for table, version in zip(tables, versions))
+    ]
+    return hashlib.sha1('\n'.join(parts).encode()).hexdigest()[:24]
+
+def _validators(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    response.vary.add('Accept')
+    return response
+
+def conditional(*tables):
+    """Tag a GET view's response with an ETag derived from table versions and answer If-None-Match with 304
+
+    The view only runs when the client's copy is out of date. Without
+    readable versions the view runs normally and no ETag is sent.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = table_versions.current(tables, max_age=ETAG_VERSION_MAX_AGE)
+            if versions is None:
+                return view(*args, **kwargs)
+            etag = version_etag(tables, versions)
+            if request.if_none_match.contains_weak(etag):
+                return _validators(Response(status=304), etag)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _validators(response, etag)
+            return response
+        return wrapper
+
+    return decorator
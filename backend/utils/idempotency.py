@@ -0,0 +1,134 @@
+import hashlib
+import os
+from functools import wraps
+import mysql.connector
+from flask import Response, jsonify, make_response, request
+from database.db import db
+from database.versions import REPLAYED_HEADER
+
+# How long a finished response is replayed
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 86400))
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+# Lock wait timeout and deadlock while waiting on a concurrent request's claim
+LOCK_ERRORS = (1205, 1213)
+
+class _Rollback(Exception):
+    """Ends the idempotent transaction without committing; carries the response to send"""
+
+    def __init__(self, response=None):
+        super().__init__('Idempotent request rolled back')
+        self.response = response
+
+def _digest(*parts):
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).digest()
+
+def _error(message, code, status, headers=None):
+    return jsonify({'success': False, 'error': message, 'code': code}), status, headers or {}
+
+def _in_progress():
+    return _error('A request with this Idempotency-Key is still in progress',
+                  'IDEMPOTENCY_IN_PROGRESS', 409, {'Retry-After': '1'})
+
+def _lookup(key_hash):
+    # Always the primary: the response may be milliseconds old
+    with db.get_cursor() as (cursor, connection):
+        cursor.execute(
+            "SELECT Request_Hash, Status, Response_Status, Response_Type, Response_Body, "
+            "Expires_At > NOW(6) AS Live FROM IdempotencyKey WHERE Key_Hash = %s",
+            (key_hash,)
+        )
+        return cursor.fetchone()
+
+def _answer(row, request_hash):
+    """The response for a key another request already used"""
+    if row is None or not row['Live'] or row['Status'] != 'Done':
+        return _in_progress()
+    if bytes(row['Request_Hash']) != request_hash:
+        return _error(f'{IDEMPOTENCY_HEADER} was already used with a different request body',
+                      'IDEMPOTENCY_KEY_REUSED', 422)
+    response = Response(row['Response_Body'], status=row['Response_Status'], mimetype=row['Response_Type'])
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+def _claim(key_hash, request_hash, expired):
+    """Insert the key in the open transaction
+
+    A concurrent request with the same key waits on this row lock until the
+    transaction ends: it then sees the stored response, or claims the key
+    itself if this one rolled back.
+    """
+    try:
+        with db.get_cursor() as (cursor, connection):
+            if expired:
+                cursor.execute("DELETE FROM IdempotencyKey WHERE Key_Hash = %s AND Expires_At <= NOW(6)", (key_hash,))
+            cursor.execute(
+                "INSERT INTO IdempotencyKey (Key_Hash, Request_Hash, Expires_At) "
+                "VALUES (%s, %s, NOW(6) + INTERVAL %s SECOND)",
+                (key_hash, request_hash, IDEMPOTENCY_TTL)
+            )
+    except mysql.connector.IntegrityError:
+        # Committed by the request we were waiting on
+        raise _Rollback()
+    except mysql.connector.Error as e:
+        if e.errno not in LOCK_ERRORS:
+            raise
+        raise _Rollback(_in_progress())
+
+def _complete(key_hash, response):
+    with db.get_cursor() as (cursor, connection):
+        if response.is_streamed:
+            # Nothing reliable to replay: the work stands but a retry runs again
+            cursor.execute("DELETE FROM IdempotencyKey WHERE Key_Hash = %s", (key_hash,))
+            return
+        cursor.execute(
+            "UPDATE IdempotencyKey SET Status = 'Done', Response_Status = %s, Response_Type = %s, "
+            "Response_Body = %s WHERE Key_Hash = %s",
+            (response.status_code, response.mimetype, response.get_data(as_text=True), key_hash)
+        )
+
+def idempotent(view):
+    """Honour an Idempotency-Key header on a POST view
+
+    The key is claimed, the view run and its response stored in one
+    transaction, so the work and the stored response commit together or not
+    at all. Retries with the same key and body get the stored response back
+    without running the view; a retry racing the first request waits for it
+    (409 if it takes longer than the lock wait timeout). Reusing a key with a
+    different body gets 422. Server errors roll everything back so the retry
+    runs again. Requests without the header run normally. Place directly
+    under @route; the view must not commit on its own (stored procedures use
+    savepoints).
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        key = key.strip()
+        if not key or len(key) > 255:
+            return _error(f'{IDEMPOTENCY_HEADER} must be 1-255 characters', 'IDEMPOTENCY_KEY_INVALID', 400)
+
+        key_hash = _digest(request.method, request.path, key)
+        request_hash = hashlib.sha256(request.get_data()).digest()
+        row = _lookup(key_hash)
+        if row is not None and row['Live']:
+            return _answer(row, request_hash)
+
+        try:
+            with db.transaction():
+                _claim(key_hash, request_hash, expired=row is not None)
+                response = make_response(view(*args, **kwargs))
+                if response.status_code >= 500:
+                    # The view may have written part of its work before failing
+                    raise _Rollback(response)
+                _complete(key_hash, response)
+        except _Rollback as rollback:
+            if rollback.response is not None:
+                return rollback.response
+            return _answer(_lookup(key_hash), request_hash)
+        return response
+    return wrapper
+
+def prune_idempotency_keys():
+    """Delete expired keys; returns the number removed"""
+    return db.execute_update("DELETE FROM IdempotencyKey WHERE Expires_At <= NOW(6)")
@@ -0,0 +1,139 @@
+import base64
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from flask import jsonify, request
+
+DEFAULT_PAGE_SIZE = int(os.getenv('PAGE_SIZE_DEFAULT', 50))
+MAX_PAGE_SIZE = int(os.getenv('PAGE_SIZE_MAX', 500))
+
+class SortKey:
+    """One ORDER BY column of a keyset: SQL expression, result column and direction
+
+    null_as substitutes a sentinel for NULLs so they can be compared; the
+    expression must apply the same COALESCE.
+    """
+
+    def __init__(self, expression, column, descending=False, null_as=None):
+        self.expression = expression
+        self.column = column
+        self.descending = descending
+        self.null_as = null_as
+
+    def value(self, row):
+        value = row.get(self.column)
+        return self.null_as if value is None else value
+
+class Keyset:
+    """Keyset pagination over an ordered list query; the last key must be unique (the PK)"""
+
+    def __init__(self, *keys):
+        self.keys = keys
+        # Cursors only apply to the ordering they were issued for
+        self.signature = ','.join(f'{key.column}{"-" if key.descending else "+"}' for key in keys)
+
+    def order_by(self):
+        return ' ORDER BY ' + ', '.join(
+            f'{key.expression} {"DESC" if key.descending else "ASC"}' for key in self.keys
+        )
+
+    def where(self, values):
+        """SQL fragment (without leading AND) selecting rows strictly after values"""
+        first = self.keys[0]
+        # Leading bound keeps the condition usable as an index range
+        clauses = [f'{first.expression} {"<=" if first.descending else ">="} %s']
+        params = [values[0]]
+
+        alternatives = []
+        for i, key in enumerate(self.keys):
+            terms = [f'{previous.expression} = %s' for previous in self.keys[:i]]
+            terms.append(f'{key.expression} {"<" if key.descending else ">"} %s')
+            alternatives.append('(' + ' AND '.join(terms) + ')')
+            params.extend(values[:i + 1])
+        clauses.append('(' + ' OR '.join(alternatives) + ')')
+        return ' AND '.join(clauses), params
+
+    def encode(self, row):
+        values = [_encode_value(key.value(row)) for key in self.keys]
+        payload = json.dumps({'k': self.signature, 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values = [_decode_value(value) for value in payload['v']]
+        except Exception:
+            raise ValueError('Invalid cursor')
+        if payload.get('k') != self.signature or len(values) != len(self.keys):
+            raise ValueError('Cursor does not belong to this listing')
+        return values
+
+class Page:
+    """Pagination request parsed from ?limit= and ?cursor="""
+
+    def __init__(self, keyset, limit, after):
+        self.keyset = keyset
+        self.limit = limit
+        self.after = after
+
+    def apply(self, query, params):
+        """Append the keyset condition, ORDER BY and LIMIT to a query ending in a WHERE clause"""
+        params = list(params or [])
+        if self.after is not None:
+            condition, condition_params = self.keyset.where(self.after)
+            query += ' AND ' + condition
+            params.extend(condition_params)
+        query += self.keyset.order_by() + ' LIMIT %s'
+        # One extra row tells us whether another page exists
+        params.append(self.limit + 1)
+        return query, params
+
+    def response(self, rows, transform=None, **extra):
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        next_cursor = self.keyset.encode(rows[-1]) if has_more and rows else None
+        if transform is not None:
+            rows = [transform(row) for row in rows]
+        body = {'success': True, 'data': rows, 'next_cursor': next_cursor, 'has_more': has_more}
+        body.update(extra)
+        return jsonify(body), 200
+
+def requested_page(keyset):
+    """Return a Page when the client asked for pagination, else None
+
+    Raises ValueError for a malformed limit or cursor.
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if limit is None and not cursor:
+        return None
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    limit = min(limit, MAX_PAGE_SIZE)
+    return Page(keyset, limit, keyset.decode(cursor) if cursor else None)
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'n': str(value)}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'n' in value:
+            return Decimal(value['n'])
+        raise ValueError('Unknown cursor value')
+    return value
@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+from functools import wraps
+from flask import Response, make_response, request
+from database.versions import table_versions
+
+class _Pending:
+    """A recomputation in progress; waiters pick up its result when done is set"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+class ResponseCache:
+    """Serialized JSON responses of read-only endpoints, keyed by URL
+
+    An entry is served until its TTL expires or a write bumps one of the
+    tables it was computed from. Concurrent misses for the same key are
+    coalesced: one request runs the view, the others wait for its result.
+    """
+
+    def __init__(self, ttl=30, max_entries=256, wait_timeout=30):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _lookup(self, key, versions):
+        entry = self._entries.get(key)
+        if entry is None or entry['expires'] <= time.monotonic():
+            return None
+        # Unreadable versions (None) leave only the TTL to expire the entry
+        if versions is not None and entry['versions'] != versions:
+            return None
+        return entry
+
+    def _store(self, key, versions, ttl, result):
+        if len(self._entries) >= self.max_entries:
+            now = time.monotonic()
+            for stale in [k for k, entry in self._entries.items() if entry['expires'] <= now]:
+                del self._entries[stale]
+            while len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+        body, status, mimetype = result
+        self._entries[key] = {
+            'versions': versions,
+            'expires': time.monotonic() + ttl,
+            'body': body,
+            'status': status,
+            'mimetype': mimetype
+        }
+
+    def serve(self, key, tables, ttl, compute):
+        """Return the cached response for key, or run compute once for all concurrent callers"""
+        versions = table_versions.current(tables)
+        while True:
+            with self._lock:
+                entry = self._lookup(key, versions)
+                if entry is not None:
+                    self.hits += 1
+                    return _build(entry['body'], entry['status'], entry['mimetype'], 'HIT')
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = _Pending()
+                    self.misses += 1
+                    break
+                self.coalesced += 1
+
+            if pending.done.wait(self.wait_timeout) and pending.result is not None:
+                return _build(*pending.result, 'COALESCED')
+            # The leader failed, streamed or timed out: try again (possibly as the new leader)
+
+        result = None
+        try:
+            response = make_response(compute())
+            if response.is_streamed:
+                return response
+            result = (response.get_data(), response.status_code, response.mimetype)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        finally:
+            with self._lock:
+                # Only successful responses are kept; errors are shared with waiters but not stored
+                if result is not None and result[1] == 200:
+                    self._store(key, versions, ttl, result)
+                self._pending.pop(key, None)
+                pending.result = result
+            pending.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'in_flight': len(self._pending),
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced
+            }
+
+def _build(body, status, mimetype, outcome):
+    response = Response(body, status=status, mimetype=mimetype)
+    response.headers['X-Cache'] = outcome
+    return response
+
+def cached_response(*tables, ttl=None):
+    """Cache a GET view's serialized response until ttl expires or one of tables is written
+
+    Place it below @route. Query-string arguments are part of the key.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            lifetime = response_cache.ttl if ttl is None else ttl
+            if lifetime <= 0:
+                return view(*args, **kwargs)
+            key = (request.path, tuple(sorted(request.args.items(multi=True))))
+            return response_cache.serve(key, tables, lifetime, lambda: view(*args, **kwargs))
+        return wrapper
+
+    return decorator
+
+response_cache = ResponseCache(
+    ttl=float(os.getenv('RESPONSE_CACHE_TTL', 30)),
+    max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 256))
+)
@@ -0,0 +1,60 @@
+from flask import Response, current_app, request
+
+def wants_ndjson():
+    """True when the client asked for newline-delimited JSON"""
+    if request.args.get('format', '').lower() == 'ndjson':
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+def stream_rows(batches, transform=None):
+    """Stream row batches as a chunked {"data": [...], "success": true} body or as NDJSON
+
+    The first batch is fetched before returning so query errors still surface
+    to the caller as exceptions (and therefore as a normal 500 response).
+    """
+    batches = iter(batches)
+    first = next(batches, [])
+    dumps = current_app.json.dumps
+    ndjson = wants_ndjson()
+
+    def encode(batch):
+        if transform is not None:
+            batch = [transform(row) for row in batch]
+        return batch
+
+    def generate():
+        try:
+            if ndjson:
+                for batch in _chain(first, batches):
+                    yield ''.join(dumps(row) + '\n' for row in encode(batch))
+                return
+
+            yield '{"data":['
+            separator = ''
+            for batch in _chain(first, batches):
+                parts = []
+                for row in encode(batch):
+                    parts.append(separator + dumps(row))
+                    separator = ','
+                yield ''.join(parts)
+            yield '],"success":true}'
+        except Exception as e:
+            # Headers are already sent, so report the failure inside the body
+            print(f"Streaming error: {e}")
+            if ndjson:
+                yield dumps({'success': False, 'error': str(e)}) + '\n'
+            else:
+                yield '],"error":' + dumps(str(e)) + ',"success":false}'
+        finally:
+            close = getattr(batches, 'close', None)
+            if close is not None:
+                close()
+
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    return Response(generate(), mimetype=mimetype)
+
+def _chain(first, rest):
+    if first:
+        yield first
+    for batch in rest:
+        yield batch
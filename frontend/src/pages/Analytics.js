@@ -17,48 +17,22 @@ const Analytics = () => {
   const fetchAnalytics = async () => {
     try {
       setLoading(true);
-      const responses = await Promise.all([
-        fetch('http://localhost:5000/api/flights/'),
-        fetch('http://localhost:5000/api/passengers/'),
-        fetch('http://localhost:5000/api/bookings/'),
-        fetch('http://localhost:5000/api/airlines/'),
-        fetch('http://localhost:5000/api/airports/'),
-        fetch('http://localhost:5000/api/staff/')
-      ]);
-
-      const failedRequests = responses.filter(r => !r.ok);
-      if (failedRequests.length > 0) {
-        console.warn(`${failedRequests.length} API requests failed`);
+      const response = await fetch('http://localhost:5000/api/analytics/summary');
+      if (!response.ok) {
+        throw new Error(`Summary request failed with status ${response.status}`);
       }
-
-      const [flightsResponse, passengersResponse, bookingsResponse, airlinesResponse, airportsResponse, staffResponse] = await Promise.all(
-        responses.map(r => r.ok ? r.json() : { data: [], success: false })
-      );
-
-      const flightData = flightsResponse.data || flightsResponse;
-      const passengerData = passengersResponse.data || passengersResponse;
-      const bookingData = bookingsResponse.data || bookingsResponse;
-      const airlineData = airlinesResponse.data || airlinesResponse;
-      const airportData = airportsResponse.data || airportsResponse;
-      const staffData = staffResponse.data || staffResponse;
-
-      const safeFlightData = Array.isArray(flightData) ? flightData : [];
-      const safePassengerData = Array.isArray(passengerData) ? passengerData : [];
-      const safeBookingData = Array.isArray(bookingData) ? bookingData : [];
-      const safeAirlineData = Array.isArray(airlineData) ? airlineData : [];
-      const safeAirportData = Array.isArray(airportData) ? airportData : [];
-      const safeStaffData = Array.isArray(staffData) ? staffData : [];
+      const { data } = await response.json();
 
       setAnalytics({
-        totalFlights: safeFlightData.length,
-        totalPassengers: safePassengerData.length,
-        totalBookings: safeBookingData.length,
-        totalAirlines: safeAirlineData.length,
-        totalAirports: safeAirportData.length,
-        totalStaff: safeStaffData.length,
-        activeFlights: safeFlightData.filter(f => f.Status === 'Scheduled').length,
-        completedFlights: safeFlightData.filter(f => f.Status === 'Completed').length,
-        cancelledFlights: safeFlightData.filter(f => f.Status === 'Cancelled').length
+        totalFlights: data.total_flights,
+        totalPassengers: data.total_passengers,
+        totalBookings: data.total_bookings,
+        totalAirlines: data.total_airlines,
+        totalAirports: data.total_airports,
+        totalStaff: data.total_staff,
+        activeFlights: data.flights_by_status.Scheduled,
+        completedFlights: data.flights_by_status.Completed,
+        cancelledFlights: data.flights_by_status.Cancelled
       });
       setError(null);
     } catch (err) {
@@ -33,4 +33,69 @@ api.interceptors.response.use(
   }
 );
 
+// Keyset pagination: fetch one page of a list endpoint.
+// Resolves to { data, nextCursor, hasMore }; pass nextCursor back to get the following page.
+export const fetchPage = async (url, { limit = 50, cursor, params = {} } = {}) => {
+  const query = new URLSearchParams();
+  Object.keys(params).forEach(key => {
+    if (params[key]) query.append(key, params[key]);
+  });
+  query.append('limit', limit);
+  if (cursor) query.append('cursor', cursor);
+  const response = await api.get(`${url}?${query}`);
+  return {
+    data: response.data.data,
+    nextCursor: response.data.next_cursor,
+    hasMore: response.data.has_more,
+  };
+};
+
+// Fetch every page in turn, calling onPage(rows) as each page arrives.
+export const fetchAllPages = async (url, { limit = 200, params = {}, onPage } = {}) => {
+  const rows = [];
+  let cursor = null;
+  do {
+    const page = await fetchPage(url, { limit, cursor, params });
+    rows.push(...page.data);
+    if (onPage) onPage(page.data);
+    cursor = page.hasMore ? page.nextCursor : null;
+  } while (cursor);
+  return rows;
+};
+
+// Delta sync: fetch rows changed and IDs deleted since a token from /changes.
+// Omit since for the initial load; keep the returned since for the next call.
+export const fetchChanges = async (url, { since, limit = 200 } = {}) => {
+  const changed = [];
+  const deleted = [];
+  let hasMore = true;
+  while (hasMore) {
+    const query = new URLSearchParams({ limit });
+    if (since) query.append('since', since);
+    const response = await api.get(`${url}changes?${query}`);
+    changed.push(...response.data.data);
+    deleted.push(...response.data.deleted);
+    since = response.data.next_since;
+    hasMore = response.data.has_more;
+  }
+  return { changed, deleted, since };
+};
+
+// Apply a fetchChanges result to a list of rows keyed by idField.
+export const applyChanges = (rows, { changed, deleted }, idField) => {
+  const byId = new Map(rows.map(row => [row[idField], row]));
+  changed.forEach(row => byId.set(row[idField], row));
+  deleted.forEach(id => byId.delete(id));
+  return Array.from(byId.values());
+};
+
+// Run several API calls in one round trip: [{ method, path, query, body }] -> [{ status, body }].
+// Paths are relative to the API root, e.g. '/airlines/1/flights'.
+export const fetchBatch = async (requests) => {
+  const response = await api.post('/batch', {
+    requests: requests.map(item => ({ ...item, path: `/api${item.path}` })),
+  });
+  return response.data.data;
+};
+
 export default api;
\ No newline at end of file
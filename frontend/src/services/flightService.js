@@ -1,4 +1,4 @@
-import api from './api';
+import api, { fetchPage } from './api';
 
 export const flightService = {
   getAll: async (filters = {}) => {
@@ -10,6 +10,10 @@ export const flightService = {
     return response.data;
   },
 
+  getPage: async (filters = {}, cursor = null, limit = 50) => {
+    return fetchPage('/flights/', { limit, cursor, params: filters });
+  },
+
   getById: async (id) => {
     const response = await api.get(`/flights/${id}/`);
     return response.data;
@@ -0,0 +1,77 @@
+-- ======================================================
+-- Flight Management System: departure search EXPLAIN check
+-- Run after fnsproctrig.sql. Compare the "before" and "after" plans:
+-- the DATE() predicate forces a full scan of Flight (type = ALL),
+-- the half-open range lets MySQL use the Departure_Time indexes
+-- (type = range / ref on ix_flight_departure or ix_flight_route_departure).
+-- ======================================================
+
+USE flight_management;
+
+SET @day := (SELECT DATE(MIN(Departure_Time)) FROM Flight);
+SET @from_city := (SELECT a.City FROM Flight f JOIN Airport a ON f.From_Airport_ID = a.Airport_ID LIMIT 1);
+SET @to_city := (SELECT a.City FROM Flight f JOIN Airport a ON f.To_Airport_ID = a.Airport_ID LIMIT 1);
+
+-- ------------------------------------------------------
+-- 1. Flights on a given day (GET /api/flights/?date=)
+-- ------------------------------------------------------
+
+-- Before: function on the column, not sargable
+EXPLAIN
+SELECT f.Flight_ID, f.Flight_No, f.Departure_Time
+FROM Flight f
+WHERE DATE(f.Departure_Time) = @day
+ORDER BY f.Departure_Time;
+
+-- After: half-open range on the bare column
+EXPLAIN
+SELECT f.Flight_ID, f.Flight_No, f.Departure_Time
+FROM Flight f
+WHERE f.Departure_Time >= @day AND f.Departure_Time < @day + INTERVAL 1 DAY
+ORDER BY f.Departure_Time;
+
+-- ------------------------------------------------------
+-- 2. Route search (GET /api/flights/search?from_city=&to_city=&departure_date=)
+-- ------------------------------------------------------
+
+-- Before
+EXPLAIN
+SELECT f.Flight_ID, f.Flight_No, f.Departure_Time
+FROM Flight f
+JOIN Airport a1 ON f.From_Airport_ID = a1.Airport_ID
+JOIN Airport a2 ON f.To_Airport_ID = a2.Airport_ID
+WHERE f.Status = 'Scheduled'
+  AND a1.City = @from_city
+  AND a2.City = @to_city
+  AND DATE(f.Departure_Time) = @day
+ORDER BY f.Departure_Time;
+
+-- After: Flight is reached through ix_flight_route_departure
+-- (From_Airport_ID, To_Airport_ID, Departure_Time) with a range on the last part
+EXPLAIN
+SELECT f.Flight_ID, f.Flight_No, f.Departure_Time
+FROM Flight f
+JOIN Airport a1 ON f.From_Airport_ID = a1.Airport_ID
+JOIN Airport a2 ON f.To_Airport_ID = a2.Airport_ID
+WHERE f.Status = 'Scheduled'
+  AND a1.City = @from_city
+  AND a2.City = @to_city
+  AND f.Departure_Time >= @day AND f.Departure_Time < @day + INTERVAL 1 DAY
+ORDER BY f.Departure_Time;
+
+-- ------------------------------------------------------
+-- 3. Date range (?date_from=&date_to=, date_to inclusive)
+-- ------------------------------------------------------
+EXPLAIN
+SELECT f.Flight_ID, f.Flight_No, f.Departure_Time
+FROM Flight f
+WHERE f.Departure_Time >= @day AND f.Departure_Time < @day + INTERVAL 8 DAY
+ORDER BY f.Departure_Time;
+
+-- ------------------------------------------------------
+-- 4. Sanity check: both predicates return the same rows
+-- ------------------------------------------------------
+SELECT
+  (SELECT COUNT(*) FROM Flight WHERE DATE(Departure_Time) = @day) AS before_count,
+  (SELECT COUNT(*) FROM Flight
+    WHERE Departure_Time >= @day AND Departure_Time < @day + INTERVAL 1 DAY) AS after_count;
@@ -61,6 +61,285 @@ PREPARE stmt FROM @sql;
 EXECUTE stmt;
 DEALLOCATE PREPARE stmt;
 
+-- Add maintained booking counter to Flight (kept exact by the Booking triggers below)
+SELECT COUNT(*) INTO @col_exists
+FROM information_schema.columns
+WHERE table_schema = DATABASE()
+  AND table_name = 'Flight'
+  AND column_name = 'Booked_Count';
+SET @sql := IF(@col_exists = 0,
+  'ALTER TABLE Flight ADD COLUMN Booked_Count INT NOT NULL DEFAULT 0',
+  'SELECT "Flight.Booked_Count already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Add seat inventory version to Flight (bumped whenever a booked seat on the flight changes)
+SELECT COUNT(*) INTO @col_exists
+FROM information_schema.columns
+WHERE table_schema = DATABASE()
+  AND table_name = 'Flight'
+  AND column_name = 'Seat_Version';
+SET @sql := IF(@col_exists = 0,
+  'ALTER TABLE Flight ADD COLUMN Seat_Version INT NOT NULL DEFAULT 0',
+  'SELECT "Flight.Seat_Version already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Add held seat counter to Flight (rows in SeatHold, kept by the hold procedures)
+SELECT COUNT(*) INTO @col_exists
+FROM information_schema.columns
+WHERE table_schema = DATABASE()
+  AND table_name = 'Flight'
+  AND column_name = 'Held_Count';
+SET @sql := IF(@col_exists = 0,
+  'ALTER TABLE Flight ADD COLUMN Held_Count INT NOT NULL DEFAULT 0',
+  'SELECT "Flight.Held_Count already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Add maintained active booking counter to Passenger
+SELECT COUNT(*) INTO @col_exists
+FROM information_schema.columns
+WHERE table_schema = DATABASE()
+  AND table_name = 'Passenger'
+  AND column_name = 'Active_Bookings';
+SET @sql := IF(@col_exists = 0,
+  'ALTER TABLE Passenger ADD COLUMN Active_Bookings INT NOT NULL DEFAULT 0',
+  'SELECT "Passenger.Active_Bookings already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Route search: airport pair plus a Departure_Time range (flights/search, flights list)
+SELECT COUNT(*) INTO @idx_exists
+FROM information_schema.statistics
+WHERE table_schema = DATABASE()
+  AND table_name = 'Flight'
+  AND index_name = 'ix_flight_route_departure';
+SET @sql := IF(@idx_exists = 0,
+  'CREATE INDEX ix_flight_route_departure ON Flight (From_Airport_ID, To_Airport_ID, Departure_Time)',
+  'SELECT "Index ix_flight_route_departure already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Date-only flight filters and ORDER BY Departure_Time
+SELECT COUNT(*) INTO @idx_exists
+FROM information_schema.statistics
+WHERE table_schema = DATABASE()
+  AND table_name = 'Flight'
+  AND index_name = 'ix_flight_departure';
+SET @sql := IF(@idx_exists = 0,
+  'CREATE INDEX ix_flight_departure ON Flight (Departure_Time)',
+  'SELECT "Index ix_flight_departure already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Airport arrivals list: arrival airport plus Arrival_Time range/order
+SELECT COUNT(*) INTO @idx_exists
+FROM information_schema.statistics
+WHERE table_schema = DATABASE()
+  AND table_name = 'Flight'
+  AND index_name = 'ix_flight_to_arrival';
+SET @sql := IF(@idx_exists = 0,
+  'CREATE INDEX ix_flight_to_arrival ON Flight (To_Airport_ID, Arrival_Time)',
+  'SELECT "Index ix_flight_to_arrival already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Row versioning for the /changes feeds: Updated_At is maintained by MySQL on
+-- every insert and update, and (Updated_At, primary key) is the feed's order
+
+SELECT COUNT(*) INTO @col_exists
+FROM information_schema.columns
+WHERE table_schema = DATABASE()
+  AND table_name = 'Flight'
+  AND column_name = 'Updated_At';
+SET @sql := IF(@col_exists = 0,
+  'ALTER TABLE Flight ADD COLUMN Updated_At TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)',
+  'SELECT "Flight.Updated_At already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT COUNT(*) INTO @idx_exists
+FROM information_schema.statistics
+WHERE table_schema = DATABASE()
+  AND table_name = 'Flight'
+  AND index_name = 'ix_flight_updated';
+SET @sql := IF(@idx_exists = 0,
+  'CREATE INDEX ix_flight_updated ON Flight (Updated_At, Flight_ID)',
+  'SELECT "Index ix_flight_updated already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT COUNT(*) INTO @col_exists
+FROM information_schema.columns
+WHERE table_schema = DATABASE()
+  AND table_name = 'Booking'
+  AND column_name = 'Updated_At';
+SET @sql := IF(@col_exists = 0,
+  'ALTER TABLE Booking ADD COLUMN Updated_At TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)',
+  'SELECT "Booking.Updated_At already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT COUNT(*) INTO @idx_exists
+FROM information_schema.statistics
+WHERE table_schema = DATABASE()
+  AND table_name = 'Booking'
+  AND index_name = 'ix_booking_updated';
+SET @sql := IF(@idx_exists = 0,
+  'CREATE INDEX ix_booking_updated ON Booking (Updated_At, Booking_ID)',
+  'SELECT "Index ix_booking_updated already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT COUNT(*) INTO @col_exists
+FROM information_schema.columns
+WHERE table_schema = DATABASE()
+  AND table_name = 'Passenger'
+  AND column_name = 'Updated_At';
+SET @sql := IF(@col_exists = 0,
+  'ALTER TABLE Passenger ADD COLUMN Updated_At TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)',
+  'SELECT "Passenger.Updated_At already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT COUNT(*) INTO @idx_exists
+FROM information_schema.statistics
+WHERE table_schema = DATABASE()
+  AND table_name = 'Passenger'
+  AND index_name = 'ix_passenger_updated';
+SET @sql := IF(@idx_exists = 0,
+  'CREATE INDEX ix_passenger_updated ON Passenger (Updated_At, Passenger_ID)',
+  'SELECT "Index ix_passenger_updated already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT COUNT(*) INTO @col_exists
+FROM information_schema.columns
+WHERE table_schema = DATABASE()
+  AND table_name = 'Staff'
+  AND column_name = 'Updated_At';
+SET @sql := IF(@col_exists = 0,
+  'ALTER TABLE Staff ADD COLUMN Updated_At TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)',
+  'SELECT "Staff.Updated_At already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT COUNT(*) INTO @idx_exists
+FROM information_schema.statistics
+WHERE table_schema = DATABASE()
+  AND table_name = 'Staff'
+  AND index_name = 'ix_staff_updated';
+SET @sql := IF(@idx_exists = 0,
+  'CREATE INDEX ix_staff_updated ON Staff (Updated_At, Staff_ID)',
+  'SELECT "Index ix_staff_updated already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT COUNT(*) INTO @col_exists
+FROM information_schema.columns
+WHERE table_schema = DATABASE()
+  AND table_name = 'Airport'
+  AND column_name = 'Updated_At';
+SET @sql := IF(@col_exists = 0,
+  'ALTER TABLE Airport ADD COLUMN Updated_At TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)',
+  'SELECT "Airport.Updated_At already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT COUNT(*) INTO @idx_exists
+FROM information_schema.statistics
+WHERE table_schema = DATABASE()
+  AND table_name = 'Airport'
+  AND index_name = 'ix_airport_updated';
+SET @sql := IF(@idx_exists = 0,
+  'CREATE INDEX ix_airport_updated ON Airport (Updated_At, Airport_ID)',
+  'SELECT "Index ix_airport_updated already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT COUNT(*) INTO @col_exists
+FROM information_schema.columns
+WHERE table_schema = DATABASE()
+  AND table_name = 'Airline'
+  AND column_name = 'Updated_At';
+SET @sql := IF(@col_exists = 0,
+  'ALTER TABLE Airline ADD COLUMN Updated_At TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)',
+  'SELECT "Airline.Updated_At already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT COUNT(*) INTO @idx_exists
+FROM information_schema.statistics
+WHERE table_schema = DATABASE()
+  AND table_name = 'Airline'
+  AND index_name = 'ix_airline_updated';
+SET @sql := IF(@idx_exists = 0,
+  'CREATE INDEX ix_airline_updated ON Airline (Updated_At, Airline_ID)',
+  'SELECT "Index ix_airline_updated already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Unique phone numbers; blank phones become NULL first so they do not collide
+UPDATE Passenger SET Phone = NULL WHERE Phone = '';
+
+SELECT COUNT(*) INTO @idx_exists
+FROM information_schema.statistics
+WHERE table_schema = DATABASE()
+  AND table_name = 'Passenger'
+  AND index_name = 'ux_passenger_phone';
+SET @sql := IF(@idx_exists = 0,
+  'CREATE UNIQUE INDEX ux_passenger_phone ON Passenger (Phone)',
+  'SELECT "Index ux_passenger_phone already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Bulk cancellation: flights departing an airport in a window, and one
+-- flight's live bookings in Booking_ID order (InnoDB appends the primary key)
+SELECT COUNT(*) INTO @idx_exists
+FROM information_schema.statistics
+WHERE table_schema = DATABASE()
+  AND table_name = 'Flight'
+  AND index_name = 'ix_flight_from_departure';
+SET @sql := IF(@idx_exists = 0,
+  'CREATE INDEX ix_flight_from_departure ON Flight (From_Airport_ID, Departure_Time)',
+  'SELECT "Index ix_flight_from_departure already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT COUNT(*) INTO @idx_exists
+FROM information_schema.statistics
+WHERE table_schema = DATABASE()
+  AND table_name = 'Booking'
+  AND index_name = 'ix_booking_flight_status';
+SET @sql := IF(@idx_exists = 0,
+  'CREATE INDEX ix_booking_flight_status ON Booking (Flight_ID, Status)',
+  'SELECT "Index ix_booking_flight_status already exists"');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
 -- ======================================================
 -- STEP 2: Create helper tables
 -- ======================================================
@@ -99,6 +378,81 @@ CREATE TABLE IF NOT EXISTS PassengerAudit (
   Details TEXT
 );
 
+-- Per-table change counters; the API bumps them after writes so every
+-- worker process can tell when its cached reference data is stale
+CREATE TABLE IF NOT EXISTS TableVersion (
+  Table_Name VARCHAR(64) PRIMARY KEY,
+  Version BIGINT NOT NULL DEFAULT 0,
+  Updated_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+INSERT IGNORE INTO TableVersion (Table_Name, Version) VALUES
+  ('Airport', 0), ('Airline', 0), ('Flight', 0), ('Passenger', 0),
+  ('Booking', 0), ('Staff', 0), ('BookingAudit', 0), ('StaffHistory', 0);
+
+-- Delete tombstones for the /changes feeds, written by the delete triggers
+CREATE TABLE IF NOT EXISTS RowTombstone (
+  Tombstone_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+  Table_Name VARCHAR(64) NOT NULL,
+  Row_ID INT NOT NULL,
+  Deleted_At TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  INDEX ix_tombstone_table (Table_Name, Tombstone_ID),
+  INDEX ix_tombstone_deleted (Deleted_At)
+);
+
+-- Temporary seat holds taken before checkout; each one is counted in
+-- Flight.Held_Count until it is confirmed, released or swept after expiry
+CREATE TABLE IF NOT EXISTS SeatHold (
+  Hold_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+  Flight_ID INT NOT NULL,
+  Seat_No VARCHAR(10) NOT NULL,
+  Hold_Token CHAR(32) NOT NULL,
+  Created_At TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  Expires_At TIMESTAMP(6) NOT NULL,
+  UNIQUE KEY ux_seathold_flight_seat (Flight_ID, Seat_No),
+  INDEX ix_seathold_flight_expiry (Flight_ID, Expires_At),
+  INDEX ix_seathold_expiry (Expires_At, Flight_ID),
+  FOREIGN KEY (Flight_ID) REFERENCES Flight(Flight_ID) ON DELETE CASCADE
+);
+
+-- Background jobs for operations too long for a request. Workers claim
+-- Queued rows with SELECT ... FOR UPDATE SKIP LOCKED and keep a lease
+-- (Locked_Until) while running; failed attempts are retried after Run_After
+CREATE TABLE IF NOT EXISTS Job (
+  Job_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+  Job_Type VARCHAR(50) NOT NULL,
+  Status ENUM('Queued','Running','Succeeded','Failed') NOT NULL DEFAULT 'Queued',
+  Payload LONGTEXT NOT NULL,
+  Progress TEXT NULL,
+  Result LONGTEXT NULL,
+  Error TEXT NULL,
+  Attempts INT NOT NULL DEFAULT 0,
+  Max_Attempts INT NOT NULL DEFAULT 3,
+  Run_After TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  Locked_By VARCHAR(100) NULL,
+  Locked_Until TIMESTAMP(6) NULL,
+  Created_At TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  Started_At TIMESTAMP(6) NULL,
+  Finished_At TIMESTAMP(6) NULL,
+  INDEX ix_job_claim (Status, Run_After, Job_ID),
+  INDEX ix_job_lease (Status, Locked_Until)
+);
+
+-- Idempotency-Key store for booking endpoints: one row per (method, path,
+-- key) hash. The claim (Pending) and the stored response (Done) are written
+-- in the request's own transaction, so only Done rows are ever committed
+CREATE TABLE IF NOT EXISTS IdempotencyKey (
+  Key_Hash BINARY(32) PRIMARY KEY,
+  Request_Hash BINARY(32) NOT NULL,
+  Status ENUM('Pending','Done') NOT NULL DEFAULT 'Pending',
+  Response_Status SMALLINT NULL,
+  Response_Type VARCHAR(100) NULL,
+  Response_Body MEDIUMTEXT NULL,
+  Created_At TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  Expires_At TIMESTAMP(6) NOT NULL,
+  INDEX ix_idempotency_expires (Expires_At)
+);
+
 -- ======================================================
 -- STEP 3: FUNCTIONS
 -- ======================================================
@@ -111,12 +465,12 @@ READS SQL DATA
 BEGIN
   DECLARE v_capacity INT DEFAULT 0;
   DECLARE v_booked INT DEFAULT 0;
-  SELECT Capacity INTO v_capacity FROM Flight WHERE Flight_ID = p_flight_id;
+  DECLARE v_held INT DEFAULT 0;
+  SELECT Capacity, Booked_Count, Held_Count INTO v_capacity, v_booked, v_held FROM Flight WHERE Flight_ID = p_flight_id;
   IF v_capacity IS NULL THEN
     RETURN NULL;
   END IF;
-  SELECT COUNT(*) INTO v_booked FROM Booking WHERE Flight_ID = p_flight_id AND Status = 'Booked';
-  RETURN GREATEST(0, v_capacity - v_booked);
+  RETURN GREATEST(0, v_capacity - v_booked - v_held);
 END$$
 
 DROP FUNCTION IF EXISTS fn_PassengerBookingCount $$
@@ -125,7 +479,7 @@ DETERMINISTIC
 READS SQL DATA
 BEGIN
   DECLARE v_count INT DEFAULT 0;
-  SELECT COUNT(*) INTO v_count FROM Booking WHERE Passenger_ID = p_passenger_id AND Status = 'Booked';
+  SELECT Active_Bookings INTO v_count FROM Passenger WHERE Passenger_ID = p_passenger_id;
   RETURN v_count;
 END$$
 
@@ -155,11 +509,13 @@ BEGIN
 
   DECLARE EXIT HANDLER FOR SQLEXCEPTION
   BEGIN
-    ROLLBACK;
+    ROLLBACK TO SAVEPOINT sp_create_booking;
     SET p_booking_id = NULL;
   END;
 
-  START TRANSACTION;
+  -- Savepoint instead of START TRANSACTION/COMMIT: runs inside the caller's
+  -- transaction (Idempotency-Key stores the response in the same one)
+  SAVEPOINT sp_create_booking;
 
   SELECT Passenger_ID INTO v_passenger_id FROM Passenger WHERE Email = p_email LIMIT 1;
   IF v_passenger_id IS NULL THEN
@@ -168,7 +524,8 @@ BEGIN
     SET v_passenger_id = LAST_INSERT_ID();
   END IF;
 
-  SELECT Flight_ID, Status INTO v_flight_id, v_status FROM Flight WHERE Flight_No = p_flight_no LIMIT 1;
+  -- Flight row lock first, like the hold procedures, so no hold can be taken on the seat from here on
+  SELECT Flight_ID, Status INTO v_flight_id, v_status FROM Flight WHERE Flight_No = p_flight_no LIMIT 1 FOR UPDATE;
   IF v_flight_id IS NULL THEN
     SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Flight not found';
   END IF;
@@ -182,6 +539,12 @@ BEGIN
     SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = v_msg;
   END IF;
 
+  -- This procedure takes no hold token, so any live hold on the seat belongs to another client
+  IF EXISTS (SELECT 1 FROM SeatHold WHERE Flight_ID = v_flight_id AND Seat_No = p_seat_no AND Expires_At > NOW(6)) THEN
+    SET v_msg = CONCAT('Seat ', p_seat_no, ' is being held by another customer');
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = v_msg;
+  END IF;
+
   IF EXISTS (SELECT 1 FROM Booking WHERE Flight_ID = v_flight_id AND Passenger_ID = v_passenger_id AND Status = 'Booked') THEN
     SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Passenger already has a booking on this flight';
   END IF;
@@ -198,25 +561,527 @@ BEGIN
   INSERT INTO BookingAudit (Booking_ID, Operation, Details)
   VALUES (p_booking_id, 'INSERT',
           CONCAT('Booked seat ', p_seat_no, ' for passenger ', v_passenger_id, ' on flight ', v_flight_id));
-
-  COMMIT;
 END$$
 
 DROP PROCEDURE IF EXISTS sp_CancelFlight $$
 CREATE PROCEDURE sp_CancelFlight(IN p_flight_no VARCHAR(20))
 BEGIN
   DECLARE v_flight_id INT;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    SET @skip_booking_counters = NULL;
+    ROLLBACK;
+    RESIGNAL;
+  END;
+
   START TRANSACTION;
-  SELECT Flight_ID INTO v_flight_id FROM Flight WHERE Flight_No = p_flight_no LIMIT 1;
+  SELECT Flight_ID INTO v_flight_id FROM Flight WHERE Flight_No = p_flight_no LIMIT 1 FOR UPDATE;
   IF v_flight_id IS NULL THEN
-    ROLLBACK;
     SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Flight not found';
   END IF;
-  UPDATE Flight SET Status = 'Cancelled' WHERE Flight_ID = v_flight_id;
+
+  -- Adjust counters once per passenger instead of once per booking row
+  UPDATE Passenger p
+  JOIN (
+    SELECT Passenger_ID, COUNT(*) AS cnt
+    FROM Booking
+    WHERE Flight_ID = v_flight_id AND Status = 'Booked'
+    GROUP BY Passenger_ID
+  ) b ON b.Passenger_ID = p.Passenger_ID
+  SET p.Active_Bookings = GREATEST(0, p.Active_Bookings - b.cnt);
+
+  SET @skip_booking_counters = 1;
   UPDATE Booking SET Status = 'Cancelled' WHERE Flight_ID = v_flight_id AND Status = 'Booked';
+  SET @skip_booking_counters = NULL;
+
+  DELETE FROM SeatHold WHERE Flight_ID = v_flight_id;
+  UPDATE Flight SET Status = 'Cancelled', Booked_Count = 0, Held_Count = 0, Seat_Version = Seat_Version + 1 WHERE Flight_ID = v_flight_id;
   COMMIT;
 END$$
 
+-- Cancel the next p_chunk_size live bookings of a flight already marked
+-- Cancelled, in Booking_ID order. Each call is one short transaction, so a
+-- large flight never holds all of its booking locks at once. Returns the
+-- cancelled rows (Booking_ID, Passenger_ID, Seat_No); an empty result
+-- means the flight is done. With p_notify the passengers' Notifications are
+-- written in the same transaction, so a crash loses neither or both.
+DROP PROCEDURE IF EXISTS sp_CancelFlightChunk $$
+CREATE PROCEDURE sp_CancelFlightChunk(
+  IN p_flight_id INT,
+  IN p_chunk_size INT,
+  IN p_notify BOOLEAN,
+  IN p_reason TEXT
+)
+BEGIN
+  DECLARE v_status VARCHAR(20);
+  DECLARE v_flight_no VARCHAR(20);
+  DECLARE v_departure DATETIME;
+  DECLARE v_last INT;
+  DECLARE v_cancelled INT DEFAULT 0;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    SET @skip_booking_counters = NULL;
+    ROLLBACK;
+    RESIGNAL;
+  END;
+
+  START TRANSACTION;
+  -- Flight first, like every booking and hold procedure
+  SELECT Status, Flight_No, Departure_Time INTO v_status, v_flight_no, v_departure
+  FROM Flight WHERE Flight_ID = p_flight_id FOR UPDATE;
+  IF v_status IS NULL THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Flight not found';
+  END IF;
+  IF v_status <> 'Cancelled' THEN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Flight is not cancelled';
+  END IF;
+
+  SELECT MAX(Booking_ID) INTO v_last
+  FROM (
+    SELECT Booking_ID FROM Booking
+    WHERE Flight_ID = p_flight_id AND Status = 'Booked'
+    ORDER BY Booking_ID
+    LIMIT p_chunk_size
+  ) chunk;
+
+  SELECT Booking_ID, Passenger_ID, Seat_No
+  FROM Booking
+  WHERE Flight_ID = p_flight_id AND Status = 'Booked' AND Booking_ID <= v_last
+  ORDER BY Booking_ID
+  FOR UPDATE;
+
+  IF v_last IS NOT NULL THEN
+    UPDATE Passenger p
+    JOIN (
+      SELECT Passenger_ID, COUNT(*) AS cnt
+      FROM Booking
+      WHERE Flight_ID = p_flight_id AND Status = 'Booked' AND Booking_ID <= v_last
+      GROUP BY Passenger_ID
+    ) b ON b.Passenger_ID = p.Passenger_ID
+    SET p.Active_Bookings = GREATEST(0, p.Active_Bookings - b.cnt);
+
+    IF p_notify THEN
+      INSERT INTO Notifications (Recipient_Type, Recipient_ID, Message)
+      SELECT 'Passenger', Passenger_ID,
+             CONCAT('Flight ', v_flight_no, ' departing ', DATE_FORMAT(v_departure, '%Y-%m-%d %H:%i'),
+                    ' has been cancelled. Booking ', Booking_ID, ' (seat ', Seat_No, ') is cancelled.',
+                    IF(p_reason IS NULL OR p_reason = '', '', CONCAT(' Reason: ', p_reason)))
+      FROM Booking
+      WHERE Flight_ID = p_flight_id AND Status = 'Booked' AND Booking_ID <= v_last
+      ORDER BY Booking_ID;
+    END IF;
+
+    SET @skip_booking_counters = 1;
+    UPDATE Booking SET Status = 'Cancelled'
+    WHERE Flight_ID = p_flight_id AND Status = 'Booked' AND Booking_ID <= v_last;
+    SET v_cancelled = ROW_COUNT();
+    SET @skip_booking_counters = NULL;
+
+    UPDATE Flight
+    SET Booked_Count = GREATEST(0, Booked_Count - v_cancelled), Seat_Version = Seat_Version + 1
+    WHERE Flight_ID = p_flight_id;
+  END IF;
+  COMMIT;
+END$$
+
+-- Seat holds. Every hold procedure locks the Flight row before touching
+-- SeatHold, so holds, bookings and the sweeper always lock in the same order.
+
+-- Drop the flight's expired holds and give their capacity back
+DROP PROCEDURE IF EXISTS sp_ReleaseExpiredHolds $$
+CREATE PROCEDURE sp_ReleaseExpiredHolds(IN p_flight_id INT, OUT p_released INT)
+BEGIN
+  DECLARE v_held INT;
+  SET p_released = 0;
+  SELECT Held_Count INTO v_held FROM Flight WHERE Flight_ID = p_flight_id FOR UPDATE;
+  IF v_held > 0 THEN
+    DELETE FROM SeatHold WHERE Flight_ID = p_flight_id AND Expires_At <= NOW(6);
+    SET p_released = ROW_COUNT();
+    IF p_released > 0 THEN
+      UPDATE Flight
+      SET Held_Count = GREATEST(0, Held_Count - p_released), Seat_Version = Seat_Version + 1
+      WHERE Flight_ID = p_flight_id;
+    END IF;
+  END IF;
+END$$
+
+-- Hold one seat for p_ttl_seconds. Returns one row (Hold_ID, Expires_At,
+-- Error_Code): FLIGHT_NOT_FOUND, FLIGHT_CANCELLED, FLIGHT_FULL, SEAT_TAKEN
+-- or SEAT_HELD. Runs in the caller's transaction, like sp_BookSeat.
+DROP PROCEDURE IF EXISTS sp_HoldSeat $$
+CREATE PROCEDURE sp_HoldSeat(
+  IN p_flight_id INT,
+  IN p_seat_no VARCHAR(10),
+  IN p_token CHAR(32),
+  IN p_ttl_seconds INT
+)
+proc: BEGIN
+  DECLARE v_status VARCHAR(20);
+  DECLARE v_released INT;
+  DECLARE v_claimed INT;
+  DECLARE v_expires TIMESTAMP(6);
+
+  -- ux_seathold_flight_seat: someone else holds the seat
+  DECLARE EXIT HANDLER FOR 1062
+  BEGIN
+    ROLLBACK TO SAVEPOINT sp_hold_seat;
+    SELECT NULL AS Hold_ID, NULL AS Expires_At, 'SEAT_HELD' AS Error_Code;
+  END;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    ROLLBACK TO SAVEPOINT sp_hold_seat;
+    RESIGNAL;
+  END;
+
+  SAVEPOINT sp_hold_seat;
+
+  UPDATE Flight
+  SET Held_Count = Held_Count + 1, Seat_Version = Seat_Version + 1
+  WHERE Flight_ID = p_flight_id
+    AND Status <> 'Cancelled'
+    AND (Capacity IS NULL OR Booked_Count + Held_Count < Capacity);
+  SET v_claimed = ROW_COUNT();
+
+  IF v_claimed = 0 THEN
+    CALL sp_ReleaseExpiredHolds(p_flight_id, v_released);
+    UPDATE Flight
+    SET Held_Count = Held_Count + 1, Seat_Version = Seat_Version + 1
+    WHERE Flight_ID = p_flight_id
+      AND Status <> 'Cancelled'
+      AND (Capacity IS NULL OR Booked_Count + Held_Count < Capacity);
+    SET v_claimed = ROW_COUNT();
+  END IF;
+
+  IF v_claimed = 0 THEN
+    SELECT Status INTO v_status FROM Flight WHERE Flight_ID = p_flight_id;
+    SELECT NULL AS Hold_ID, NULL AS Expires_At,
+           CASE
+             WHEN v_status IS NULL THEN 'FLIGHT_NOT_FOUND'
+             WHEN v_status = 'Cancelled' THEN 'FLIGHT_CANCELLED'
+             ELSE 'FLIGHT_FULL'
+           END AS Error_Code;
+    LEAVE proc;
+  END IF;
+
+  -- Same key as ux_booking_flight_seat, so this is the seat the booking would collide on
+  IF EXISTS (SELECT 1 FROM Booking WHERE Flight_ID = p_flight_id AND Seat_No = p_seat_no) THEN
+    ROLLBACK TO SAVEPOINT sp_hold_seat;
+    SELECT NULL AS Hold_ID, NULL AS Expires_At, 'SEAT_TAKEN' AS Error_Code;
+    LEAVE proc;
+  END IF;
+
+  -- An expired hold on the seat gives way to the new one
+  DELETE FROM SeatHold WHERE Flight_ID = p_flight_id AND Seat_No = p_seat_no AND Expires_At <= NOW(6);
+  IF ROW_COUNT() > 0 THEN
+    UPDATE Flight SET Held_Count = GREATEST(0, Held_Count - 1) WHERE Flight_ID = p_flight_id;
+  END IF;
+
+  SET v_expires = NOW(6) + INTERVAL p_ttl_seconds SECOND;
+  INSERT INTO SeatHold (Flight_ID, Seat_No, Hold_Token, Expires_At)
+  VALUES (p_flight_id, p_seat_no, p_token, v_expires);
+
+  SELECT LAST_INSERT_ID() AS Hold_ID, v_expires AS Expires_At, NULL AS Error_Code;
+END$$
+
+-- Turn a live hold into a booking. Returns one row (Booking_ID, Seat_No,
+-- Error_Code): HOLD_NOT_FOUND, HOLD_EXPIRED, FLIGHT_CANCELLED, SEAT_TAKEN or
+-- PASSENGER_NOT_FOUND. The held capacity moves to Booked_Count in one update.
+DROP PROCEDURE IF EXISTS sp_ConfirmHold $$
+CREATE PROCEDURE sp_ConfirmHold(
+  IN p_hold_id BIGINT,
+  IN p_token CHAR(32),
+  IN p_passenger_id INT,
+  IN p_details TEXT
+)
+proc: BEGIN
+  DECLARE v_flight_id INT;
+  DECLARE v_seat_no VARCHAR(10);
+  DECLARE v_booking_id INT;
+
+  DECLARE EXIT HANDLER FOR 1062
+  BEGIN
+    SET @skip_booking_counters = NULL, @booking_checked = NULL;
+    ROLLBACK TO SAVEPOINT sp_confirm_hold;
+    SELECT NULL AS Booking_ID, v_seat_no AS Seat_No, 'SEAT_TAKEN' AS Error_Code;
+  END;
+
+  DECLARE EXIT HANDLER FOR 1452
+  BEGIN
+    SET @skip_booking_counters = NULL, @booking_checked = NULL;
+    ROLLBACK TO SAVEPOINT sp_confirm_hold;
+    SELECT NULL AS Booking_ID, v_seat_no AS Seat_No, 'PASSENGER_NOT_FOUND' AS Error_Code;
+  END;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    SET @skip_booking_counters = NULL, @booking_checked = NULL;
+    ROLLBACK TO SAVEPOINT sp_confirm_hold;
+    RESIGNAL;
+  END;
+
+  SAVEPOINT sp_confirm_hold;
+
+  SELECT Flight_ID, Seat_No INTO v_flight_id, v_seat_no
+  FROM SeatHold WHERE Hold_ID = p_hold_id AND Hold_Token = p_token;
+  IF v_flight_id IS NULL THEN
+    SELECT NULL AS Booking_ID, NULL AS Seat_No, 'HOLD_NOT_FOUND' AS Error_Code;
+    LEAVE proc;
+  END IF;
+
+  -- Flight first (lock order), then the hold; capacity was reserved by the hold
+  UPDATE Flight
+  SET Held_Count = GREATEST(0, Held_Count - 1), Booked_Count = Booked_Count + 1, Seat_Version = Seat_Version + 1
+  WHERE Flight_ID = v_flight_id AND Status <> 'Cancelled';
+  IF ROW_COUNT() = 0 THEN
+    SELECT NULL AS Booking_ID, v_seat_no AS Seat_No, 'FLIGHT_CANCELLED' AS Error_Code;
+    LEAVE proc;
+  END IF;
+
+  DELETE FROM SeatHold WHERE Hold_ID = p_hold_id AND Hold_Token = p_token AND Expires_At > NOW(6);
+  IF ROW_COUNT() = 0 THEN
+    -- Expired (or released meanwhile): the sweeper gives its capacity back
+    ROLLBACK TO SAVEPOINT sp_confirm_hold;
+    SELECT NULL AS Booking_ID, v_seat_no AS Seat_No, 'HOLD_EXPIRED' AS Error_Code;
+    LEAVE proc;
+  END IF;
+
+  SET @skip_booking_counters = 1, @booking_checked = 1;
+  INSERT INTO Booking (Date, Seat_No, Passenger_ID, Flight_ID, Status)
+  VALUES (CURDATE(), v_seat_no, p_passenger_id, v_flight_id, 'Booked');
+  SET v_booking_id = LAST_INSERT_ID();
+  SET @skip_booking_counters = NULL, @booking_checked = NULL;
+
+  UPDATE Passenger SET Active_Bookings = Active_Bookings + 1 WHERE Passenger_ID = p_passenger_id;
+
+  INSERT INTO BookingAudit (Booking_ID, Operation, Details)
+  VALUES (v_booking_id, 'INSERT', COALESCE(p_details,
+          CONCAT('Booked held seat ', v_seat_no, ' for passenger ', p_passenger_id, ' on flight ', v_flight_id)));
+
+  SELECT v_booking_id AS Booking_ID, v_seat_no AS Seat_No, NULL AS Error_Code;
+END$$
+
+-- Give a hold back before it expires. Returns one row (Released: 0 or 1).
+DROP PROCEDURE IF EXISTS sp_ReleaseHold $$
+CREATE PROCEDURE sp_ReleaseHold(IN p_hold_id BIGINT, IN p_token CHAR(32))
+proc: BEGIN
+  DECLARE v_flight_id INT;
+  DECLARE v_released INT DEFAULT 0;
+
+  SELECT Flight_ID INTO v_flight_id FROM SeatHold WHERE Hold_ID = p_hold_id AND Hold_Token = p_token;
+  IF v_flight_id IS NULL THEN
+    SELECT 0 AS Released;
+    LEAVE proc;
+  END IF;
+
+  SELECT Flight_ID INTO v_flight_id FROM Flight WHERE Flight_ID = v_flight_id FOR UPDATE;
+  DELETE FROM SeatHold WHERE Hold_ID = p_hold_id AND Hold_Token = p_token;
+  SET v_released = ROW_COUNT();
+  IF v_released > 0 THEN
+    UPDATE Flight
+    SET Held_Count = GREATEST(0, Held_Count - 1), Seat_Version = Seat_Version + 1
+    WHERE Flight_ID = v_flight_id;
+  END IF;
+  SELECT v_released AS Released;
+END$$
+
+-- Booking write path for the API: flight status check, capacity check, seat
+-- claim, counters and audit in one call. Returns one row (Booking_ID,
+-- Error_Code); Error_Code is NULL on success. Runs inside the caller's
+-- transaction (no START TRANSACTION/COMMIT) and undoes its own work on
+-- failure through a savepoint, so several calls can share one transaction.
+DROP PROCEDURE IF EXISTS sp_BookSeat $$
+CREATE PROCEDURE sp_BookSeat(
+  IN p_passenger_id INT,
+  IN p_flight_id INT,
+  IN p_seat_no VARCHAR(10),
+  IN p_details TEXT
+)
+proc: BEGIN
+  DECLARE v_booking_id INT;
+  DECLARE v_status VARCHAR(20);
+  DECLARE v_released INT;
+  DECLARE v_claimed INT;
+
+  -- ux_booking_flight_seat: the seat is taken
+  DECLARE EXIT HANDLER FOR 1062
+  BEGIN
+    SET @skip_booking_counters = NULL, @booking_checked = NULL;
+    ROLLBACK TO SAVEPOINT sp_book_seat;
+    SELECT NULL AS Booking_ID, 'SEAT_TAKEN' AS Error_Code;
+  END;
+
+  -- Passenger foreign key
+  DECLARE EXIT HANDLER FOR 1452
+  BEGIN
+    SET @skip_booking_counters = NULL, @booking_checked = NULL;
+    ROLLBACK TO SAVEPOINT sp_book_seat;
+    SELECT NULL AS Booking_ID, 'PASSENGER_NOT_FOUND' AS Error_Code;
+  END;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    SET @skip_booking_counters = NULL, @booking_checked = NULL;
+    ROLLBACK TO SAVEPOINT sp_book_seat;
+    RESIGNAL;
+  END;
+
+  SAVEPOINT sp_book_seat;
+
+  -- Status and capacity check plus the counter claim in one statement; the
+  -- Flight row lock it takes serialises concurrent bookings of the flight
+  UPDATE Flight
+  SET Booked_Count = Booked_Count + 1, Seat_Version = Seat_Version + 1
+  WHERE Flight_ID = p_flight_id
+    AND Status <> 'Cancelled'
+    AND (Capacity IS NULL OR Booked_Count + Held_Count < Capacity);
+  SET v_claimed = ROW_COUNT();
+
+  IF v_claimed = 0 THEN
+    -- Expired holds may still take capacity: release them and try once more
+    CALL sp_ReleaseExpiredHolds(p_flight_id, v_released);
+    UPDATE Flight
+    SET Booked_Count = Booked_Count + 1, Seat_Version = Seat_Version + 1
+    WHERE Flight_ID = p_flight_id
+      AND Status <> 'Cancelled'
+      AND (Capacity IS NULL OR Booked_Count + Held_Count < Capacity);
+    SET v_claimed = ROW_COUNT();
+  END IF;
+
+  IF v_claimed = 0 THEN
+    SELECT Status INTO v_status FROM Flight WHERE Flight_ID = p_flight_id;
+    SELECT NULL AS Booking_ID,
+           CASE
+             WHEN v_status IS NULL THEN 'FLIGHT_NOT_FOUND'
+             WHEN v_status = 'Cancelled' THEN 'FLIGHT_CANCELLED'
+             ELSE 'FLIGHT_FULL'
+           END AS Error_Code;
+    LEAVE proc;
+  END IF;
+
+  -- The Flight row lock is held, so no hold can be taken on the seat from here on
+  IF EXISTS (SELECT 1 FROM SeatHold WHERE Flight_ID = p_flight_id AND Seat_No = p_seat_no AND Expires_At > NOW(6)) THEN
+    ROLLBACK TO SAVEPOINT sp_book_seat;
+    SELECT NULL AS Booking_ID, 'SEAT_HELD' AS Error_Code;
+    LEAVE proc;
+  END IF;
+
+  -- Counters are maintained here and the flight is already checked: skip both in the triggers
+  SET @skip_booking_counters = 1, @booking_checked = 1;
+  INSERT INTO Booking (Date, Seat_No, Passenger_ID, Flight_ID, Status)
+  VALUES (CURDATE(), p_seat_no, p_passenger_id, p_flight_id, 'Booked');
+  SET v_booking_id = LAST_INSERT_ID();
+  SET @skip_booking_counters = NULL, @booking_checked = NULL;
+
+  UPDATE Passenger SET Active_Bookings = Active_Bookings + 1 WHERE Passenger_ID = p_passenger_id;
+
+  INSERT INTO BookingAudit (Booking_ID, Operation, Details)
+  VALUES (v_booking_id, 'INSERT', p_details);
+
+  SELECT v_booking_id AS Booking_ID, NULL AS Error_Code;
+END$$
+
+-- New passenger plus booking in one call. Uniqueness of email, phone and
+-- seat is left to the unique indexes; a violation is reported through
+-- p_error_code (EMAIL_EXISTS, PHONE_EXISTS, SEAT_TAKEN) like the flight
+-- checks (FLIGHT_NOT_FOUND, FLIGHT_CANCELLED, FLIGHT_FULL, SEAT_HELD). p_booking_id
+-- is NULL on failure. Like sp_BookSeat it runs in the caller's transaction.
+DROP PROCEDURE IF EXISTS sp_CreatePassengerBooking $$
+CREATE PROCEDURE sp_CreatePassengerBooking(
+  IN p_first_name VARCHAR(100),
+  IN p_last_name VARCHAR(100),
+  IN p_email VARCHAR(150),
+  IN p_phone VARCHAR(15),
+  IN p_flight_no VARCHAR(20),
+  IN p_seat_no VARCHAR(10),
+  OUT p_booking_id INT,
+  OUT p_error_code VARCHAR(32)
+)
+proc: BEGIN
+  DECLARE v_passenger_id INT;
+  DECLARE v_flight_id INT;
+  DECLARE v_status VARCHAR(20);
+  DECLARE v_msg TEXT;
+  DECLARE v_released INT;
+  DECLARE v_claimed INT;
+
+  DECLARE EXIT HANDLER FOR 1062
+  BEGIN
+    GET DIAGNOSTICS CONDITION 1 v_msg = MESSAGE_TEXT;
+    SET @skip_booking_counters = NULL, @booking_checked = NULL;
+    ROLLBACK TO SAVEPOINT sp_create_passenger_booking;
+    SET p_booking_id = NULL;
+    SET p_error_code = CASE
+      WHEN v_msg LIKE '%ux_booking_flight_seat''' THEN 'SEAT_TAKEN'
+      WHEN v_msg LIKE '%ux_passenger_phone''' THEN 'PHONE_EXISTS'
+      ELSE 'EMAIL_EXISTS'
+    END;
+  END;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    SET @skip_booking_counters = NULL, @booking_checked = NULL;
+    ROLLBACK TO SAVEPOINT sp_create_passenger_booking;
+    RESIGNAL;
+  END;
+
+  SET p_booking_id = NULL, p_error_code = NULL;
+  SAVEPOINT sp_create_passenger_booking;
+
+  SELECT Flight_ID INTO v_flight_id FROM Flight WHERE Flight_No = p_flight_no LIMIT 1;
+  IF v_flight_id IS NULL THEN
+    SET p_error_code = 'FLIGHT_NOT_FOUND';
+    LEAVE proc;
+  END IF;
+
+  -- Status and capacity check plus the counter claim, as in sp_BookSeat
+  UPDATE Flight
+  SET Booked_Count = Booked_Count + 1, Seat_Version = Seat_Version + 1
+  WHERE Flight_ID = v_flight_id
+    AND Status <> 'Cancelled'
+    AND (Capacity IS NULL OR Booked_Count + Held_Count < Capacity);
+  SET v_claimed = ROW_COUNT();
+
+  IF v_claimed = 0 THEN
+    CALL sp_ReleaseExpiredHolds(v_flight_id, v_released);
+    UPDATE Flight
+    SET Booked_Count = Booked_Count + 1, Seat_Version = Seat_Version + 1
+    WHERE Flight_ID = v_flight_id
+      AND Status <> 'Cancelled'
+      AND (Capacity IS NULL OR Booked_Count + Held_Count < Capacity);
+    SET v_claimed = ROW_COUNT();
+  END IF;
+
+  IF v_claimed = 0 THEN
+    SELECT Status INTO v_status FROM Flight WHERE Flight_ID = v_flight_id;
+    SET p_error_code = IF(v_status = 'Cancelled', 'FLIGHT_CANCELLED', 'FLIGHT_FULL');
+    LEAVE proc;
+  END IF;
+
+  IF EXISTS (SELECT 1 FROM SeatHold WHERE Flight_ID = v_flight_id AND Seat_No = p_seat_no AND Expires_At > NOW(6)) THEN
+    ROLLBACK TO SAVEPOINT sp_create_passenger_booking;
+    SET p_error_code = 'SEAT_HELD';
+    LEAVE proc;
+  END IF;
+
+  -- The passenger starts with this booking counted
+  INSERT INTO Passenger (First_Name, Last_Name, Email, Phone, Active_Bookings)
+  VALUES (p_first_name, p_last_name, p_email, p_phone, 1);
+  SET v_passenger_id = LAST_INSERT_ID();
+
+  SET @skip_booking_counters = 1, @booking_checked = 1;
+  INSERT INTO Booking (Date, Seat_No, Passenger_ID, Flight_ID, Status)
+  VALUES (CURDATE(), p_seat_no, v_passenger_id, v_flight_id, 'Booked');
+  SET p_booking_id = LAST_INSERT_ID();
+  SET @skip_booking_counters = NULL, @booking_checked = NULL;
+
+  INSERT INTO BookingAudit (Booking_ID, Operation, Details)
+  VALUES (p_booking_id, 'INSERT',
+          CONCAT('Booked seat ', p_seat_no, ' for passenger ', v_passenger_id, ' on flight ', v_flight_id));
+END$$
+
 DROP PROCEDURE IF EXISTS sp_TransferStaff $$
 CREATE PROCEDURE sp_TransferStaff(
   IN p_staff_id INT,
@@ -247,14 +1112,160 @@ BEFORE INSERT ON Booking
 FOR EACH ROW
 BEGIN
   DECLARE v_status VARCHAR(20);
-  SELECT Status INTO v_status FROM Flight WHERE Flight_ID = NEW.Flight_ID;
-  IF v_status = 'Cancelled' THEN
-    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Cannot insert booking: flight cancelled';
+  -- sp_BookSeat has already checked (and locked) the flight. Seat
+  -- uniqueness is left to ux_booking_flight_seat.
+  IF @booking_checked IS NULL THEN
+    SELECT Status INTO v_status FROM Flight WHERE Flight_ID = NEW.Flight_ID;
+    IF v_status = 'Cancelled' THEN
+      SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Cannot insert booking: flight cancelled';
+    END IF;
+  END IF;
+END$$
+
+-- Booking counters: Flight.Booked_Count and Passenger.Active_Bookings count
+-- rows with Status = 'Booked'. Set-based maintenance (sp_CancelFlight) sets
+-- @skip_booking_counters = 1 and adjusts the counters itself. Flight.Seat_Version
+-- moves with every change to the flight's booked seats and follows the same rule.
+
+DROP TRIGGER IF EXISTS trg_after_booking_insert $$
+CREATE TRIGGER trg_after_booking_insert
+AFTER INSERT ON Booking
+FOR EACH ROW
+BEGIN
+  IF NEW.Status = 'Booked' AND @skip_booking_counters IS NULL THEN
+    UPDATE Flight SET Booked_Count = Booked_Count + 1, Seat_Version = Seat_Version + 1 WHERE Flight_ID = NEW.Flight_ID;
+    UPDATE Passenger SET Active_Bookings = Active_Bookings + 1 WHERE Passenger_ID = NEW.Passenger_ID;
   END IF;
+END$$
 
-  IF EXISTS (SELECT 1 FROM Booking WHERE Flight_ID = NEW.Flight_ID AND Seat_No = NEW.Seat_No AND Status = 'Booked') THEN
-    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Seat already booked';
+DROP TRIGGER IF EXISTS trg_after_booking_update $$
+CREATE TRIGGER trg_after_booking_update
+AFTER UPDATE ON Booking
+FOR EACH ROW
+BEGIN
+  IF @skip_booking_counters IS NULL
+     AND (NOT (OLD.Status <=> NEW.Status)
+          OR OLD.Flight_ID <> NEW.Flight_ID
+          OR OLD.Passenger_ID <> NEW.Passenger_ID) THEN
+    IF OLD.Status = 'Booked' THEN
+      UPDATE Flight SET Booked_Count = GREATEST(0, Booked_Count - 1), Seat_Version = Seat_Version + 1 WHERE Flight_ID = OLD.Flight_ID;
+      UPDATE Passenger SET Active_Bookings = GREATEST(0, Active_Bookings - 1) WHERE Passenger_ID = OLD.Passenger_ID;
+    END IF;
+    IF NEW.Status = 'Booked' THEN
+      UPDATE Flight SET Booked_Count = Booked_Count + 1, Seat_Version = Seat_Version + 1 WHERE Flight_ID = NEW.Flight_ID;
+      UPDATE Passenger SET Active_Bookings = Active_Bookings + 1 WHERE Passenger_ID = NEW.Passenger_ID;
+    END IF;
+  ELSEIF @skip_booking_counters IS NULL
+     AND NEW.Status = 'Booked' AND NOT (OLD.Seat_No <=> NEW.Seat_No) THEN
+    -- Seat change only: the counters stay, the seat map moves
+    UPDATE Flight SET Seat_Version = Seat_Version + 1 WHERE Flight_ID = NEW.Flight_ID;
   END IF;
 END$$
 
+DROP TRIGGER IF EXISTS trg_after_booking_delete $$
+CREATE TRIGGER trg_after_booking_delete
+AFTER DELETE ON Booking
+FOR EACH ROW
+BEGIN
+  IF OLD.Status = 'Booked' AND @skip_booking_counters IS NULL THEN
+    UPDATE Flight SET Booked_Count = GREATEST(0, Booked_Count - 1), Seat_Version = Seat_Version + 1 WHERE Flight_ID = OLD.Flight_ID;
+    UPDATE Passenger SET Active_Bookings = GREATEST(0, Active_Bookings - 1) WHERE Passenger_ID = OLD.Passenger_ID;
+  END IF;
+  INSERT INTO RowTombstone (Table_Name, Row_ID) VALUES ('Booking', OLD.Booking_ID);
+END$$
+
+-- Foreign key cascades do not fire triggers: release the other side's counters
+-- when a flight or passenger is deleted directly, and write tombstones for the
+-- rows the cascade is about to remove. Counter releases for deletes cascading
+-- from Airport/Airline are not covered; the counter verification job repairs them.
+
+DROP TRIGGER IF EXISTS trg_before_flight_delete $$
+CREATE TRIGGER trg_before_flight_delete
+BEFORE DELETE ON Flight
+FOR EACH ROW
+BEGIN
+  UPDATE Passenger p
+  JOIN (
+    SELECT Passenger_ID, COUNT(*) AS cnt
+    FROM Booking
+    WHERE Flight_ID = OLD.Flight_ID AND Status = 'Booked'
+    GROUP BY Passenger_ID
+  ) b ON b.Passenger_ID = p.Passenger_ID
+  SET p.Active_Bookings = GREATEST(0, p.Active_Bookings - b.cnt);
+
+  INSERT INTO RowTombstone (Table_Name, Row_ID)
+  SELECT 'Booking', Booking_ID FROM Booking WHERE Flight_ID = OLD.Flight_ID;
+  INSERT INTO RowTombstone (Table_Name, Row_ID) VALUES ('Flight', OLD.Flight_ID);
+END$$
+
+DROP TRIGGER IF EXISTS trg_before_passenger_delete $$
+CREATE TRIGGER trg_before_passenger_delete
+BEFORE DELETE ON Passenger
+FOR EACH ROW
+BEGIN
+  UPDATE Flight f
+  JOIN (
+    SELECT Flight_ID, COUNT(*) AS cnt
+    FROM Booking
+    WHERE Passenger_ID = OLD.Passenger_ID AND Status = 'Booked'
+    GROUP BY Flight_ID
+  ) b ON b.Flight_ID = f.Flight_ID
+  SET f.Booked_Count = GREATEST(0, f.Booked_Count - b.cnt), f.Seat_Version = f.Seat_Version + 1;
+
+  INSERT INTO RowTombstone (Table_Name, Row_ID)
+  SELECT 'Booking', Booking_ID FROM Booking WHERE Passenger_ID = OLD.Passenger_ID;
+  INSERT INTO RowTombstone (Table_Name, Row_ID) VALUES ('Passenger', OLD.Passenger_ID);
+END$$
+
+DROP TRIGGER IF EXISTS trg_after_staff_delete $$
+CREATE TRIGGER trg_after_staff_delete
+AFTER DELETE ON Staff
+FOR EACH ROW
+BEGIN
+  INSERT INTO RowTombstone (Table_Name, Row_ID) VALUES ('Staff', OLD.Staff_ID);
+END$$
+
+DROP TRIGGER IF EXISTS trg_before_airline_delete $$
+CREATE TRIGGER trg_before_airline_delete
+BEFORE DELETE ON Airline
+FOR EACH ROW
+BEGIN
+  INSERT INTO RowTombstone (Table_Name, Row_ID)
+  SELECT 'Booking', b.Booking_ID
+  FROM Booking b
+  JOIN Flight f ON b.Flight_ID = f.Flight_ID
+  WHERE f.Airline_ID = OLD.Airline_ID;
+  INSERT INTO RowTombstone (Table_Name, Row_ID)
+  SELECT 'Flight', Flight_ID FROM Flight WHERE Airline_ID = OLD.Airline_ID;
+  INSERT INTO RowTombstone (Table_Name, Row_ID)
+  SELECT 'Staff', Staff_ID FROM Staff WHERE Airline_ID = OLD.Airline_ID;
+  INSERT INTO RowTombstone (Table_Name, Row_ID) VALUES ('Airline', OLD.Airline_ID);
+END$$
+
+DROP TRIGGER IF EXISTS trg_before_airport_delete $$
+CREATE TRIGGER trg_before_airport_delete
+BEFORE DELETE ON Airport
+FOR EACH ROW
+BEGIN
+  INSERT INTO RowTombstone (Table_Name, Row_ID)
+  SELECT 'Staff', Staff_ID FROM Staff WHERE Airport_ID = OLD.Airport_ID;
+  INSERT INTO RowTombstone (Table_Name, Row_ID) VALUES ('Airport', OLD.Airport_ID);
+END$$
+
 DELIMITER ;
+
+-- ======================================================
+-- STEP 6: Backfill maintained counters
+-- ======================================================
+
+UPDATE Flight f
+LEFT JOIN (
+  SELECT Flight_ID, COUNT(*) AS cnt FROM Booking WHERE Status = 'Booked' GROUP BY Flight_ID
+) b ON b.Flight_ID = f.Flight_ID
+SET f.Booked_Count = COALESCE(b.cnt, 0);
+
+UPDATE Passenger p
+LEFT JOIN (
+  SELECT Passenger_ID, COUNT(*) AS cnt FROM Booking WHERE Status = 'Booked' GROUP BY Passenger_ID
+) b ON b.Passenger_ID = p.Passenger_ID
+SET p.Active_Bookings = COALESCE(b.cnt, 0);